@@ -0,0 +1,213 @@
+"""
+Full-account data export
+
+Everything stored about a user (profile, assessments, journal, daily wellness,
+chats, prescriptions, quizzes, leaderboards, mini games and voice calls) is
+produced as a stream:
+- NDJSON: one {"type": ..., "data": ...} object per line
+- zip: one NDJSON file per section plus the uploaded media files
+
+Rows are read with .iterator(chunk_size=CHUNK_SIZE) and files are copied in
+storage-sized chunks, so memory stays flat however much history a user has.
+Both generators yield bytes and can be handed straight to a
+StreamingHttpResponse or written to a file.
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from accounts.models import Profile
+from app.models import (
+    ChatArchive,
+    ChatHistory,
+    DailyWellness,
+    EmotionSessionData,
+    JournalEntry,
+    Prescription,
+    PrescriptionExtraction,
+    TestResult,
+)
+from app.services.chat_archive import decode_rows
+from games.models import (
+    Leaderboard,
+    MiniGameLeaderboard,
+    MiniGameScore,
+    Quiz,
+    QuizAttempt,
+    QuizQuestion,
+    UsedQuestion,
+)
+from voice_calls.models import CallSentiment, VoiceCallHistory, VoiceCallSchedule
+import json
+import logging
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+# Section name -> (queryset for a user, file fields copied into the zip)
+SECTIONS = {
+    "profile": (lambda user: Profile.objects.filter(user=user), ["image"]),
+    "test_results": (lambda user: TestResult.objects.filter(user=user), []),
+    "emotion_sessions": (lambda user: EmotionSessionData.objects.filter(user=user), []),
+    "journal_entries": (lambda user: JournalEntry.objects.filter(user=user), []),
+    "daily_wellness": (lambda user: DailyWellness.objects.filter(user=user), []),
+    "prescriptions": (
+        lambda user: Prescription.objects.filter(user=user),
+        ["prescription_image", "prescription_file"],
+    ),
+    "prescription_extractions": (lambda user: PrescriptionExtraction.objects.filter(user=user), []),
+    "quizzes": (lambda user: Quiz.objects.filter(user=user), []),
+    "quiz_questions": (lambda user: QuizQuestion.objects.filter(quiz__user=user), []),
+    "quiz_attempts": (lambda user: QuizAttempt.objects.filter(user=user), []),
+    "used_questions": (lambda user: UsedQuestion.objects.filter(user=user), []),
+    "leaderboard": (lambda user: Leaderboard.objects.filter(user=user), []),
+    "minigame_scores": (lambda user: MiniGameScore.objects.filter(user=user), []),
+    "minigame_leaderboard": (lambda user: MiniGameLeaderboard.objects.filter(user=user), []),
+    "voice_call_schedules": (lambda user: VoiceCallSchedule.objects.filter(user=user), []),
+    "voice_calls": (lambda user: VoiceCallHistory.objects.filter(user=user), []),
+    "call_sentiments": (lambda user: CallSentiment.objects.filter(call_history__user=user), []),
+}
+
+
+def _dumps(obj):
+    return json.dumps(obj, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":"))
+
+
+def iter_section_rows(user, name):
+    """Rows of one export section as dicts, oldest first"""
+    if name == "chat_history":
+        yield from _iter_chat_history(user)
+        return
+
+    queryset, _ = SECTIONS[name]
+    yield from queryset(user).order_by("pk").values().iterator(chunk_size=CHUNK_SIZE)
+
+
+def _iter_chat_history(user):
+    # Archived months come first: they hold every turn older than the hot table
+    for archive in ChatArchive.objects.filter(user=user).order_by("month").iterator(chunk_size=1):
+        yield from decode_rows(archive)
+    yield from (
+        ChatHistory.objects.filter(user=user)
+        .order_by("timestamp", "id")
+        .values("id", "message", "response", "timestamp")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def section_names():
+    return [*SECTIONS, "chat_history"]
+
+
+def _header(user):
+    return {
+        "user": {
+            "id": user.pk,
+            "username": user.username,
+            "email": user.email,
+            "date_joined": user.date_joined,
+        },
+        "generated_at": timezone.now(),
+        "sections": section_names(),
+    }
+
+
+def stream_ndjson(user):
+    """
+    Yield a user's export as NDJSON lines
+
+    Args:
+        user (User): Account to export
+
+    Yields:
+        bytes: One encoded line per record, starting with an "export" header
+    """
+    yield (_dumps({"type": "export", "data": _header(user)}) + "\n").encode("utf-8")
+    for name in section_names():
+        for row in iter_section_rows(user, name):
+            yield (_dumps({"type": name, "data": row}) + "\n").encode("utf-8")
+
+
+class _ZipStream:
+    """Write-only file object that hands finished zip bytes back to the generator"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(user):
+    """
+    Yield a user's export as a zip archive
+
+    The archive holds export.json, one <section>.ndjson per section and the
+    uploaded files under media/. It is written for a non-seekable stream, so
+    no part of it has to be buffered beyond the chunk being written.
+
+    Args:
+        user (User): Account to export
+
+    Returns:
+        iterator: Successive non-empty bytes pieces of the zip file
+    """
+    return (piece for piece in _zip_pieces(user) if piece)
+
+
+def _zip_pieces(user):
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("export.json", _dumps(_header(user)))
+        yield stream.drain()
+
+        for name in section_names():
+            with archive.open(f"{name}.ndjson", "w", force_zip64=True) as member:
+                for count, row in enumerate(iter_section_rows(user, name), 1):
+                    member.write((_dumps(row) + "\n").encode("utf-8"))
+                    if count % CHUNK_SIZE == 0:
+                        yield stream.drain()
+            yield stream.drain()
+
+        for field_file in _iter_media(user):
+            yield from _write_media(archive, stream, field_file)
+
+    yield stream.drain()
+
+
+def _iter_media(user):
+    for name, (queryset, file_fields) in SECTIONS.items():
+        if not file_fields:
+            continue
+        for record in queryset(user).order_by("pk").only("pk", *file_fields).iterator(chunk_size=CHUNK_SIZE):
+            for field in file_fields:
+                field_file = getattr(record, field)
+                if field_file:
+                    yield field_file
+
+
+def _write_media(archive, stream, field_file):
+    arcname = f"media/{field_file.name.lstrip('/')}"
+    try:
+        with field_file.open("rb") as source, archive.open(arcname, "w", force_zip64=True) as member:
+            for chunk in source.chunks():
+                member.write(chunk)
+                yield stream.drain()
+    except (OSError, ValueError) as e:
+        logger.warning(f"Skipping missing export file {field_file.name}: {str(e)}")
+    yield stream.drain()
+
+
+def export_filename(user, export_format):
+    stamp = timezone.now().strftime("%Y%m%d")
+    extension = "zip" if export_format == "zip" else "ndjson"
+    return f"mindmate-export-{user.username}-{stamp}.{extension}"
@@ -1,3 +1,63 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from app.models import ChatHistory, JournalEntry
+from games.models import Quiz, QuizQuestion
+import io
+import json
+import zipfile
 
-# Create your tests here.
+
+class ExportTests(TestCase):
+    """The account export streams every section of the user's data"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("exporter", password="password")
+        other = User.objects.create_user("other", password="password")
+        JournalEntry.objects.create(user=cls.user, content="My entry")
+        JournalEntry.objects.create(user=other, content="Not mine")
+        ChatHistory.objects.create(user=cls.user, message="Hello", response="Hi there")
+        cls.quiz = Quiz.objects.create(user=cls.user, genre="wellness", questions_data=[])
+        QuizQuestion.objects.bulk_create([
+            QuizQuestion(quiz=cls.quiz, question_text=f"Question {n}", options=["a", "b", "c", "d"],
+                         correct_answer="a", question_number=n)
+            for n in (1, 2)
+        ])
+        other_quiz = Quiz.objects.create(user=other, genre="wellness", questions_data=[])
+        QuizQuestion.objects.create(quiz=other_quiz, question_text="Not mine", options=[], correct_answer="a", question_number=1)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_ndjson(self):
+        response = self.client.get(reverse("export_data"), {"format": "ndjson"})
+        self.assertTrue(response.streaming)
+        records = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+        self.assertEqual(records[0]["type"], "export")
+        journal = [record["data"]["content"] for record in records if record["type"] == "journal_entries"]
+        self.assertEqual(journal, ["My entry"])
+        self.assertIn("chat_history", {record["type"] for record in records})
+
+    def test_quiz_is_exported_with_its_questions(self):
+        response = self.client.get(reverse("export_data"), {"format": "ndjson"})
+        records = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+        quizzes = [record["data"]["id"] for record in records if record["type"] == "quizzes"]
+        questions = [record["data"] for record in records if record["type"] == "quiz_questions"]
+        self.assertEqual(quizzes, [self.quiz.id])
+        self.assertEqual([question["question_text"] for question in questions], ["Question 1", "Question 2"])
+        self.assertEqual({question["quiz_id"] for question in questions}, {self.quiz.id})
+
+    def test_zip(self):
+        response = self.client.get(reverse("export_data"), {"format": "zip"})
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+        self.assertIsNone(archive.testzip())
+        self.assertIn("export.json", archive.namelist())
+        chats = archive.read("chat_history.ndjson").decode().splitlines()
+        self.assertEqual(json.loads(chats[0])["message"], "Hello")
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(reverse("export_data"), {"format": "xml"}).status_code, 400)
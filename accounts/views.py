@@ -1,3 +1,4 @@
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -5,6 +6,7 @@ from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 from django.urls import reverse_lazy
 from allauth.account.views import SignupView
+from .export import export_filename, stream_ndjson, stream_zip
 from .forms import ProfileForm
 from .models import Profile
 
@@ -95,4 +97,23 @@ def profile_view(request):
         'password_form': password_form,
     }
     
-    return render(request, 'accounts/profile.html', context)
\ No newline at end of file
+    return render(request, 'accounts/profile.html', context)
+
+
+EXPORT_FORMATS = {
+    "ndjson": (stream_ndjson, "application/x-ndjson"),
+    "zip": (stream_zip, "application/zip"),
+}
+
+
+@login_required
+def export_data_view(request):
+    """Stream everything stored about the user as NDJSON (?format=ndjson) or a zip with media files (?format=zip)"""
+    export_format = request.GET.get("format", "zip")
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("Unknown export format")
+
+    stream, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(stream(request.user), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{export_filename(request.user, export_format)}"'
+    return response
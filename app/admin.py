@@ -1,8 +1,10 @@
 from django.contrib import admin
-from app.models import TestResult, EmotionSessionData ,ChatHistory,JournalEntry
+from app.models import TestResult, EmotionSessionData ,ChatHistory,JournalEntry,DailyWellness,ChatArchive
 # Register your models here.
 
 admin.site.register(TestResult)
 admin.site.register(EmotionSessionData)
 admin.site.register(ChatHistory)
-admin.site.register(JournalEntry)
\ No newline at end of file
+admin.site.register(JournalEntry)
+admin.site.register(DailyWellness)
+admin.site.register(ChatArchive)
@@ -4,5 +4,8 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
-    
+
+    def ready(self):
+        import app.signals
+
     
\ No newline at end of file
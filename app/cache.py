@@ -0,0 +1,77 @@
+"""
+Cache helpers shared by the apps
+
+Cached data is grouped into namespaces that each carry a version number. Keys
+built with versioned_key() and template fragments that vary on a version are
+invalidated all at once by bump_cache_version(), typically from a model
+signal, without having to know every key that was written.
+
+The backend itself is configured by CACHES in perplex/settings.py: Redis when
+CACHE_URL or USE_REDIS is set, an in-process LRU otherwise.
+"""
+from functools import wraps
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+PAGE_TIMEOUT = settings.CACHE_PAGE_TIMEOUT
+FRAGMENT_TIMEOUT = settings.CACHE_FRAGMENT_TIMEOUT
+
+
+def _version_key(namespace):
+    return f"cache-version:{namespace}"
+
+
+def cache_version(namespace):
+    """Current version of a cache namespace, starting at 1"""
+    return cache.get_or_set(_version_key(namespace), 1, None)
+
+
+def bump_cache_version(namespace):
+    """Invalidate everything cached under a namespace"""
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        # Never used or evicted: any new value differs from what readers hold
+        cache.set(_version_key(namespace), 2, None)
+
+
+def versioned_key(namespace, *parts):
+    """Cache key that changes whenever the namespace version is bumped"""
+    suffix = ":".join(str(part) for part in parts)
+    return f"{namespace}:v{cache_version(namespace)}:{suffix}"
+
+
+def cache_page_for_anonymous(timeout=PAGE_TIMEOUT, namespace="pages"):
+    """
+    Cache a view's response for anonymous visitors only
+
+    Signed-in users, non-GET requests, pages with pending flash messages and
+    responses that set cookies are always rendered fresh. Unlike cache_page,
+    the key ignores the Cookie header, so every anonymous visitor shares one
+    cached copy per path. bump_cache_version(namespace) drops all of them.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ("GET", "HEAD")
+                or request.user.is_authenticated
+                or len(get_messages(request))
+            ):
+                return view(request, *args, **kwargs)
+
+            key = versioned_key(namespace, request.path)
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                cache.set(key, response, timeout)
+            return response
+        return wrapper
+    return decorator
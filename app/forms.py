@@ -1,5 +1,7 @@
 
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 from .models import JournalEntry, Prescription
 PHQ_CHOICES = [
     (0, 'Not at all'),
@@ -79,9 +81,10 @@ class PrescriptionForm(forms.ModelForm):
         if image and file:
             raise forms.ValidationError("Please upload only one file (either image or PDF).")
         
-        # Validate file size (4MB limit)
+        # Validate file size (4MB limit by default)
         file_to_check = image or file
-        if file_to_check and file_to_check.size > 4 * 1024 * 1024:
-            raise forms.ValidationError("File size must be under 4MB.")
+        max_size = settings.PRESCRIPTION_MAX_UPLOAD_SIZE
+        if file_to_check and file_to_check.size > max_size:
+            raise forms.ValidationError(f"File size must be under {filesizeformat(max_size)}.")
         
         return cleaned_data
\ No newline at end of file
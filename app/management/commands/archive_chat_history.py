@@ -0,0 +1,36 @@
+"""
+Move old chatbot turns out of ChatHistory into compressed monthly archives
+
+Runs nightly from Celery beat (app.tasks.archive_old_chat_history); use this
+command for the first large run or to archive with a different cutoff.
+
+    python manage.py archive_chat_history --older-than-days 180
+"""
+from django.core.management.base import BaseCommand, CommandError
+from app.services.chat_archive import ARCHIVE_AFTER_DAYS, ZSTD_AVAILABLE, archive_chat_history
+import time
+
+
+class Command(BaseCommand):
+    help = "Archive chat turns older than a cutoff into per-user, per-month compressed blobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=ARCHIVE_AFTER_DAYS,
+            help=f"Archive turns older than this many days (default: {ARCHIVE_AFTER_DAYS})",
+        )
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only archive this user id (repeatable)")
+
+    def handle(self, *args, **options):
+        if options["older_than_days"] < 1:
+            raise CommandError("--older-than-days must be positive")
+        if not ZSTD_AVAILABLE:
+            self.stdout.write(self.style.WARNING("zstandard is not installed, archiving with zlib"))
+
+        started = time.monotonic()
+        archived = archive_chat_history(options["older_than_days"], user_ids=options["user_ids"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} chat turns in {time.monotonic() - started:.1f}s"
+        ))
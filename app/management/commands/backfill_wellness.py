@@ -0,0 +1,49 @@
+"""
+Rebuild the DailyWellness rollup from the source tables
+
+Users are processed in primary-key batches, each rebuilt in its own
+transaction, so the command can run against a live database.
+
+    python manage.py backfill_wellness --batch-size 500
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from app.services.wellness import backfill_daily_wellness
+import time
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user daily wellness rollup from journal, assessment, call and chat data"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Users rebuilt per transaction")
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only rebuild this user id (repeatable)")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive")
+
+        users = User.objects.order_by("pk")
+        if options["user_ids"]:
+            users = users.filter(pk__in=options["user_ids"])
+
+        last_pk = 0
+        user_count = row_count = 0
+        started = time.monotonic()
+
+        while True:
+            user_ids = list(users.filter(pk__gt=last_pk).values_list("pk", flat=True)[:batch_size])
+            if not user_ids:
+                break
+
+            row_count += backfill_daily_wellness(user_ids)
+            user_count += len(user_ids)
+            last_pk = user_ids[-1]
+            self.stdout.write(f"{user_count} users, {row_count} daily rows written")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {row_count} daily rows for {user_count} users in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,477 @@
+"""
+Generate production-shaped synthetic data for benchmarks and query-plan checks
+
+Every synthetic user gets a profile, assessments, journal entries, chat
+history, quizzes with questions and attempts, used-question hashes, mini game
+scores, leaderboards and voice calls with sentiment. Timestamps are spread
+over --days of history. Row counts per user vary around the defaults below,
+multiplied by --scale.
+
+Each user's data comes from its own random.Random(seed, index), so the same
+--seed produces the same data whatever the batch size. Users are written in
+batches of bulk_create calls, one transaction per batch, and the
+DailyWellness rollup is rebuilt for each batch unless --skip-rollup is given.
+
+    python manage.py generate_load_data --users 100000 --scale 2 --seed 7
+
+Users are named <prefix><index> and can log in with --password.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.utils import timezone
+from accounts.models import Profile
+from app.models import ChatHistory, JournalEntry, TestResult
+from app.services.wellness import backfill_daily_wellness
+from games.models import (
+    QUIZ_GENRES,
+    Leaderboard,
+    MiniGameLeaderboard,
+    MiniGameScore,
+    Quiz,
+    QuizAttempt,
+    QuizQuestion,
+    UsedQuestion,
+)
+from voice_calls.models import CallSentiment, VoiceCallHistory, VoiceCallSchedule
+import hashlib
+import random
+import time
+
+# Average rows per user at --scale 1
+ROWS_PER_USER = {
+    "test_results": 6,
+    "journal_entries": 40,
+    "chat_messages": 80,
+    "quizzes": 4,
+    "minigame_scores": 12,
+    "voice_calls": 3,
+}
+
+QUESTIONS_PER_QUIZ = 20
+INSERT_BATCH_SIZE = 1000
+
+EMOTIONS = ["happy", "sad", "angry", "fear", "surprise", "neutral", "disgust"]
+CALL_EMOTIONS = ["calm", "anxious", "hopeful", "tired", "content", "overwhelmed", "lonely"]
+STRESS_INDICATORS = ["sleep problems", "work pressure", "low energy", "racing thoughts", "isolation"]
+FIRST_NAMES = ["Aarav", "Maya", "Leo", "Priya", "Noah", "Zara", "Ishan", "Emma", "Kabir", "Sara"]
+LAST_NAMES = ["Sharma", "Patel", "Smith", "Khan", "Garcia", "Iyer", "Brown", "Das", "Mehta", "Lee"]
+BLOOD_GROUPS = ["A+", "A-", "B+", "B-", "O+", "O-", "AB+", "AB-"]
+
+GOOD_DAY = [
+    "Had a good day today and felt calm most of the time.",
+    "Went for a long walk and enjoyed the fresh air.",
+    "Talked to a friend and laughed a lot, feeling grateful.",
+    "Finished my work early and felt proud of myself.",
+    "Slept well and woke up with a lot of energy.",
+]
+BAD_DAY = [
+    "Felt anxious and tired all day, could not focus on anything.",
+    "Could not sleep last night and everything felt heavy.",
+    "Work was stressful and I felt overwhelmed and alone.",
+    "Argued with family and felt sad and hopeless afterwards.",
+    "Skipped meals again and had no motivation to get up.",
+]
+CHAT_MESSAGES = [
+    "How can I stop overthinking at night?",
+    "I feel stressed about my exams.",
+    "Can you suggest a breathing exercise?",
+    "I had a really good day today!",
+    "Why do I feel tired even after sleeping?",
+    "How do I talk to my friends about how I feel?",
+]
+CHAT_RESPONSES = [
+    "That sounds hard. Try writing your thoughts down before bed so they feel less urgent.",
+    "Breaking revision into short sessions with breaks can make exams feel more manageable.",
+    "Try box breathing: breathe in for four counts, hold for four, out for four, hold for four.",
+    "I'm glad to hear that! What made today feel good?",
+    "Fatigue can have many causes. Keeping a regular sleep schedule often helps.",
+    "Starting with one trusted friend and being honest about how you feel is a good first step.",
+]
+
+
+def _count(rng, key, scale):
+    """Row count for one user, uniform around the scaled average"""
+    mean = ROWS_PER_USER[key] * scale
+    return rng.randint(0, max(0, round(2 * mean)))
+
+
+def _moment(rng, now, days):
+    return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+
+def _phq9_status(score):
+    if score < 5:
+        return "Minimal"
+    if score < 10:
+        return "Mild"
+    if score < 15:
+        return "Moderate"
+    if score < 20:
+        return "Moderately Severe"
+    return "Severe"
+
+
+@contextmanager
+def explicit_timestamps(*model_classes):
+    """Let generated rows keep their own auto_now/auto_now_add timestamps"""
+    fields = [
+        field
+        for model in model_classes
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.DateField) and (field.auto_now or field.auto_now_add)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate deterministic synthetic users and activity across all apps"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Number of users to create")
+        parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for rows per user")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed")
+        parser.add_argument("--days", type=int, default=365, help="Days of history to spread rows over")
+        parser.add_argument("--batch-size", type=int, default=200, help="Users written per transaction")
+        parser.add_argument("--prefix", default="loadtest_", help="Username prefix of the generated users")
+        parser.add_argument("--password", default="loadtest", help="Password of every generated user")
+        parser.add_argument("--skip-rollup", action="store_true", help="Do not rebuild DailyWellness rows")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["batch_size"] < 1 or options["days"] < 1 or options["scale"] < 0:
+            raise CommandError("--users, --batch-size and --days must be positive and --scale non-negative")
+        if User.objects.filter(username__startswith=options["prefix"]).exists():
+            raise CommandError(f"Users named {options['prefix']}* already exist; pick another --prefix")
+
+        self.options = options
+        self.now = timezone.now()
+        self.password = make_password(options["password"])
+
+        total_users = options["users"]
+        batch_size = options["batch_size"]
+        rows = 0
+        started = time.monotonic()
+
+        with explicit_timestamps(
+            TestResult, JournalEntry, ChatHistory, Quiz, QuizAttempt, UsedQuestion,
+            MiniGameScore, MiniGameLeaderboard, Leaderboard,
+            VoiceCallSchedule, VoiceCallHistory, CallSentiment,
+        ):
+            for start in range(0, total_users, batch_size):
+                indexes = range(start, min(start + batch_size, total_users))
+                with transaction.atomic():
+                    user_ids, batch_rows = self._generate_batch(indexes)
+                    rows += batch_rows
+                if not options["skip_rollup"]:
+                    backfill_daily_wellness(user_ids)
+
+                done = indexes.stop
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"{done}/{total_users} users, {rows} rows, {rows / elapsed:.0f} rows/s")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total_users} users and {rows} rows in {time.monotonic() - started:.1f}s"
+        ))
+
+    def _generate_batch(self, indexes):
+        seed, prefix = self.options["seed"], self.options["prefix"]
+        rngs = [random.Random(f"{seed}:{index}") for index in indexes]
+
+        users = User.objects.bulk_create([
+            User(
+                username=f"{prefix}{index:07d}",
+                email=f"{prefix}{index:07d}@example.com",
+                password=self.password,
+                date_joined=self.now - timedelta(days=self.options["days"]),
+            )
+            for index in indexes
+        ])
+
+        rows = {model: [] for model in (
+            Profile, TestResult, JournalEntry, ChatHistory, MiniGameScore, MiniGameLeaderboard,
+            UsedQuestion, Quiz, QuizQuestion, QuizAttempt, Leaderboard,
+            VoiceCallSchedule, VoiceCallHistory, CallSentiment,
+        )}
+        quiz_plans, call_plans = [], []
+
+        for user, rng in zip(users, rngs):
+            # 0 = thriving, 1 = struggling; drives scores and the text picked
+            mood = rng.random()
+            self._profile(rows, user, rng)
+            self._assessments(rows, user, rng, mood)
+            self._journal(rows, user, rng, mood)
+            self._chats(rows, user, rng)
+            self._minigames(rows, user, rng)
+            quiz_plans += self._quizzes(rows, user, rng)
+            call_plans += self._calls(rows, user, rng, mood)
+
+        self._insert(rows, Profile, TestResult, JournalEntry, ChatHistory, MiniGameScore,
+                     MiniGameLeaderboard, UsedQuestion, Quiz, VoiceCallSchedule)
+
+        # Children need the primary keys bulk_create just assigned to their parents
+        for quiz, questions, attempt in quiz_plans:
+            rows[QuizQuestion] += [QuizQuestion(quiz=quiz, **question) for question in questions]
+            rows[QuizAttempt].append(QuizAttempt(quiz=quiz, **attempt))
+        for schedule, history, sentiment in call_plans:
+            if history:
+                rows[VoiceCallHistory].append(VoiceCallHistory(schedule=schedule, **history))
+        self._insert(rows, QuizQuestion, QuizAttempt, VoiceCallHistory)
+
+        histories = iter(rows[VoiceCallHistory])
+        for schedule, history, sentiment in call_plans:
+            if history:
+                rows[CallSentiment].append(CallSentiment(call_history=next(histories), **sentiment))
+        self._leaderboards(rows, users)
+        self._insert(rows, CallSentiment, Leaderboard)
+
+        return [user.pk for user in users], len(users) + sum(len(objs) for objs in rows.values())
+
+    def _insert(self, rows, *model_classes):
+        for model in model_classes:
+            model.objects.bulk_create(rows[model], batch_size=INSERT_BATCH_SIZE)
+
+    def _profile(self, rows, user, rng):
+        rows[Profile].append(Profile(
+            user=user,
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            email=user.email,
+            date_of_birth=(self.now - timedelta(days=rng.randint(16 * 365, 70 * 365))).date(),
+            height=round(rng.uniform(150, 195), 1),
+            weight=round(rng.uniform(45, 110), 1),
+            Blood_Group=rng.choice(BLOOD_GROUPS),
+            phone_number=f"+91{rng.randint(7000000000, 9999999999)}",
+        ))
+
+    def _assessments(self, rows, user, rng, mood):
+        for _ in range(_count(rng, "test_results", self.options["scale"])):
+            phq9 = max(0, min(27, round(rng.gauss(mood * 22, 4))))
+            emotions = {emotion: rng.randint(0, 40) for emotion in EMOTIONS}
+            emotion_score = round(10 * mood + rng.uniform(-3, 3))
+            depression_score = round(rng.uniform(0, 5) * mood, 2)
+            rows[TestResult].append(TestResult(
+                user=user,
+                phq9_score=phq9,
+                total_score=phq9 + emotion_score,
+                Status=_phq9_status(phq9),
+                emotions=emotions,
+                emotion_score=emotion_score,
+                audio_duration=20,
+                audio_analysis={
+                    "depression_score": depression_score,
+                    "processed_text": rng.choice(BAD_DAY if mood > 0.5 else GOOD_DAY),
+                    "confidence": round(rng.uniform(0.6, 0.99), 3),
+                },
+                date=_moment(rng, self.now, self.options["days"]),
+            ))
+
+    def _journal(self, rows, user, rng, mood):
+        for _ in range(_count(rng, "journal_entries", self.options["scale"])):
+            bad_day = rng.random() < mood
+            sentences = rng.sample(BAD_DAY if bad_day else GOOD_DAY, rng.randint(1, 4))
+            negative = round(rng.uniform(0.55, 0.98) if bad_day else rng.uniform(0.02, 0.45), 4)
+            rows[JournalEntry].append(JournalEntry(
+                user=user,
+                content=" ".join(sentences),
+                positive_score=round(1 - negative, 4),
+                negative_score=negative,
+                sentiment_status="completed",
+                entry_date=_moment(rng, self.now, self.options["days"]),
+            ))
+
+    def _chats(self, rows, user, rng):
+        for _ in range(_count(rng, "chat_messages", self.options["scale"])):
+            turn = rng.randrange(len(CHAT_MESSAGES))
+            rows[ChatHistory].append(ChatHistory(
+                user=user,
+                message=CHAT_MESSAGES[turn],
+                response=CHAT_RESPONSES[turn],
+                timestamp=_moment(rng, self.now, self.options["days"]),
+            ))
+
+    def _minigames(self, rows, user, rng):
+        played = {}
+        for _ in range(_count(rng, "minigame_scores", self.options["scale"])):
+            score = MiniGameScore(
+                user=user,
+                game_type=rng.choice(MiniGameScore.GAME_TYPES)[0],
+                difficulty=rng.choice(MiniGameScore.DIFFICULTY_LEVELS)[0],
+                score=rng.randint(10, 1000),
+                time_taken=round(rng.uniform(15, 300), 1),
+                moves_count=rng.randint(8, 80),
+                completed=rng.random() < 0.85,
+                created_at=_moment(rng, self.now, self.options["days"]),
+            )
+            rows[MiniGameScore].append(score)
+            played.setdefault(score.game_type, []).append(score)
+
+        for game_type, scores in played.items():
+            total = sum(score.score for score in scores)
+            rows[MiniGameLeaderboard].append(MiniGameLeaderboard(
+                user=user,
+                game_type=game_type,
+                total_games=len(scores),
+                total_score=total,
+                highest_score=max(score.score for score in scores),
+                average_score=total / len(scores),
+                best_time=min(score.time_taken for score in scores),
+                total_time_played=sum(score.time_taken for score in scores),
+                last_played=max(score.created_at for score in scores),
+            ))
+
+    def _quizzes(self, rows, user, rng):
+        plans = []
+        for quiz_number in range(_count(rng, "quizzes", self.options["scale"])):
+            genre = rng.choice(QUIZ_GENRES)[0]
+            created_at = _moment(rng, self.now, self.options["days"])
+            questions = []
+            for number in range(1, QUESTIONS_PER_QUIZ + 1):
+                text = f"[{genre}] Synthetic question {quiz_number}.{number} for {user.username}?"
+                options = [f"Option {letter}" for letter in "ABCD"]
+                questions.append({
+                    "question_text": text,
+                    "options": options,
+                    "correct_answer": rng.choice(options),
+                    "difficulty": rng.choice(["easy", "medium", "hard"]),
+                    "question_number": number,
+                })
+                rows[UsedQuestion].append(UsedQuestion(
+                    user=user,
+                    genre=genre,
+                    question_hash=hashlib.sha256(text.lower().encode()).hexdigest(),
+                    created_at=created_at,
+                ))
+
+            quiz = Quiz(
+                user=user,
+                genre=genre,
+                questions_data=[
+                    {
+                        "question": question["question_text"],
+                        "options": question["options"],
+                        "correct_answer": question["correct_answer"],
+                        "difficulty": question["difficulty"],
+                    }
+                    for question in questions
+                ],
+                created_at=created_at,
+            )
+            rows[Quiz].append(quiz)
+
+            completed = rng.random() < 0.8
+            correct = rng.randint(4, QUESTIONS_PER_QUIZ) if completed else 0
+            skipped = rng.randint(0, QUESTIONS_PER_QUIZ - correct) if completed else 0
+            wrong = QUESTIONS_PER_QUIZ - correct - skipped if completed else 0
+            time_taken = rng.randint(120, 900) if completed else None
+            attempt = {
+                "user": user,
+                "genre": genre,
+                "total_questions": QUESTIONS_PER_QUIZ,
+                "correct_answers": correct,
+                "wrong_answers": wrong,
+                "skipped_answers": skipped,
+                "score": correct * 2 - wrong,
+                "accuracy": correct / QUESTIONS_PER_QUIZ * 100,
+                "time_taken": time_taken,
+                "user_answers": {str(i): rng.choice(questions[i]["options"]) for i in range(correct + wrong)},
+                "started_at": created_at,
+                "completed_at": created_at + timedelta(seconds=time_taken) if completed else None,
+                "is_completed": completed,
+            }
+            plans.append((quiz, questions, attempt))
+        return plans
+
+    def _leaderboards(self, rows, users):
+        attempts = {}
+        for attempt in rows[QuizAttempt]:
+            if attempt.is_completed:
+                attempts.setdefault(attempt.user_id, []).append(attempt)
+
+        for user in users:
+            completed = attempts.get(user.pk, [])
+            if not completed:
+                continue
+            groups = {None: completed}
+            for attempt in completed:
+                groups.setdefault(attempt.genre, []).append(attempt)
+            for genre, group in groups.items():
+                total_score = sum(attempt.score for attempt in group)
+                total_correct = sum(attempt.correct_answers for attempt in group)
+                total_questions = sum(attempt.total_questions for attempt in group)
+                rows[Leaderboard].append(Leaderboard(
+                    user=user,
+                    genre=genre,
+                    total_attempts=len(group),
+                    total_score=total_score,
+                    highest_score=max(attempt.score for attempt in group),
+                    average_score=total_score / len(group),
+                    total_correct=total_correct,
+                    total_questions=total_questions,
+                    overall_accuracy=total_correct / total_questions * 100,
+                    last_updated=max(attempt.completed_at for attempt in group),
+                ))
+
+    def _calls(self, rows, user, rng, mood):
+        plans = []
+        for call_number in range(_count(rng, "voice_calls", self.options["scale"])):
+            scheduled_time = _moment(rng, self.now, self.options["days"])
+            status = rng.choices(["completed", "failed", "cancelled"], weights=[85, 10, 5])[0]
+            schedule = VoiceCallSchedule(
+                user=user,
+                phone_number=f"+91{rng.randint(7000000000, 9999999999)}",
+                scheduled_time=scheduled_time,
+                status=status,
+                custom_prompt=rng.choice([None, "stress management", "sleep", "loneliness"]),
+                created_at=scheduled_time - timedelta(days=1),
+                updated_at=scheduled_time,
+            )
+            rows[VoiceCallSchedule].append(schedule)
+
+            if status != "completed":
+                plans.append((schedule, None, None))
+                continue
+
+            duration = rng.randint(60, 900)
+            user_lines = rng.sample(BAD_DAY if mood > 0.5 else GOOD_DAY, 2)
+            agent_lines = rng.sample(CHAT_RESPONSES, 2)
+            negative = round(rng.uniform(0, 25) * mood, 2)
+            positive = round(rng.uniform(0, 25) * (1 - mood), 2)
+            sentiment = "negative" if negative > positive + 3 else "positive" if positive > negative + 3 else "neutral"
+            history = {
+                "user": user,
+                "twilio_call_sid": f"CA{self.options['seed']:04d}{user.pk:010d}{call_number:04d}",
+                "duration_seconds": duration,
+                "call_started_at": scheduled_time,
+                "call_ended_at": scheduled_time + timedelta(seconds=duration),
+                "user_transcript": " ".join(user_lines),
+                "agent_responses": " ".join(agent_lines),
+                "full_transcript": {"user": " ".join(user_lines), "agent": " ".join(agent_lines)},
+                "overall_sentiment": sentiment,
+                "emotional_score": round(25 - negative, 2),
+                "stress_indicators": rng.sample(STRESS_INDICATORS, rng.randint(0, 3)),
+                "call_status": "completed",
+                "created_at": scheduled_time,
+                "updated_at": scheduled_time + timedelta(seconds=duration),
+            }
+            sentiment_row = {
+                "positive_score": positive,
+                "negative_score": negative,
+                "neutral_score": round(max(0.0, 25 - positive - negative), 2),
+                "emotions_detected": rng.sample(CALL_EMOTIONS, rng.randint(1, 3)),
+                "key_phrases": user_lines[:1],
+                "mental_health_impact": round(positive - negative, 2),
+                "analyzed_at": scheduled_time + timedelta(seconds=duration + 5),
+                "analysis_confidence": round(rng.uniform(0.5, 0.95), 3),
+            }
+            plans.append((schedule, history, sentiment_row))
+        return plans
@@ -0,0 +1,212 @@
+"""
+Recompute stored sentiment scores after the model or scoring formula changes
+
+Rows are read in primary-key order, one keyset page at a time, so memory use
+stays flat and no long-running transaction holds locks. Each page is scored
+with a bounded thread pool and written back with a single bulk_update.
+bulk_update does not send post_save, so the DailyWellness rollups and cached
+dashboards of the days a page touched are refreshed here instead. The last
+finished primary key is saved to a checkpoint file after every page, so
+an interrupted run picks up where it stopped.
+
+    python manage.py rescore_sentiment --target journal --batch-size 500
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from app.models import JournalEntry, TestResult
+from app.services.dashboard import invalidate_dashboard_cache
+from app.services.sentiment import FALLBACK_ENGINE, analyze_journal_text, analyze_text_with_model
+from app.services.wellness import refresh_daily_wellness, wellness_day
+from voice_calls.models import CallSentiment
+from voice_calls.services.elevenlabs_service import ElevenLabsService
+from voice_calls.tasks import calculate_mental_health_impact
+import json
+import os
+import time
+
+
+def _rescore_journal(entry):
+    analysis = analyze_journal_text(entry.content)
+    entry.positive_score = analysis["positive"]
+    entry.negative_score = analysis["negative"]
+    entry.sentiment_status = "estimated" if analysis["engine"] == FALLBACK_ENGINE else "completed"
+    return True
+
+
+def _rescore_assessment(result):
+    audio_data = result.audio_analysis or {}
+    text = audio_data.get("processed_text", "")
+    if not text:
+        return False
+
+    analysis = analyze_text_with_model(text)
+    if "error" in analysis:
+        return False
+    result.audio_analysis = {
+        **audio_data,
+        "depression_score": analysis.get("depression_score", 0),
+        "confidence": analysis.get("confidence", 0),
+        "estimated": analysis.get("fallback", False),
+    }
+    return True
+
+
+_call_service = ElevenLabsService()
+
+
+def _rescore_call(sentiment):
+    call = sentiment.call_history
+    full_text = f"{call.user_transcript} {call.agent_responses}"
+    if not full_text.strip():
+        return False
+
+    sentiment_data = _call_service.analyze_sentiment(full_text)
+    sentiment.positive_score = sentiment_data.get("positive_score", 0)
+    sentiment.negative_score = sentiment_data.get("negative_score", 0)
+    sentiment.neutral_score = sentiment_data.get("neutral_score", 0)
+    sentiment.analysis_confidence = sentiment_data.get("confidence", 0.0)
+    sentiment.mental_health_impact = calculate_mental_health_impact(sentiment_data)
+    return True
+
+
+# Target name -> (queryset factory, columns to read, columns to write, scorer,
+# (user id, moment) of the rollup day a row belongs to)
+TARGETS = {
+    "journal": (
+        lambda: JournalEntry.objects.all(),
+        ["id", "user", "entry_date", "content"],
+        ["positive_score", "negative_score", "sentiment_status"],
+        _rescore_journal,
+        lambda entry: (entry.user_id, entry.entry_date),
+    ),
+    "assessment": (
+        lambda: TestResult.objects.all(),
+        ["id", "user", "date", "audio_analysis"],
+        ["audio_analysis"],
+        _rescore_assessment,
+        lambda result: (result.user_id, result.date),
+    ),
+    "calls": (
+        lambda: CallSentiment.objects.select_related("call_history"),
+        [
+            "id",
+            "call_history__user",
+            "call_history__created_at",
+            "call_history__user_transcript",
+            "call_history__agent_responses",
+        ],
+        ["positive_score", "negative_score", "neutral_score", "analysis_confidence", "mental_health_impact"],
+        _rescore_call,
+        lambda sentiment: (sentiment.call_history.user_id, sentiment.call_history.created_at),
+    ),
+}
+
+
+def _refresh_rollups(rows, rollup_day):
+    """Recompute the DailyWellness days of re-scored rows and drop their users' cached dashboards"""
+    days = {(user_id, wellness_day(moment)) for user_id, moment in map(rollup_day, rows)}
+    for user_id, day in days:
+        refresh_daily_wellness(user_id, day)
+    for user_id in {user_id for user_id, _ in days}:
+        invalidate_dashboard_cache(user_id)
+
+
+class Command(BaseCommand):
+    help = "Re-score stored journal, assessment and call sentiment in resumable batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            choices=[*TARGETS, "all"],
+            default="all",
+            help="Which scores to recompute (default: all)",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows per keyset page")
+        parser.add_argument("--workers", type=int, default=8, help="Rows scored concurrently")
+        parser.add_argument(
+            "--checkpoint",
+            default="rescore_sentiment.checkpoint.json",
+            help="File recording the last finished primary key per target",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore any saved checkpoint and start from the first row",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1 or options["workers"] < 1:
+            raise CommandError("--batch-size and --workers must be positive")
+
+        self.checkpoint_path = options["checkpoint"]
+        self.checkpoint = {} if options["restart"] else self._load_checkpoint()
+
+        targets = list(TARGETS) if options["target"] == "all" else [options["target"]]
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            for target in targets:
+                self._rescore(target, executor, options["batch_size"])
+
+        if not self.checkpoint and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def _rescore(self, target, executor, batch_size):
+        queryset_factory, read_fields, write_fields, scorer, rollup_day = TARGETS[target]
+        last_pk = self.checkpoint.get(target, 0)
+        if last_pk:
+            self.stdout.write(f"{target}: resuming after id {last_pk}")
+
+        processed = updated = 0
+        started = time.monotonic()
+
+        while True:
+            page = (
+                queryset_factory()
+                .filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only(*read_fields)[:batch_size]
+            )
+            rows = list(page.iterator(chunk_size=batch_size))
+            if not rows:
+                break
+
+            scored = [row for row, ok in zip(rows, executor.map(scorer, rows)) if ok]
+            if scored:
+                page.model.objects.bulk_update(scored, write_fields, batch_size=batch_size)
+                _refresh_rollups(scored, rollup_day)
+
+            processed += len(rows)
+            updated += len(scored)
+            last_pk = rows[-1].pk
+            self.checkpoint[target] = last_pk
+            self._save_checkpoint()
+
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{target}: {processed} rows ({updated} updated) up to id {last_pk}, "
+                f"{processed / elapsed:.1f} rows/s"
+            )
+
+        self.checkpoint.pop(target, None)
+        self._save_checkpoint()
+
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{target}: finished {processed} rows ({updated} updated) in {elapsed:.1f}s, {rate:.1f} rows/s"
+        ))
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read checkpoint {self.checkpoint_path}: {e}")
+
+    def _save_checkpoint(self):
+        # Write then rename so an interrupted run never leaves a truncated file
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
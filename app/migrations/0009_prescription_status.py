@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_meditationprogress_meditationsession'),
+    ]
+
+    operations = [
+        # Prescriptions uploaded before background processing were extracted inline
+        migrations.AddField(
+            model_name='prescription',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='completed', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='prescription',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='prescription',
+            name='error_message',
+            field=models.TextField(blank=True),
+        ),
+    ]
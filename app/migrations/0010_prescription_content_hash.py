@@ -0,0 +1,48 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:30
+
+import app.models
+import app.storage
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_prescription_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prescription',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='prescription',
+            name='prescription_file',
+            field=models.FileField(blank=True, null=True, storage=app.storage.ContentAddressedStorage(), upload_to=app.models.prescription_upload_to),
+        ),
+        migrations.AlterField(
+            model_name='prescription',
+            name='prescription_image',
+            field=models.ImageField(blank=True, null=True, storage=app.storage.ContentAddressedStorage(), upload_to=app.models.prescription_upload_to),
+        ),
+        migrations.CreateModel(
+            name='PrescriptionExtraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('extracted_data', models.JSONField(default=dict)),
+                ('extracted_text', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prescription_extractions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'content_hash')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_prescription_content_hash'),
+    ]
+
+    operations = [
+        # Entries written before background scoring were scored before they were saved
+        migrations.AddField(
+            model_name='journalentry',
+            name='sentiment_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('estimated', 'Estimated'), ('failed', 'Failed')], default='completed', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='journalentry',
+            name='sentiment_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('estimated', 'Estimated'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_journalentry_sentiment_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyWellness',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('journal_entries', models.PositiveIntegerField(default=0)),
+                ('journal_pending', models.PositiveIntegerField(default=0)),
+                ('journal_positive', models.FloatField(blank=True, null=True)),
+                ('journal_negative', models.FloatField(blank=True, null=True)),
+                ('assessments', models.PositiveIntegerField(default=0)),
+                ('assessment_score', models.FloatField(blank=True, null=True)),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('call_positive', models.FloatField(blank=True, null=True)),
+                ('call_negative', models.FloatField(blank=True, null=True)),
+                ('chat_messages', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_wellness', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily wellness',
+                'ordering': ['-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='chathistory',
+            name='app_chathis_user_id_ddef64_idx',
+        ),
+        migrations.AddIndex(
+            model_name='chathistory',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='app_chathis_user_id_9e5fb2_idx'),
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:30
+"""
+Full-text indexes behind app/services/search.py
+
+SQLite gets external-content FTS5 tables kept in sync by triggers. PostgreSQL
+gets a generated tsvector column, which the database keeps up to date on
+every write, and a GIN index on (user_id, search_vector). Searches filter on
+both, and btree_gin lets user_id share the GIN index so the user filter is
+resolved inside it, as the user_id token does in the FTS5 tables.
+
+Note that SQLite rebuilds a table for most AlterField operations, which drops
+its triggers; a later migration that alters JournalEntry or ChatHistory on
+SQLite must recreate them (see SQLITE_FORWARDS below).
+"""
+from django.db import migrations
+
+try:
+    from django.contrib.postgres.operations import BtreeGinExtension
+    EXTENSION_OPERATIONS = [BtreeGinExtension()]
+except ImportError:
+    # Without a PostgreSQL driver there is no PostgreSQL database to migrate
+    EXTENSION_OPERATIONS = []
+
+# (table, text columns to index)
+FTS_TABLES = [
+    ("app_journalentry", ["content"]),
+    ("app_chathistory", ["message", "response"]),
+]
+
+
+def _sqlite_forwards(table, columns):
+    fts = f"{table}_fts"
+    indexed = columns + ["user_id"]
+    column_list = ", ".join(indexed)
+    new_values = ", ".join(f"new.{column}" for column in indexed)
+    old_values = ", ".join(f"old.{column}" for column in indexed)
+    changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column in indexed)
+    return [
+        # user_id is indexed as a token so searches are scoped to one user inside the index
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({column_list}, content='{table}', "
+        f"content_rowid='id', tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER {fts}_update AFTER UPDATE ON {table} WHEN {changed} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _sqlite_backwards(table, columns):
+    fts = f"{table}_fts"
+    return [
+        f"DROP TRIGGER IF EXISTS {fts}_insert",
+        f"DROP TRIGGER IF EXISTS {fts}_delete",
+        f"DROP TRIGGER IF EXISTS {fts}_update",
+        f"DROP TABLE IF EXISTS {fts}",
+    ]
+
+
+def _postgres_forwards(table, columns):
+    # Text typed by the user outweighs the chatbot's reply
+    weighted = " || ".join(
+        f"setweight(to_tsvector('english', coalesce({column}, '')), '{weight}')"
+        for column, weight in zip(columns, "AB")
+    )
+    return [
+        f"ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({weighted}) STORED",
+        f"CREATE INDEX {table}_user_search_idx ON {table} USING GIN (user_id, search_vector)",
+    ]
+
+
+def _postgres_backwards(table, columns):
+    return [
+        f"DROP INDEX IF EXISTS {table}_user_search_idx",
+        f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector",
+    ]
+
+
+SQLITE_FORWARDS = [sql for table, columns in FTS_TABLES for sql in _sqlite_forwards(table, columns)]
+SQLITE_BACKWARDS = [sql for table, columns in FTS_TABLES for sql in _sqlite_backwards(table, columns)]
+POSTGRES_FORWARDS = [sql for table, columns in FTS_TABLES for sql in _postgres_forwards(table, columns)]
+POSTGRES_BACKWARDS = [sql for table, columns in FTS_TABLES for sql in _postgres_backwards(table, columns)]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql, params=None)
+
+
+def create_search_indexes(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_FORWARDS, "postgresql": POSTGRES_FORWARDS})
+
+
+def drop_search_indexes(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_BACKWARDS, "postgresql": POSTGRES_BACKWARDS})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_chathistory_cursor_index'),
+    ]
+
+    operations = EXTENSION_OPERATIONS + [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+from app.storage import prescription_storage
+import os
 # Create your models here.
 
 class TestResult(models.Model):
@@ -13,6 +15,11 @@ class TestResult(models.Model):
     audio_duration = models.FloatField(null=True, blank=True)  # New field
     audio_analysis = models.JSONField(default=dict)
     date = models.DateTimeField(auto_now_add=True, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-date']),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.phq9_score}"
@@ -38,27 +45,88 @@ class ChatHistory(models.Model):
     message = models.TextField()
     response = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
-    
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-timestamp', '-id']),
+        ]
+
+
+class ChatArchive(models.Model):
+    """One user's archived chat turns for one calendar month, as compressed JSON lines"""
+    CODEC_CHOICES = [
+        ('zstd', 'Zstandard'),
+        ('zlib', 'zlib'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_archives')
+    month = models.DateField()  # First day of the month
+    message_count = models.PositiveIntegerField(default=0)
+    first_timestamp = models.DateTimeField()
+    last_timestamp = models.DateTimeField()
+    codec = models.CharField(max_length=10, choices=CODEC_CHOICES)
+    data = models.BinaryField()
+    # Turns per local day ("YYYY-MM-DD" -> count), so the wellness rollup can
+    # count archived turns without decompressing the archive
+    daily_counts = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'month']
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.month:%Y-%m} ({self.message_count} messages)"
+
     
 
 
 class JournalEntry(models.Model):
+    SENTIMENT_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('completed', 'Completed'),
+        ('estimated', 'Estimated'),  # Scored by the local fallback, to be scored again
+        ('failed', 'Failed'),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     entry_date = models.DateTimeField(auto_now_add=True)
     content = models.TextField()
     positive_score = models.FloatField(default=0)
     negative_score = models.FloatField(default=0)
+    sentiment_status = models.CharField(max_length=20, choices=SENTIMENT_STATUS_CHOICES, default='pending')
 
     class Meta:
         ordering = ['-entry_date']
+        indexes = [
+            models.Index(fields=['user', '-entry_date']),
+        ]
+
+
+def prescription_upload_to(instance, filename):
+    """Name uploads after their content hash so identical files share storage"""
+    if instance.content_hash:
+        extension = os.path.splitext(filename)[1].lower()
+        return f"prescriptions/{instance.content_hash}{extension}"
+    return f"prescriptions/{filename}"
 
 
 class Prescription(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    prescription_image = models.ImageField(upload_to='prescriptions/', null=True, blank=True)
-    prescription_file = models.FileField(upload_to='prescriptions/', null=True, blank=True)  # For PDF support
+    prescription_image = models.ImageField(upload_to=prescription_upload_to, storage=prescription_storage, null=True, blank=True)
+    prescription_file = models.FileField(upload_to=prescription_upload_to, storage=prescription_storage, null=True, blank=True)  # For PDF support
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # SHA-256 of the uploaded file
     extracted_data = models.JSONField(default=dict)  # Store structured extracted data
     extracted_text = models.TextField(blank=True)  # Store HTML formatted text
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    error_message = models.TextField(blank=True)  # Last extraction error, if any
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -66,4 +134,59 @@ class Prescription(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"Prescription for {self.user.username} - {self.created_at.strftime('%Y-%m-%d')}"
\ No newline at end of file
+        return f"Prescription for {self.user.username} - {self.created_at.strftime('%Y-%m-%d')}"
+
+    @property
+    def is_processing(self):
+        """Whether extraction is still queued or running"""
+        return self.status in ('pending', 'processing')
+
+
+class PrescriptionExtraction(models.Model):
+    """Extraction results cached by file content hash, per user"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='prescription_extractions')
+    content_hash = models.CharField(max_length=64)
+    extracted_data = models.JSONField(default=dict)
+    extracted_text = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'content_hash']
+
+    def __str__(self):
+        return f"Extraction for {self.user.username} - {self.content_hash[:12]}"
+
+
+class DailyWellness(models.Model):
+    """Per-user, per-day rollup of every wellness signal, kept current by app/signals.py"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_wellness')
+    date = models.DateField()
+
+    # Journal
+    journal_entries = models.PositiveIntegerField(default=0)
+    journal_pending = models.PositiveIntegerField(default=0)
+    journal_positive = models.FloatField(null=True, blank=True)
+    journal_negative = models.FloatField(null=True, blank=True)
+
+    # Assessments
+    assessments = models.PositiveIntegerField(default=0)
+    assessment_score = models.FloatField(null=True, blank=True)
+
+    # Voice calls (0-25 scale, as in CallSentiment)
+    calls = models.PositiveIntegerField(default=0)
+    call_positive = models.FloatField(null=True, blank=True)
+    call_negative = models.FloatField(null=True, blank=True)
+
+    # Chatbot
+    chat_messages = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'date']
+        ordering = ['-date']
+        verbose_name_plural = 'Daily wellness'
+
+    def __str__(self):
+        return f"Wellness for {self.user.username} - {self.date}"
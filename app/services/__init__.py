@@ -0,0 +1 @@
+# Services package for the core app
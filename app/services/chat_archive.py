@@ -0,0 +1,196 @@
+"""
+Cold storage for old chatbot turns
+
+ChatHistory only needs to hold recent conversation: the chatbot page reads the
+newest page and scrolls back from there. archive_chat_history() moves turns
+older than a cutoff into one ChatArchive row per user and calendar month,
+stored as compressed JSON lines (zstd, or zlib when zstandard is not
+installed). read_archived_chat() serves the rare deep scroll-back from those
+blobs, so get_chat_page() can page past the hot table transparently.
+
+Archived turns are no longer in the full-text search index. Each archive keeps
+its per-day turn counts, which the DailyWellness rollup adds to the hot rows.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from app.models import ChatArchive, ChatHistory
+import json
+import logging
+import zlib
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = settings.CHAT_ARCHIVE_AFTER_DAYS
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 9
+DELETE_BATCH_SIZE = 500
+
+ARCHIVE_FIELDS = ("id", "message", "response", "timestamp")
+
+
+class ChatArchiveError(Exception):
+    """Raised when an archive blob cannot be written or read"""
+
+
+def compress(payload):
+    """
+    Compress archive bytes with the best available codec
+
+    Returns:
+        tuple: (codec name, compressed bytes)
+    """
+    if ZSTD_AVAILABLE:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    return "zlib", zlib.compress(payload, ZLIB_LEVEL)
+
+
+def decompress(codec, data):
+    """
+    Raises:
+        ChatArchiveError: If the codec is unknown or its library is missing
+    """
+    data = bytes(data)
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ChatArchiveError("zstandard is required to read zstd chat archives")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ChatArchiveError(f"Unknown chat archive codec: {codec}")
+
+
+def encode_rows(rows):
+    lines = [
+        json.dumps({**row, "timestamp": row["timestamp"].isoformat()}, separators=(",", ":"))
+        for row in rows
+    ]
+    return "\n".join(lines).encode("utf-8")
+
+
+def decode_rows(archive):
+    """Turns stored in an archive, oldest first, as ChatHistory-like dicts"""
+    rows = []
+    for line in decompress(archive.codec, archive.data).decode("utf-8").splitlines():
+        row = json.loads(line)
+        row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+        rows.append(row)
+    return rows
+
+
+def month_start(moment):
+    local = timezone.localtime(moment)
+    return date(local.year, local.month, 1)
+
+
+def _next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def archive_chat_history(older_than_days=ARCHIVE_AFTER_DAYS, user_ids=None):
+    """
+    Move chat turns older than a cutoff into per-user, per-month archives
+
+    Each month is written and removed from ChatHistory in its own transaction,
+    merging into the month's existing archive, so the job can be interrupted
+    and rerun at any time.
+
+    Args:
+        older_than_days (int): Age after which turns are archived
+        user_ids (list): Restrict the run to these users, None for everyone
+
+    Returns:
+        int: Number of turns archived
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    stale = ChatHistory.objects.filter(timestamp__lt=cutoff)
+    if user_ids is not None:
+        stale = stale.filter(user_id__in=user_ids)
+
+    archived = 0
+    for user_id in list(stale.order_by().values_list("user_id", flat=True).distinct()):
+        user_stale = ChatHistory.objects.filter(user_id=user_id, timestamp__lt=cutoff).order_by("timestamp", "id")
+        # Oldest remaining month first, until nothing before the cutoff is left
+        while (oldest := user_stale.values_list("timestamp", flat=True).first()) is not None:
+            month = month_start(oldest)
+            month_end = timezone.make_aware(datetime.combine(_next_month(month), datetime.min.time()))
+            rows = list(user_stale.filter(timestamp__lt=month_end).values(*ARCHIVE_FIELDS))
+            archived += _archive_month(user_id, month, rows)
+
+    logger.info(f"Archived {archived} chat turns older than {cutoff:%Y-%m-%d}")
+    return archived
+
+
+@transaction.atomic
+def _archive_month(user_id, month, rows):
+    moved_ids = [row["id"] for row in rows]
+
+    archive = ChatArchive.objects.select_for_update().filter(user_id=user_id, month=month).first()
+    if archive:
+        known = set(moved_ids)
+        rows = sorted(
+            [row for row in decode_rows(archive) if row["id"] not in known] + rows,
+            key=lambda row: (row["timestamp"], row["id"]),
+        )
+    else:
+        archive = ChatArchive(user_id=user_id, month=month)
+
+    archive.codec, archive.data = compress(encode_rows(rows))
+    archive.message_count = len(rows)
+    archive.daily_counts = dict(Counter(timezone.localdate(row["timestamp"]).isoformat() for row in rows))
+    archive.first_timestamp = rows[0]["timestamp"]
+    archive.last_timestamp = rows[-1]["timestamp"]
+    archive.save()
+
+    # A raw delete skips the per-row post_delete signals; the rollup counts
+    # are unchanged because the archive's daily_counts now cover these turns
+    for start in range(0, len(moved_ids), DELETE_BATCH_SIZE):
+        batch = moved_ids[start:start + DELETE_BATCH_SIZE]
+        ChatHistory.objects.filter(id__in=batch)._raw_delete(ChatHistory.objects.db)
+
+    return len(moved_ids)
+
+
+def archived_chat_count(user_id, day):
+    """Number of archived turns a user had on one local day"""
+    counts = (
+        ChatArchive.objects.filter(user_id=user_id, month=day.replace(day=1))
+        .values_list("daily_counts", flat=True)
+        .first()
+    )
+    return (counts or {}).get(day.isoformat(), 0)
+
+
+def read_archived_chat(user, before=None, limit=1):
+    """
+    Archived turns older than a (timestamp, id) position, newest first
+
+    Args:
+        user (User): Owner of the history
+        before (tuple): (timestamp, id) to read below, None for the newest archived turn
+        limit (int): Maximum number of turns
+
+    Returns:
+        list: Dicts with id, message, response and timestamp
+    """
+    archives = ChatArchive.objects.filter(user=user).order_by("-month")
+    if before:
+        archives = archives.filter(first_timestamp__lte=before[0])
+
+    found = []
+    for archive in archives.iterator(chunk_size=1):
+        for row in reversed(decode_rows(archive)):
+            if before and (row["timestamp"], row["id"]) >= before:
+                continue
+            found.append(row)
+            if len(found) == limit:
+                return found
+    return found
@@ -0,0 +1,85 @@
+"""
+Keyset pagination over a user's chat history
+
+Pages are addressed by a (timestamp, id) cursor instead of an offset, so the
+database seeks straight to the cursor on the (user, -timestamp, -id) index and
+every page costs the same however far back the user scrolls. Once the hot
+table runs out, pages continue into the monthly archives written by
+app/services/chat_archive.py.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db.models import Q
+from app.models import ChatHistory
+from app.services.chat_archive import read_archived_chat
+
+PAGE_SIZE = settings.CHAT_HISTORY_PAGE_SIZE
+MAX_PAGE_SIZE = settings.CHAT_HISTORY_MAX_PAGE_SIZE
+
+PAGE_FIELDS = ("id", "message", "response", "timestamp")
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def encode_cursor(timestamp, pk):
+    """Cursor pointing just before a message: '<epoch microseconds>-<id>'"""
+    # Integer arithmetic: a float timestamp cannot hold every microsecond exactly
+    micros = (timestamp - EPOCH) // MICROSECOND
+    return f"{micros}-{pk}"
+
+
+def decode_cursor(cursor):
+    """
+    Parse a cursor produced by encode_cursor()
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    micros, pk = cursor.split("-", 1)
+    timestamp = EPOCH + int(micros) * MICROSECOND
+    return timestamp, int(pk)
+
+
+def get_chat_page(user, before=None, limit=PAGE_SIZE):
+    """
+    Fetch one page of chat history older than a cursor
+
+    Args:
+        user (User): Owner of the history
+        before (str): Cursor from a previous page, None for the newest messages
+        limit (int): Messages per page, capped at CHAT_HISTORY_MAX_PAGE_SIZE
+
+    Returns:
+        tuple: (messages oldest first as dicts, cursor for the next older page
+            or None when the start of the history is reached)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    queryset = ChatHistory.objects.filter(user=user)
+    position = decode_cursor(before) if before else None
+
+    if position:
+        timestamp, pk = position
+        # The plain range bound lets the index seek to the cursor; the OR breaks ties
+        queryset = queryset.filter(
+            Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk),
+            timestamp__lte=timestamp,
+        )
+
+    # One extra row tells whether an older page exists
+    rows = list(queryset.order_by("-timestamp", "-id").values(*PAGE_FIELDS)[:limit + 1])
+    if len(rows) <= limit:
+        # Hot table exhausted; everything older lives in the archives
+        if rows:
+            position = (rows[-1]["timestamp"], rows[-1]["id"])
+        rows += read_archived_chat(user, before=position, limit=limit + 1 - len(rows))
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"]) if has_more else None
+    rows.reverse()
+    return rows, next_cursor
@@ -0,0 +1,103 @@
+"""
+Dashboard data computed in the database and cached per user
+
+The mood chart reads the per-day DailyWellness rollup, so its cost follows
+the number of days with entries rather than the number of entries. Both the
+chart series and the recent assessment results are cached until the user's
+journal or results change (see app/signals.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from app.models import DailyWellness, TestResult
+import math
+
+DASHBOARD_CACHE_TIMEOUT = settings.DASHBOARD_CACHE_TIMEOUT
+CHART_MAX_POINTS = settings.DASHBOARD_CHART_MAX_POINTS
+RECENT_RESULTS_LIMIT = settings.DASHBOARD_RECENT_RESULTS
+
+
+def dashboard_cache_key(user_id):
+    return f"dashboard:{user_id}"
+
+
+def invalidate_dashboard_cache(user_id):
+    """Drop the cached dashboard data of a user"""
+    cache.delete(dashboard_cache_key(user_id))
+
+
+def get_dashboard_data(user):
+    """
+    Return the chart series and recent results shown on the dashboard
+
+    Args:
+        user (User): Dashboard owner
+
+    Returns:
+        dict: 'chart' with dates/positive/negative/pending series and
+            'results' with the most recent assessment results as dicts
+    """
+    key = dashboard_cache_key(user.pk)
+    data = cache.get(key)
+    if data is None:
+        data = {
+            "chart": build_mood_series(user),
+            "results": list(
+                TestResult.objects.filter(user=user)
+                .order_by("-date")
+                .values("date", "total_score", "Status")[:RECENT_RESULTS_LIMIT]
+            ),
+        }
+        cache.set(key, data, DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+def build_mood_series(user, max_points=CHART_MAX_POINTS):
+    """
+    Daily average journal sentiment, read from the DailyWellness rollup
+
+    Days whose entries are all still being scored have no average and are
+    plotted as gaps. Long histories are downsampled to at most max_points.
+    """
+    days = list(
+        DailyWellness.objects.filter(user=user, journal_entries__gt=0)
+        .order_by("date")
+        .values_list(
+            "date",
+            "journal_positive",
+            "journal_negative",
+            F("journal_entries") - F("journal_pending"),
+            "journal_pending",
+        )
+    )
+
+    pending = sum(row[4] for row in days)
+    if max_points and len(days) > max_points:
+        days = _downsample(days, math.ceil(len(days) / max_points))
+
+    return {
+        "dates": [day.strftime("%Y-%m-%d") for day, *_ in days],
+        "positive": [_round(positive) for _, positive, *_ in days],
+        "negative": [_round(negative) for _, _, negative, *_ in days],
+        "pending": pending,
+    }
+
+
+def _downsample(days, bucket_size):
+    """Merge consecutive days into buckets, weighting averages by entries no longer pending"""
+    buckets = []
+    for start in range(0, len(days), bucket_size):
+        bucket = days[start:start + bucket_size]
+        scored_days = [row for row in bucket if row[1] is not None]
+        scored = sum(row[3] for row in scored_days)
+        if scored:
+            positive = sum(row[1] * row[3] for row in scored_days) / scored
+            negative = sum(row[2] * row[3] for row in scored_days) / scored
+        else:
+            positive = negative = None
+        buckets.append((bucket[0][0], positive, negative, scored, sum(row[4] for row in bucket)))
+    return buckets
+
+
+def _round(value):
+    return None if value is None else round(value, 4)
@@ -0,0 +1,99 @@
+"""
+Whole-word keyword matching shared by the sentiment scorers
+
+All terms of a lexicon are compiled into a single regular expression shaped
+as a prefix trie, so the text is scanned once no matter how many categories
+or terms there are, and each position only walks as deep as the longest term
+sharing its prefix. Matches must start and end on word boundaries, so "sad"
+does not hit "sadly" and "hard" does not hit "hardware".
+"""
+import re
+
+# Characters in a term that match a family of characters in the text
+_FLEXIBLE_CHARS = {
+    " ": r"\s+",
+    "'": "['’]",
+}
+
+
+def normalize_term(term):
+    """Canonical form used to map matched text back to its lexicon term"""
+    return " ".join(term.lower().replace("’", "'").split())
+
+
+def _trie_pattern(terms):
+    """Build an alternation regex with shared prefixes factored out"""
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _node_pattern(trie)
+
+
+def _node_pattern(node):
+    branches = [
+        _FLEXIBLE_CHARS.get(char, re.escape(char)) + _node_pattern(child)
+        for char, child in sorted(node.items())
+        if char
+    ]
+    if not branches:
+        return ""
+
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        # A term ends here; the greedy optional still prefers the longer term
+        return "(?:" + body + ")?"
+    return body
+
+
+class LexiconMatcher:
+    """
+    Count and locate lexicon terms per category in a single pass
+
+    Args:
+        categories (dict): Category name mapped to an iterable of terms.
+            Terms are case-insensitive and may be multi-word phrases.
+    """
+
+    def __init__(self, categories):
+        self.categories = list(categories)
+        self.term_categories = {}
+        for category, terms in categories.items():
+            for term in terms:
+                self.term_categories.setdefault(normalize_term(term), []).append(category)
+
+        self.pattern = re.compile(
+            r"(?<!\w)(?:" + _trie_pattern(self.term_categories) + r")(?!\w)",
+            re.IGNORECASE,
+        )
+
+    def scan(self, text):
+        """
+        Find every lexicon term in the text
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            dict: For each category, 'count' of matches, the distinct 'terms'
+                found and the (start, end, term) 'spans' in text order
+        """
+        results = {category: {"count": 0, "terms": set(), "spans": []} for category in self.categories}
+        if not text:
+            return results
+
+        for match in self.pattern.finditer(text):
+            term = normalize_term(match.group())
+            for category in self.term_categories[term]:
+                result = results[category]
+                result["count"] += 1
+                result["terms"].add(term)
+                result["spans"].append((match.start(), match.end(), term))
+
+        return results
+
+    def counts(self, text):
+        """Number of matches per category"""
+        return {category: result["count"] for category, result in self.scan(text).items()}
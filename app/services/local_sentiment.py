@@ -0,0 +1,225 @@
+"""
+Local CPU sentiment engines used alongside the Cloudflare model
+
+Both engines return the same dict as parse_sentiment_result() so callers do
+not care where a score came from. The lexicon model has no dependencies and
+scores a journal entry in well under a millisecond. A quantized DistilBERT
+exported to ONNX is used instead when onnxruntime and tokenizers are installed
+and SENTIMENT_ONNX_MODEL_PATH points at the exported model.
+"""
+from django.conf import settings
+import logging
+import math
+import os
+import re
+import threading
+
+try:
+    import numpy as np
+    import onnxruntime
+    from tokenizers import Tokenizer
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Word weights on a -4..4 scale, in the spirit of the VADER lexicon
+SENTIMENT_LEXICON = {
+    # Positive
+    "happy": 2.7, "happier": 2.4, "glad": 2.0, "joy": 2.8, "joyful": 2.9,
+    "good": 1.9, "great": 3.1, "better": 1.9, "best": 3.2, "fine": 0.8,
+    "well": 1.1, "calm": 1.3, "peaceful": 2.2, "relaxed": 2.2, "content": 1.5,
+    "love": 3.2, "loved": 2.9, "lovely": 2.8, "enjoy": 2.2,
+    "enjoyed": 2.3, "fun": 2.3, "excited": 2.2, "exciting": 2.2, "hopeful": 2.3,
+    "hope": 1.9, "grateful": 2.6, "thankful": 2.4, "proud": 2.1, "confident": 2.2,
+    "energetic": 1.9, "motivated": 1.9, "productive": 1.6, "rested": 1.3,
+    "smile": 1.5, "smiled": 1.5, "laugh": 2.6, "laughed": 2.6, "optimistic": 2.5,
+    "wonderful": 2.7, "amazing": 2.8, "awesome": 3.1, "beautiful": 2.9,
+    "nice": 1.8, "pleased": 1.9, "relieved": 1.5, "safe": 1.9, "strong": 2.3,
+    "supported": 1.8, "accomplished": 1.8, "positive": 2.6, "okay": 0.9,
+    # Negative
+    "sad": -2.1, "sadness": -1.9, "unhappy": -1.8, "depressed": -2.3,
+    "depression": -2.7, "hopeless": -2.0, "worthless": -1.9, "helpless": -2.0,
+    "lonely": -1.8, "alone": -1.0, "empty": -0.8, "numb": -1.3, "cry": -2.1,
+    "cried": -1.6, "crying": -2.1, "tears": -0.9, "hurt": -2.4, "pain": -2.3,
+    "painful": -2.4, "suffer": -2.5, "suffering": -2.1, "tired": -1.9,
+    "exhausted": -1.5, "drained": -1.4, "anxious": -1.0, "anxiety": -0.7,
+    "worried": -1.2, "worry": -1.9, "stress": -1.8, "stressed": -1.4,
+    "scared": -2.2, "afraid": -2.0, "fear": -2.2, "panic": -2.3, "angry": -2.3,
+    "anger": -2.7, "upset": -1.6, "frustrated": -2.4, "annoyed": -1.6,
+    "bad": -2.5, "worse": -2.1, "worst": -3.1, "terrible": -2.1, "awful": -2.0,
+    "horrible": -2.5, "hate": -2.7, "miserable": -2.2, "guilty": -1.8,
+    "ashamed": -2.1, "failure": -2.3, "failed": -2.3, "difficult": -1.5,
+    "hard": -0.4, "struggle": -1.4, "struggling": -1.6, "overwhelmed": -1.5,
+    "broken": -1.6, "useless": -1.8, "sick": -1.7, "negative": -2.7,
+    "insomnia": -1.4, "restless": -1.1, "irritable": -1.8, "disappointed": -1.9,
+}
+
+NEGATIONS = frozenset([
+    "not", "no", "never", "none", "nobody", "nothing", "neither", "nor",
+    "cannot", "cant", "dont", "didnt", "doesnt", "isnt", "wasnt", "arent",
+    "werent", "wont", "wouldnt", "shouldnt", "couldnt", "hardly", "barely",
+])
+
+INTENSIFIERS = {
+    "very": 0.3, "really": 0.3, "so": 0.3, "extremely": 0.5, "incredibly": 0.5,
+    "totally": 0.3, "completely": 0.4, "absolutely": 0.4, "deeply": 0.4,
+    "slightly": -0.3, "somewhat": -0.3, "little": -0.3, "kind": -0.2, "bit": -0.3,
+}
+
+# Tokens after a negation whose polarity is flipped
+NEGATION_SCOPE = 3
+# Damping applied to a negated word, as negation rarely means the full opposite
+NEGATION_FACTOR = -0.74
+# Normalization constant mapping the summed valence into -1..1
+NORMALIZATION_ALPHA = 15
+
+TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+class LexiconSentimentModel:
+    """
+    Dependency-free sentiment scoring from a weighted word lexicon
+
+    Each token is looked up once in a dict, with simple handling of negation
+    ("not happy") and intensifiers ("very tired"). The summed valence is
+    squashed into a positive/negative probability pair.
+    """
+
+    name = "lexicon"
+
+    def __init__(self, lexicon=None):
+        self.lexicon = lexicon or SENTIMENT_LEXICON
+
+    def analyze(self, text):
+        """
+        Score the sentiment of a piece of text
+
+        Args:
+            text (str): Text to classify
+
+        Returns:
+            dict: Sentiment scores, see parse_sentiment_result()
+        """
+        tokens = [token.replace("'", "") for token in TOKEN_PATTERN.findall(text.lower())]
+
+        valence = 0.0
+        matches = 0
+        negated_until = -1
+        boost = 0.0
+
+        for index, token in enumerate(tokens):
+            if token in NEGATIONS:
+                negated_until = index + NEGATION_SCOPE
+                continue
+            if token in INTENSIFIERS:
+                boost += INTENSIFIERS[token]
+                continue
+
+            weight = self.lexicon.get(token)
+            if weight is None:
+                boost = 0.0
+                continue
+
+            weight *= 1 + boost
+            if index <= negated_until:
+                weight *= NEGATION_FACTOR
+            valence += weight
+            matches += 1
+            boost = 0.0
+
+        compound = valence / math.sqrt(valence * valence + NORMALIZATION_ALPHA)
+        positive = round((1 + compound) / 2, 4)
+        negative = round(1 - positive, 4)
+
+        return {
+            "positive": positive,
+            "negative": negative,
+            "label": "NEGATIVE" if negative > positive else "POSITIVE",
+            "raw_result": {"engine": self.name, "compound": compound, "matches": matches},
+        }
+
+
+class OnnxSentimentModel:
+    """
+    Quantized DistilBERT SST-2 classifier run through ONNX Runtime
+
+    Expects a directory with model.onnx (the int8 export of
+    distilbert-base-uncased-finetuned-sst-2-english) and its tokenizer.json.
+    """
+
+    name = "onnx"
+    max_length = 512
+
+    def __init__(self, model_dir):
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "model.onnx"),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def analyze(self, text):
+        """
+        Score the sentiment of a piece of text
+
+        Args:
+            text (str): Text to classify
+
+        Returns:
+            dict: Sentiment scores, see parse_sentiment_result()
+        """
+        encoding = self.tokenizer.encode(text)
+        inputs = {
+            "input_ids": np.array([encoding.ids], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask], dtype=np.int64),
+        }
+        inputs = {name: value for name, value in inputs.items() if name in self.input_names}
+
+        logits = self.session.run(None, inputs)[0][0]
+        probabilities = np.exp(logits - logits.max())
+        probabilities /= probabilities.sum()
+        negative, positive = float(probabilities[0]), float(probabilities[1])
+
+        return {
+            "positive": positive,
+            "negative": negative,
+            "label": "NEGATIVE" if negative > positive else "POSITIVE",
+            "raw_result": {"engine": self.name, "logits": [float(x) for x in logits]},
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_local_sentiment_engine():
+    """Return the process-wide local engine, preferring ONNX when it is configured"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _load_engine()
+    return _engine
+
+
+def _load_engine():
+    model_dir = settings.SENTIMENT_ONNX_MODEL_PATH
+    if model_dir:
+        if not ONNX_AVAILABLE:
+            logger.warning("SENTIMENT_ONNX_MODEL_PATH is set but onnxruntime/tokenizers are not installed")
+        else:
+            try:
+                engine = OnnxSentimentModel(model_dir)
+                logger.info(f"Loaded ONNX sentiment model from {model_dir}")
+                return engine
+            except Exception as e:
+                logger.error(f"Could not load ONNX sentiment model, using lexicon: {e}")
+
+    return LexiconSentimentModel()
@@ -0,0 +1,60 @@
+"""
+Content-hash cache of prescription extraction results
+
+Results are keyed by the SHA-256 of the uploaded file and scoped to the user
+who uploaded it, so one user's extraction is never served to another.
+"""
+import hashlib
+from app.models import PrescriptionExtraction
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def hash_uploaded_file(uploaded_file):
+    """
+    Compute the content hash of an uploaded file chunk by chunk
+
+    Args:
+        uploaded_file: Django UploadedFile or File
+
+    Returns:
+        str: SHA-256 hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def get_cached_extraction(user, content_hash):
+    """Return the user's earlier extraction for this content, if any"""
+    if not content_hash:
+        return None
+    return PrescriptionExtraction.objects.filter(
+        user=user, content_hash=content_hash
+    ).first()
+
+
+def apply_cached_extraction(prescription, cached):
+    """Copy a cached extraction onto a prescription and mark it completed"""
+    prescription.extracted_text = cached.extracted_text
+    prescription.extracted_data = cached.extracted_data
+    prescription.status = 'completed'
+    prescription.error_message = ''
+
+
+def store_extraction(prescription):
+    """Remember a completed extraction for future uploads of the same file"""
+    if not prescription.content_hash:
+        return
+    PrescriptionExtraction.objects.update_or_create(
+        user=prescription.user,
+        content_hash=prescription.content_hash,
+        defaults={
+            'extracted_text': prescription.extracted_text,
+            'extracted_data': prescription.extracted_data,
+        }
+    )
+    logger.info(f"Cached extraction for prescription {prescription.id}")
@@ -0,0 +1,73 @@
+"""
+Gemini-backed extraction of prescription details
+"""
+import google.generativeai as genai
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+genai.configure(api_key=settings.GEMINI_API_KEY)
+
+EXTRACTION_MODEL = "gemini-2.5-pro"
+
+EXTRACTION_PROMPT = """You are an expert medical data extractor. Your task is to analyze the provided medical document and extract only the most critical information.
+
+Format the output using simple, clean HTML.
+- Use <h3> for section titles (e.g., 'Patient Details').
+- Use <ul> and <li> for lists of medications or other items.
+- Use <strong> to highlight key terms like 'Name:' or medication names.
+- Do not include <html>, <head>, or <body> tags. Do not use any CSS or <style> tags.
+
+**Extraction Rules:**
+1.  **Do not add any introductory text or preamble.** Directly start with the extracted HTML data.
+2.  Extract the following sections if present:
+    *   **Patient Details**: Include name, age, and gender.
+    *   **Prescribing Doctor**: Include the doctor's name and clinic/hospital.
+    *   **Diagnosis**: The primary diagnosis mentioned in the prescription.
+    *   **Date of Prescription**: The date the prescription was issued.
+    *   **Medications**: For each medication, create a list item with its name, dosage, and frequency/instructions.
+    *   **Instructions**: Include any other special instructions for the patient.
+
+3.  **Ignore all non-essential information**: This includes pharmacy logos, addresses, phone numbers, barcodes, etc.
+4.  If the document does not appear to be a medical prescription, respond with only this exact text: 'This document does not appear to be a medical prescription.'"""
+
+
+def extract_prescription_info(parts):
+    """
+    Extract information from prescription using Gemini AI
+
+    Args:
+        parts (list): Document parts as dicts with 'mime_type' and either
+            'data' (bytes) or 'path' (file on disk), usually produced by
+            preprocess_prescription()
+
+    Returns:
+        str: Extracted information formatted as HTML
+
+    Raises:
+        Exception: If the Gemini request fails, so callers can retry
+    """
+    # Using Gemini 2.5 Pro for better document understanding and extraction
+    model = genai.GenerativeModel(EXTRACTION_MODEL)
+
+    uploaded_files = []
+    try:
+        content = [EXTRACTION_PROMPT]
+        for part in parts:
+            if "path" in part:
+                # Stream large originals from disk through the File API instead of inlining them
+                uploaded = genai.upload_file(path=part["path"], mime_type=part["mime_type"])
+                uploaded_files.append(uploaded)
+                content.append(uploaded)
+            else:
+                content.append(part)
+
+        response = model.generate_content(content)
+        return response.text
+    finally:
+        for uploaded in uploaded_files:
+            try:
+                genai.delete_file(uploaded.name)
+            except Exception as e:
+                logger.warning(f"Failed to delete uploaded Gemini file {uploaded.name}: {e}")
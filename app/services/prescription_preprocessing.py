@@ -0,0 +1,177 @@
+"""
+Image preprocessing applied to prescriptions before Gemini extraction
+
+Phone photos are auto-oriented, cropped to the paper, downscaled, converted
+to grayscale and re-encoded as JPEG. PDFs are rasterized page by page so that
+blank pages are never sent to the model; PDFs with more than
+PRESCRIPTION_PDF_MAX_PAGES pages of content are sent whole instead.
+"""
+from io import BytesIO
+from django.conf import settings
+from PIL import Image, ImageFilter, ImageOps, ImageStat
+import logging
+import os
+
+try:
+    import fitz  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+TARGET_LONG_EDGE = settings.PRESCRIPTION_TARGET_LONG_EDGE
+JPEG_QUALITY = settings.PRESCRIPTION_JPEG_QUALITY
+PDF_RENDER_DPI = settings.PRESCRIPTION_PDF_DPI
+PDF_MAX_PAGES = settings.PRESCRIPTION_PDF_MAX_PAGES
+
+# Size of the thumbnail used to locate the document inside a photo
+CROP_ANALYSIS_SIZE = 256
+# Only crop when the detected document covers a plausible share of the photo
+MIN_DOCUMENT_AREA = 0.3
+MAX_DOCUMENT_AREA = 0.95
+CROP_MARGIN = 0.02
+
+
+def preprocess_prescription(file_path, mime_type):
+    """
+    Shrink an uploaded prescription into the parts sent to Gemini
+
+    The upload is read from disk: images are decoded at reduced scale where
+    the format allows it and PDFs are opened page by page, so memory use does
+    not grow with the size of the original file.
+
+    Args:
+        file_path (str): Path of the uploaded file on local disk
+        mime_type (str): MIME type of the upload
+
+    Returns:
+        list: Content parts as dicts with 'mime_type' and either 'data'
+            (bytes of a preprocessed page) or 'path' (original file on disk)
+    """
+    original_parts = [{"mime_type": mime_type, "path": file_path}]
+
+    try:
+        if mime_type == "application/pdf":
+            parts = _preprocess_pdf(file_path)
+        elif mime_type.startswith("image/"):
+            with Image.open(file_path) as image:
+                parts = [_encode_image(_prepare_photo(image))]
+        else:
+            parts = []
+    except Exception as e:
+        logger.warning(f"Prescription preprocessing failed, sending original file: {e}")
+        parts = []
+
+    original_size = os.path.getsize(file_path)
+    processed_size = sum(len(part["data"]) for part in parts)
+
+    # Keep the upload untouched when preprocessing cannot make it smaller
+    if not parts or processed_size >= original_size:
+        logger.info(f"Prescription preprocessing skipped ({mime_type}, {original_size} bytes)")
+        return original_parts
+
+    saved = original_size - processed_size
+    logger.info(
+        f"Prescription preprocessed: {original_size} -> {processed_size} bytes "
+        f"({saved} bytes, {saved / original_size:.0%} saved, {len(parts)} part(s))"
+    )
+    return parts
+
+
+def _prepare_photo(image):
+    """Orient, grayscale, crop and downscale a photographed prescription"""
+    # JPEGs can be decoded directly at a reduced scale, avoiding a full-size bitmap
+    image.draft("L", (TARGET_LONG_EDGE, TARGET_LONG_EDGE))
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("L")
+    image = _crop_to_document(image)
+    return _downscale(image)
+
+
+def _downscale(image):
+    """Limit the long edge to the target size, never upscaling"""
+    if max(image.size) > TARGET_LONG_EDGE:
+        image = image.copy()
+        image.thumbnail((TARGET_LONG_EDGE, TARGET_LONG_EDGE), Image.LANCZOS)
+    return image
+
+
+def _crop_to_document(image):
+    """
+    Crop a grayscale photo to the bright paper region
+
+    The paper is found on a small, smoothed thumbnail by thresholding at the
+    mean brightness. The crop is skipped when the detected region is too small
+    to be the document or already fills the frame.
+    """
+    preview = image.copy()
+    preview.thumbnail((CROP_ANALYSIS_SIZE, CROP_ANALYSIS_SIZE))
+    preview = preview.filter(ImageFilter.MedianFilter(5))
+
+    threshold = ImageStat.Stat(preview).mean[0]
+    mask = preview.point(lambda p: 255 if p > threshold else 0)
+    bbox = mask.getbbox()
+    if not bbox:
+        return image
+
+    left, top, right, bottom = bbox
+    coverage = ((right - left) * (bottom - top)) / (preview.width * preview.height)
+    if coverage < MIN_DOCUMENT_AREA or coverage > MAX_DOCUMENT_AREA:
+        return image
+
+    scale_x = image.width / preview.width
+    scale_y = image.height / preview.height
+    margin_x = int(image.width * CROP_MARGIN)
+    margin_y = int(image.height * CROP_MARGIN)
+
+    return image.crop((
+        max(int(left * scale_x) - margin_x, 0),
+        max(int(top * scale_y) - margin_y, 0),
+        min(int(right * scale_x) + margin_x, image.width),
+        min(int(bottom * scale_y) + margin_y, image.height),
+    ))
+
+
+def _encode_image(image):
+    """Encode a prepared page as an optimized JPEG part"""
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return {"mime_type": "image/jpeg", "data": buffer.getvalue()}
+
+
+def _page_has_content(page):
+    """Whether a PDF page carries text or scanned imagery worth extracting"""
+    return bool(page.get_text().strip()) or bool(page.get_images(full=False))
+
+
+def _preprocess_pdf(file_path):
+    """
+    Rasterize the non-blank pages of a PDF into grayscale JPEG parts
+
+    Returns:
+        list: One part per page with content, or an empty list (send the
+            original PDF) when there are more than PDF_MAX_PAGES of them
+    """
+    if not PYMUPDF_AVAILABLE:
+        logger.debug("PyMuPDF not installed, sending PDF without preprocessing")
+        return []
+
+    parts = []
+    zoom = PDF_RENDER_DPI / 72
+    with fitz.open(file_path, filetype="pdf") as document:
+        for page in document:
+            if not _page_has_content(page):
+                continue
+            if len(parts) >= PDF_MAX_PAGES:
+                # Rasterizing only some pages would silently drop the rest of the prescription
+                logger.warning(
+                    f"PDF has more than {PDF_MAX_PAGES} pages with content, sending the original file"
+                )
+                return []
+
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY)
+            image = Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples)
+            parts.append(_encode_image(_downscale(image)))
+
+    return parts
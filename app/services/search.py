@@ -0,0 +1,222 @@
+"""
+Full-text search over a user's journal entries and chat history
+
+The index lives in the database and is maintained by it on every write:
+- SQLite: FTS5 tables (app_journalentry_fts, app_chathistory_fts) kept in
+  sync by triggers. The owner's id is indexed as a token, so the user filter
+  is resolved inside the full-text index instead of by scanning its matches.
+- PostgreSQL: a generated tsvector column (search_vector) with a GIN index
+  on (user_id, search_vector) through btree_gin, for the same reason.
+
+Both are created by migration 0015_full_text_search. Other databases fall
+back to an unindexed icontains match so search keeps working in development.
+
+Snippets are returned as HTML with the user's text escaped and matches
+wrapped in <mark>.
+"""
+from django.conf import settings
+from datetime import timezone as dt_timezone
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.html import escape
+from app.models import ChatHistory, JournalEntry
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+MAX_RESULTS = settings.SEARCH_MAX_RESULTS
+MAX_TERMS = 8
+SNIPPET_WORDS = 16
+
+# Highlight markers the database wraps around matches; they cannot occur in
+# escaped text, so they are swapped for <mark> tags after escaping
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+_TERM_RE = re.compile(r"\w+")
+
+
+def query_terms(query):
+    """Split a raw search box query into at most MAX_TERMS lowercase words"""
+    return _TERM_RE.findall((query or "").lower())[:MAX_TERMS]
+
+
+def highlight(snippet):
+    """Escape a database snippet and turn its match markers into <mark> tags"""
+    return escape(snippet or "").replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+
+def _fts5_match(terms, user_id, columns):
+    """
+    FTS5 query: every term must appear in one of the text columns, the last one
+    as a prefix so results show up while the user is still typing
+    """
+    phrases = [f'"{term}"' for term in terms]
+    phrases[-1] += "*"
+    return f'user_id : "{user_id}" AND {{{" ".join(columns)}}} : ({" AND ".join(phrases)})'
+
+
+def _tsquery(terms):
+    lexemes = [f"'{term}'" for term in terms]
+    lexemes[-1] += ":*"
+    return " & ".join(lexemes)
+
+
+_SQLITE_JOURNAL_SQL = f"""
+    SELECT e.id, e.entry_date,
+           snippet(app_journalentry_fts, 0, char(2), char(3), '…', {SNIPPET_WORDS}),
+           -bm25(app_journalentry_fts, 1.0, 0.0) AS rank
+    FROM app_journalentry_fts
+    JOIN app_journalentry e ON e.id = app_journalentry_fts.rowid
+    WHERE app_journalentry_fts MATCH %s
+    ORDER BY bm25(app_journalentry_fts, 1.0, 0.0)
+    LIMIT %s
+"""
+
+_SQLITE_CHAT_SQL = f"""
+    SELECT c.id, c.timestamp,
+           snippet(app_chathistory_fts, 0, char(2), char(3), '…', {SNIPPET_WORDS}),
+           snippet(app_chathistory_fts, 1, char(2), char(3), '…', {SNIPPET_WORDS}),
+           -bm25(app_chathistory_fts, 2.0, 1.0, 0.0) AS rank
+    FROM app_chathistory_fts
+    JOIN app_chathistory c ON c.id = app_chathistory_fts.rowid
+    WHERE app_chathistory_fts MATCH %s
+    ORDER BY bm25(app_chathistory_fts, 2.0, 1.0, 0.0)
+    LIMIT %s
+"""
+
+_HEADLINE_OPTIONS = f"StartSel={MATCH_START}, StopSel={MATCH_END}, MaxWords={SNIPPET_WORDS}, MinWords=5"
+
+# Headlines are only built for the rows that survive the LIMIT
+_POSTGRES_JOURNAL_SQL = """
+    SELECT e.id, e.entry_date, ts_headline('english', e.content, q, %s), hits.rank
+    FROM (
+        SELECT id, ts_rank_cd(search_vector, q) AS rank
+        FROM app_journalentry, to_tsquery('english', %s) q
+        WHERE user_id = %s AND search_vector @@ q
+        ORDER BY rank DESC
+        LIMIT %s
+    ) hits
+    JOIN app_journalentry e ON e.id = hits.id, to_tsquery('english', %s) q
+    ORDER BY hits.rank DESC
+"""
+
+_POSTGRES_CHAT_SQL = """
+    SELECT c.id, c.timestamp,
+           ts_headline('english', c.message, q, %s),
+           ts_headline('english', c.response, q, %s),
+           hits.rank
+    FROM (
+        SELECT id, ts_rank_cd(search_vector, q) AS rank
+        FROM app_chathistory, to_tsquery('english', %s) q
+        WHERE user_id = %s AND search_vector @@ q
+        ORDER BY rank DESC
+        LIMIT %s
+    ) hits
+    JOIN app_chathistory c ON c.id = hits.id, to_tsquery('english', %s) q
+    ORDER BY hits.rank DESC
+"""
+
+
+def _fetch(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _aware(value):
+    # Raw SQLite rows carry naive UTC datetimes
+    if timezone.is_naive(value):
+        return timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def search_journal(user, query, limit=MAX_RESULTS):
+    """
+    Rank a user's journal entries against a search query
+
+    Args:
+        user (User): Owner of the entries
+        query (str): Raw search box text
+        limit (int): Maximum number of results
+
+    Returns:
+        list: Dicts with id, date, snippet (HTML) and rank, best match first
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    if connection.vendor == "sqlite":
+        rows = _fetch(_SQLITE_JOURNAL_SQL, [_fts5_match(terms, user.pk, ["content"]), limit])
+    elif connection.vendor == "postgresql":
+        tsquery = _tsquery(terms)
+        rows = _fetch(_POSTGRES_JOURNAL_SQL, [_HEADLINE_OPTIONS, tsquery, user.pk, limit, tsquery])
+    else:
+        rows = [
+            (entry.id, entry.entry_date, entry.content[:200], 0.0)
+            for entry in _fallback(JournalEntry.objects.filter(user=user), ["content"], terms, "-entry_date")[:limit]
+        ]
+
+    return [
+        {"id": pk, "date": _aware(date), "snippet": highlight(snippet), "rank": rank}
+        for pk, date, snippet, rank in rows
+    ]
+
+
+def search_chat(user, query, limit=MAX_RESULTS):
+    """
+    Rank a user's chat exchanges against a search query
+
+    Matches in the user's own message weigh more than matches in the reply.
+
+    Args:
+        user (User): Owner of the history
+        query (str): Raw search box text
+        limit (int): Maximum number of results
+
+    Returns:
+        list: Dicts with id, date, message and response snippets (HTML) and
+            rank, best match first
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    if connection.vendor == "sqlite":
+        rows = _fetch(_SQLITE_CHAT_SQL, [_fts5_match(terms, user.pk, ["message", "response"]), limit])
+    elif connection.vendor == "postgresql":
+        tsquery = _tsquery(terms)
+        rows = _fetch(
+            _POSTGRES_CHAT_SQL,
+            [_HEADLINE_OPTIONS, _HEADLINE_OPTIONS, tsquery, user.pk, limit, tsquery],
+        )
+    else:
+        rows = [
+            (chat.id, chat.timestamp, chat.message[:200], chat.response[:200], 0.0)
+            for chat in _fallback(ChatHistory.objects.filter(user=user), ["message", "response"], terms, "-timestamp")[:limit]
+        ]
+
+    return [
+        {
+            "id": pk,
+            "date": _aware(date),
+            "message": highlight(message),
+            "response": highlight(response),
+            "rank": rank,
+        }
+        for pk, date, message, response, rank in rows
+    ]
+
+
+def _fallback(queryset, fields, terms, ordering):
+    """Unindexed match for databases without a full-text index"""
+    logger.warning(f"No full-text index for {connection.vendor}, searching with icontains")
+    for term in terms:
+        match = Q()
+        for field in fields:
+            match |= Q(**{f"{field}__icontains": term})
+        queryset = queryset.filter(match)
+    return queryset.order_by(ordering)
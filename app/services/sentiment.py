@@ -0,0 +1,145 @@
+"""
+Sentiment scoring for assessment transcripts and journal entries
+"""
+import traceback
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from django.conf import settings
+from .lexicon import LexiconMatcher
+from .local_sentiment import get_local_sentiment_engine
+from .sentiment_batcher import get_sentiment_batcher
+from .sentiment_chunking import score_chunked
+from .sentiment_client import get_sentiment_client, SentimentServiceError
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEPRESSION_KEYWORDS = [
+    "sad",
+    "depressed",
+    "hopeless",
+    "worthless",
+    "suffer",
+    "can't feel",
+    "pain",
+    "tired",
+    "exhausted",
+    "give up",
+]
+
+DEPRESSION_MATCHER = LexiconMatcher({"depression": DEPRESSION_KEYWORDS})
+
+# Reported by analyze_journal_text() when the local engine stood in for the remote one
+FALLBACK_ENGINE = "local_fallback"
+
+
+def score_sentiment(text):
+    """
+    Score a text with the engine selected by SENTIMENT_ENGINE
+
+    The local engine answers when Cloudflare fails or misses its deadline, so
+    a score is always returned; such results carry "fallback": True.
+
+    Args:
+        text (str): Text to classify
+
+    Returns:
+        dict: Sentiment scores, see parse_sentiment_result()
+    """
+    engine = settings.SENTIMENT_ENGINE
+    if engine == "local":
+        return get_local_sentiment_engine().analyze(text)
+
+    local_result = None
+    if engine == "local_first":
+        local_result = get_local_sentiment_engine().analyze(text)
+        if max(local_result["positive"], local_result["negative"]) >= settings.SENTIMENT_LOCAL_CONFIDENCE:
+            return local_result
+
+    try:
+        return _score_remote(text)
+    except (SentimentServiceError, FuturesTimeoutError) as e:
+        logger.warning(f"Remote sentiment unavailable, using local engine: {e or 'deadline exceeded'}")
+        # Flagged so callers can score the text again once the remote model is back
+        return {**(local_result or get_local_sentiment_engine().analyze(text)), "fallback": True}
+
+
+def _score_remote(text):
+    """Score with Cloudflare, coalescing concurrent callers into micro-batches when enabled"""
+    if settings.SENTIMENT_BATCHING_ENABLED:
+        deadline = settings.SENTIMENT_REMOTE_DEADLINE_MS / 1000
+        return get_sentiment_batcher().analyze(text, timeout=deadline)
+    # Without the batcher the client's own request timeout bounds the wait
+    return get_sentiment_client().analyze(text)
+
+
+def score_long_text(text):
+    """Score text of any length in sentence windows, see score_chunked()"""
+    return score_chunked(text, score_sentiment)
+
+
+def depression_score_from_sentiment(negative_score, text):
+    """Map a negative sentiment probability and keyword hits to the 0-25 scale"""
+    # Calculate base depression score (0-25 scale)
+    adjusted_score = negative_score**0.7  # Non-linear scaling
+    depression_score = round(adjusted_score * 25)
+
+    # Apply keyword boosts (0-10 max boost)
+    # Each keyword counts once however often it appears
+    keyword_matches = len(DEPRESSION_MATCHER.scan(text)["depression"]["terms"])
+    logger.info(f"Base depression score: {depression_score}, keyword matches: {keyword_matches}")
+
+    return min(depression_score + (keyword_matches * 2), 25)
+
+
+def analyze_text_with_model(text):
+    """
+    Score an assessment transcript with the sentiment model and calculate depression score
+
+    'fallback' is True when any part of the transcript was scored by the local
+    engine because the remote model was unavailable, so the score is an estimate.
+    """
+    logger.info("Starting text analysis")
+
+    try:
+        sentiment = score_long_text(text)
+        negative_score = sentiment["negative"]
+        logger.info(f"Negative sentiment score: {negative_score}")
+
+        depression_score = depression_score_from_sentiment(negative_score, text)
+        logger.info(f"Final depression score after keyword boost: {depression_score}")
+
+        return {
+            "depression_score": depression_score,
+            "confidence": negative_score,
+            "processed_text": text,
+            "raw_result": sentiment["raw_result"],
+            "fallback": sentiment["raw_result"].get("fallback", False),
+        }
+
+    except Exception as e:
+        logger.error(f"Text analysis failed: {str(e)}")
+        logger.error(f"Full traceback: {traceback.format_exc()}")
+        return {
+            "depression_score": 0,
+            "confidence": 0,
+            "processed_text": text,
+            "error": str(e),
+        }
+
+
+def analyze_journal_text(text):
+    """
+    Analyze journal text with the configured sentiment engine
+
+    Returns:
+        dict: 'positive' and 'negative' scores, and 'engine': the value of
+            SENTIMENT_ENGINE, or FALLBACK_ENGINE when any part of the text was
+            scored locally because the remote model was unavailable
+    """
+    sentiment = score_long_text(text)
+    fallback = sentiment["raw_result"].get("fallback", False)
+    return {
+        "positive": sentiment["positive"],
+        "negative": sentiment["negative"],
+        "engine": FALLBACK_ENGINE if fallback else settings.SENTIMENT_ENGINE,
+    }
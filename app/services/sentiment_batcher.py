@@ -0,0 +1,202 @@
+"""
+Micro-batching front end for the sentiment client
+
+Journal saves and assessment submissions each need one sentiment score.
+Instead of every caller opening its own round-trip, texts are queued for a
+few milliseconds, identical texts are collapsed and the batch is sent as a
+concurrent burst over the client's pooled keep-alive connections. Results
+are fanned back to the waiting callers through futures.
+
+Every request is bounded by the caller's deadline: texts whose callers have
+given up are dropped before they are sent, and the batcher's client neither
+waits nor retries past SENTIMENT_REMOTE_DEADLINE_MS, so an upstream outage
+cannot pile up requests nobody is waiting for.
+"""
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from django.conf import settings
+from .sentiment_client import CloudflareSentimentClient
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SentimentBatcher:
+    """
+    Collects sentiment requests into short windows and dispatches them together
+
+    A batch is flushed when it reaches max_batch_size or when max_wait_ms has
+    passed since its first text arrived. The Workers AI text-classification
+    model only accepts one text per call, so a batch is sent as parallel
+    requests sharing the client's connection pool.
+
+    A text waits at most deadline_ms (or its caller's shorter timeout) and is
+    dropped unsent once that has passed.
+    """
+
+    def __init__(self, client=None, max_batch_size=None, max_wait_ms=None, deadline_ms=None):
+        self.max_batch_size = max_batch_size or settings.SENTIMENT_BATCH_MAX_SIZE
+        if max_wait_ms is None:
+            max_wait_ms = settings.SENTIMENT_BATCH_MAX_WAIT_MS
+        self.max_wait = max_wait_ms / 1000
+        self.deadline = (deadline_ms or settings.SENTIMENT_REMOTE_DEADLINE_MS) / 1000
+        # Callers fall back to the local engine at the deadline, so a retry after it helps nobody
+        self.client = client or CloudflareSentimentClient(
+            timeout=self.deadline,
+            max_retries=0,
+            pool_size=self.max_batch_size,
+        )
+
+        self.stats = {"submitted": 0, "batches": 0, "upstream_requests": 0, "expired": 0}
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._executor = None
+
+    def submit(self, text, timeout=None):
+        """
+        Queue a text for scoring
+
+        Args:
+            text (str): Text to classify
+            timeout (float): Seconds the caller will wait, capped at the batcher's deadline
+
+        Returns:
+            Future: Resolves to the client's sentiment dict, or raises its error;
+                raises TimeoutError if the text expired before it was sent
+        """
+        future = Future()
+        wait = self.deadline if timeout is None else min(timeout, self.deadline)
+        self._ensure_started()
+        self._queue.put((text, future, time.monotonic() + wait))
+        return future
+
+    def analyze(self, text, timeout=None):
+        """
+        Score a text through the batch queue, blocking until its result is ready
+
+        Args:
+            text (str): Text to classify
+            timeout (float): Seconds to wait for the result, None for the batcher's deadline
+
+        Returns:
+            dict: Sentiment scores, see parse_sentiment_result()
+
+        Raises:
+            SentimentServiceError: If the upstream request fails
+            TimeoutError: If no result arrived in time
+        """
+        future = self.submit(text, timeout=timeout)
+        try:
+            return future.result(timeout=self.deadline if timeout is None else timeout)
+        except FuturesTimeoutError:
+            # Lets the batcher skip the text if it has not been sent yet
+            future.cancel()
+            raise
+
+    def _ensure_started(self):
+        """Start the collector thread, again after a fork (gunicorn and Celery prefork workers)"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._queue = queue.SimpleQueue()
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.client.pool_size,
+                thread_name_prefix="sentiment-request",
+            )
+            self._thread = threading.Thread(target=self._run, name="sentiment-batcher", daemon=True)
+            self._thread.start()
+            self._pid = pid
+
+    def _run(self):
+        """Collect queued texts into batches until the process exits"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._dispatch(batch)
+            except Exception as e:
+                logger.error(f"Sentiment batch dispatch failed: {e}")
+                for _, future, _ in batch:
+                    _resolve(future, exception=e)
+
+    def _dispatch(self, batch):
+        """Send each distinct text in the batch once and fan results back to every waiter"""
+        waiters = defaultdict(list)
+        for text, future, expires_at in batch:
+            waiters[text].append((future, expires_at))
+
+        self.stats["submitted"] += len(batch)
+        self.stats["batches"] += 1
+        logger.debug(f"Sentiment batch: {len(batch)} text(s), {len(waiters)} distinct")
+
+        for text, futures in waiters.items():
+            self._executor.submit(self._request, text, futures)
+
+    def _request(self, text, futures):
+        """Score one text for its waiters, unless every one of them has given up"""
+        now = time.monotonic()
+        live = []
+        for future, expires_at in futures:
+            if expires_at <= now:
+                _resolve(future, exception=FuturesTimeoutError())
+            if not future.done():
+                live.append(future)
+
+        with self._lock:
+            self.stats["upstream_requests" if live else "expired"] += 1
+        if not live:
+            return
+
+        try:
+            result = self.client.analyze(text)
+        except Exception as e:
+            for future in live:
+                _resolve(future, exception=e)
+        else:
+            for future in live:
+                _resolve(future, result=result)
+
+
+def _resolve(future, result=None, exception=None):
+    """Settle a caller's future unless it was already cancelled"""
+    if future.done() or not future.set_running_or_notify_cancel():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_sentiment_batcher():
+    """Return the process-wide sentiment batcher, creating it on first use"""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = SentimentBatcher()
+    return _batcher
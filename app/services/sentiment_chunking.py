@@ -0,0 +1,184 @@
+"""
+Sentence-window chunking for scoring long texts
+
+The SST-2 model only reads the first 512 tokens of its input, so long journal
+entries and assessment transcripts were scored on their opening alone. Texts
+are split on sentence boundaries into windows the model reads in full, the
+windows are scored concurrently and combined weighted by length. Chunk scores
+are cached by content hash, so editing an entry only re-scores the windows
+that changed.
+
+Window boundaries are content-defined: a window ends after any sentence whose
+checksum is a multiple of CHUNK_CUT_EVERY, or earlier when the next sentence
+would not fit. A cut point depends only on its own sentence, so an edit
+anywhere in the text moves the boundaries around it and leaves the later
+windows, and their cache entries, as they were.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+import hashlib
+import logging
+import os
+import re
+import threading
+import zlib
+
+logger = logging.getLogger(__name__)
+
+CHUNK_MAX_CHARS = settings.SENTIMENT_CHUNK_MAX_CHARS
+CHUNK_CACHE_TIMEOUT = settings.SENTIMENT_CHUNK_CACHE_TIMEOUT
+CHUNK_CUT_EVERY = 8  # Average sentences per window when max_chars allows
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Thread pool for concurrent chunk scoring, recreated after a worker fork"""
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor_pid != pid:
+        with _executor_lock:
+            if _executor_pid != pid:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.SENTIMENT_BATCH_MAX_SIZE,
+                    thread_name_prefix="sentiment-chunk",
+                )
+                _executor_pid = pid
+    return _executor
+
+
+def split_into_chunks(text, max_chars=CHUNK_MAX_CHARS, cut_every=CHUNK_CUT_EVERY):
+    """
+    Split text into windows of whole sentences no longer than max_chars
+
+    A window ends after a sentence whose CRC-32 is a multiple of cut_every,
+    or when the next sentence would overflow it. Sentences longer than a
+    window are broken on whitespace, and runs without whitespace are cut at
+    max_chars.
+
+    Args:
+        text (str): Text to split
+        max_chars (int): Maximum characters per window
+        cut_every (int): Average number of sentences per window
+
+    Returns:
+        list: Non-empty chunk strings in text order
+    """
+    chunks = []
+    current = ""
+
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+
+        for piece in _split_long_sentence(sentence, max_chars):
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+
+        if zlib.crc32(sentence.encode("utf-8")) % cut_every == 0:
+            chunks.append(current)
+            current = ""
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_long_sentence(sentence, max_chars):
+    if len(sentence) <= max_chars:
+        return [sentence]
+
+    pieces = []
+    current = ""
+    for run in sentence.split():
+        # A run with no whitespace (a URL, a long string of emoji) is cut at max_chars
+        for start in range(0, len(run), max_chars):
+            word = run[start:start + max_chars]
+            if current and len(current) + 1 + len(word) > max_chars:
+                pieces.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _cache_key(chunk):
+    digest = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+    return f"sentiment:chunk:{settings.SENTIMENT_ENGINE}:{digest}"
+
+
+def _is_fallback(result):
+    """Whether a result came from the local engine standing in for the remote one"""
+    return result.get("fallback", False)
+
+
+def score_chunked(text, score_chunk):
+    """
+    Score text window by window and combine the results
+
+    Args:
+        text (str): Text to classify
+        score_chunk (callable): Scores one chunk, returning a sentiment dict
+
+    Returns:
+        dict: Length-weighted sentiment scores in the parse_sentiment_result()
+            shape, with per-chunk details under raw_result['chunks'] and
+            raw_result['fallback'] set when any chunk was scored by the local
+            engine standing in for the remote one
+    """
+    chunks = split_into_chunks(text) or [text]
+    keys = [_cache_key(chunk) for chunk in chunks]
+    cached = cache.get_many(set(keys))
+
+    missing = {key: chunk for key, chunk in zip(keys, chunks) if key not in cached}
+    if len(missing) == 1:
+        (key, chunk), = missing.items()
+        fresh = {key: score_chunk(chunk)}
+    else:
+        # Chunks are submitted together so the batcher can send them in one burst
+        executor = _get_executor()
+        futures = {key: executor.submit(score_chunk, chunk) for key, chunk in missing.items()}
+        fresh = {key: future.result() for key, future in futures.items()}
+
+    cache.set_many(
+        {key: result for key, result in fresh.items() if not _is_fallback(result)},
+        CHUNK_CACHE_TIMEOUT,
+    )
+    results = {**cached, **fresh}
+
+    weights = [len(chunk) or 1 for chunk in chunks]
+    total_weight = sum(weights)
+    positive = sum(results[key]["positive"] * weight for key, weight in zip(keys, weights)) / total_weight
+    negative = sum(results[key]["negative"] * weight for key, weight in zip(keys, weights)) / total_weight
+
+    logger.debug(f"Scored {len(chunks)} chunk(s), {len(chunks) - len(missing)} from cache")
+
+    return {
+        "positive": positive,
+        "negative": negative,
+        "label": "NEGATIVE" if negative > positive else "POSITIVE",
+        "raw_result": {
+            # Fallback results are never cached, so only fresh chunks can carry the flag
+            "fallback": any(result.get("fallback", False) for result in fresh.values()),
+            "chunks": [
+                {
+                    "length": len(chunk),
+                    "positive": results[key]["positive"],
+                    "negative": results[key]["negative"],
+                    "cached": key in cached,
+                }
+                for key, chunk in zip(keys, chunks)
+            ],
+        },
+    }
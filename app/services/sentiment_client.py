@@ -0,0 +1,132 @@
+"""
+Shared client for the Cloudflare Workers AI sentiment model
+"""
+import threading
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import logging
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_MODEL = "@cf/huggingface/distilbert-sst-2-int8"
+API_BASE_URL = "https://api.cloudflare.com/client/v4/accounts/{account_id}/ai/run/"
+
+
+class SentimentServiceError(Exception):
+    """Raised when the sentiment model cannot be reached or returns an error"""
+
+
+def parse_sentiment_result(response_json):
+    """
+    Convert a Workers AI text-classification response into sentiment scores
+
+    Args:
+        response_json (dict): Decoded API response
+
+    Returns:
+        dict: 'positive' and 'negative' probabilities, the winning 'label'
+            and the untouched 'raw_result'
+    """
+    scores = {"positive": 0.0, "negative": 0.0}
+    for item in response_json.get("result", []):
+        label = str(item.get("label", "")).lower()
+        if label in scores:
+            scores[label] = float(item.get("score", 0.0))
+
+    return {
+        "positive": scores["positive"],
+        "negative": scores["negative"],
+        "label": "NEGATIVE" if scores["negative"] > scores["positive"] else "POSITIVE",
+        "raw_result": response_json,
+    }
+
+
+class CloudflareSentimentClient:
+    """
+    Sentiment scoring over a pooled, keep-alive HTTP session
+
+    Connections are reused between calls, so only the first request pays
+    for the TLS handshake. Transient failures (timeouts on connect, 429 and
+    5xx responses) are retried with exponential backoff.
+    """
+
+    def __init__(self, api_token=None, account_id=None, timeout=10, max_retries=3, pool_size=10):
+        """Initialize the client with Cloudflare credentials from settings"""
+        self.api_token = api_token or settings.CLOUDFLARE_API_TOKEN
+        self.account_id = account_id or settings.CLOUDFLARE_ACCOUNT_ID
+        self.timeout = timeout
+        self.pool_size = pool_size
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["POST"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {self.api_token}"})
+
+    @property
+    def is_configured(self):
+        return bool(self.api_token and self.account_id)
+
+    @property
+    def url(self):
+        return f"{API_BASE_URL.format(account_id=self.account_id)}{SENTIMENT_MODEL}"
+
+    def analyze(self, text):
+        """
+        Score the sentiment of a piece of text
+
+        Args:
+            text (str): Text to classify
+
+        Returns:
+            dict: Sentiment scores, see parse_sentiment_result()
+
+        Raises:
+            SentimentServiceError: If credentials are missing or the API fails
+        """
+        if not self.is_configured:
+            raise SentimentServiceError("API configuration missing")
+
+        try:
+            response = self.session.post(self.url, json={"text": text}, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise SentimentServiceError(f"API request failed: {e}") from e
+
+        if response.status_code != 200:
+            logger.error(f"Sentiment API error: HTTP {response.status_code} - {response.text}")
+            raise SentimentServiceError(f"API error: {response.status_code}")
+
+        try:
+            response_json = response.json()
+        except ValueError as e:
+            raise SentimentServiceError("API returned invalid JSON") from e
+
+        if not response_json.get("success", False):
+            logger.error(f"Sentiment API request unsuccessful: {response_json}")
+            raise SentimentServiceError("API request unsuccessful")
+
+        return parse_sentiment_result(response_json)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_sentiment_client():
+    """Return the process-wide sentiment client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Used when batching is off; the batcher keeps its own deadline-bound client
+                _client = CloudflareSentimentClient(pool_size=settings.SENTIMENT_BATCH_MAX_SIZE)
+    return _client
@@ -0,0 +1,143 @@
+"""
+Per-user daily wellness rollup
+
+Every wellness signal (journal sentiment, assessments, voice call sentiment
+and chatbot activity) is folded into one DailyWellness row per user and day.
+Writes to a source row refresh only the affected day; backfill_daily_wellness()
+rebuilds the table from scratch with one grouped query per source. Chat turns
+moved to ChatArchive are counted from the archives' per-day counts.
+"""
+from datetime import date, datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Avg, Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from app.models import ChatArchive, ChatHistory, DailyWellness, JournalEntry, TestResult
+from app.services.chat_archive import archived_chat_count
+from voice_calls.models import CallSentiment
+import logging
+
+logger = logging.getLogger(__name__)
+
+_scored = Q(sentiment_status__in=["completed", "estimated"])
+
+# (model, user lookup, timestamp lookup, aggregates written to DailyWellness)
+ROLLUP_SOURCES = [
+    (JournalEntry, "user_id", "entry_date", {
+        "journal_entries": Count("id"),
+        "journal_pending": Count("id", filter=Q(sentiment_status="pending")),
+        "journal_positive": Avg("positive_score", filter=_scored),
+        "journal_negative": Avg("negative_score", filter=_scored),
+    }),
+    (TestResult, "user_id", "date", {
+        "assessments": Count("id"),
+        "assessment_score": Avg("total_score"),
+    }),
+    (CallSentiment, "call_history__user_id", "call_history__created_at", {
+        "calls": Count("id"),
+        "call_positive": Avg("positive_score"),
+        "call_negative": Avg("negative_score"),
+    }),
+    (ChatHistory, "user_id", "timestamp", {
+        "chat_messages": Count("id"),
+    }),
+]
+
+# A day with none of these left is removed from the rollup
+ACTIVITY_FIELDS = ["journal_entries", "assessments", "calls", "chat_messages"]
+ROLLUP_FIELDS = {
+    field: 0 if isinstance(aggregate, Count) else None
+    for *_, aggregates in ROLLUP_SOURCES
+    for field, aggregate in aggregates.items()
+}
+
+
+def wellness_day(moment):
+    """Calendar day, in the site time zone, that a timestamp is rolled up into"""
+    return timezone.localdate(moment)
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def refresh_daily_wellness(user_id, day):
+    """
+    Recompute one user's rollup row for one day from the source tables
+
+    Args:
+        user_id (int): User whose day changed
+        day (date): Day to recompute
+
+    Returns:
+        DailyWellness: The updated row, or None if the day has no activity left
+    """
+    start, end = _day_bounds(day)
+    values = {}
+    for model, user_field, time_field, aggregates in ROLLUP_SOURCES:
+        values.update(
+            model.objects.filter(**{
+                user_field: user_id,
+                f"{time_field}__gte": start,
+                f"{time_field}__lt": end,
+            }).aggregate(**aggregates)
+        )
+    values["chat_messages"] += archived_chat_count(user_id, day)
+
+    if not any(values[field] for field in ACTIVITY_FIELDS):
+        DailyWellness.objects.filter(user_id=user_id, date=day).delete()
+        return None
+
+    row, _ = DailyWellness.objects.update_or_create(user_id=user_id, date=day, defaults=values)
+    return row
+
+
+def backfill_daily_wellness(user_ids):
+    """
+    Rebuild the rollup rows of a group of users
+
+    Each source is grouped by user and day in the database, so the work is one
+    query per source regardless of how many events the users have.
+
+    Args:
+        user_ids (list): Users to rebuild
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    days = {}
+    for model, user_field, time_field, aggregates in ROLLUP_SOURCES:
+        grouped = (
+            model.objects.filter(**{f"{user_field}__in": user_ids})
+            .annotate(rollup_user=F(user_field), rollup_day=TruncDate(time_field))
+            .values("rollup_user", "rollup_day")
+            .annotate(**aggregates)
+            .order_by()
+        )
+        for row in grouped.iterator():
+            if row["rollup_day"] is None:
+                continue
+            key = (row.pop("rollup_user"), row.pop("rollup_day"))
+            days.setdefault(key, {}).update(row)
+
+    archives = ChatArchive.objects.filter(user_id__in=user_ids).values_list("user_id", "daily_counts")
+    for user_id, daily_counts in archives.iterator():
+        for day, count in daily_counts.items():
+            values = days.setdefault((user_id, date.fromisoformat(day)), {})
+            values["chat_messages"] = values.get("chat_messages", 0) + count
+
+    rows = [
+        DailyWellness(
+            user_id=user_id,
+            date=day,
+            **{field: values.get(field, default) for field, default in ROLLUP_FIELDS.items()},
+        )
+        for (user_id, day), values in days.items()
+    ]
+
+    with transaction.atomic():
+        DailyWellness.objects.filter(user_id__in=user_ids).delete()
+        DailyWellness.objects.bulk_create(rows, batch_size=1000)
+
+    return len(rows)
@@ -0,0 +1,56 @@
+# app/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from app.models import ChatHistory, JournalEntry, TestResult
+from app.services.dashboard import invalidate_dashboard_cache
+from app.services.wellness import refresh_daily_wellness, wellness_day
+from voice_calls.models import CallSentiment, VoiceCallHistory
+
+
+@receiver(post_save, sender=JournalEntry)
+@receiver(post_delete, sender=JournalEntry)
+@receiver(post_save, sender=TestResult)
+@receiver(post_delete, sender=TestResult)
+def refresh_dashboard(sender, instance, **kwargs):
+    invalidate_dashboard_cache(instance.user_id)
+
+
+def schedule_wellness_refresh(user_id, moment):
+    """Recompute the affected rollup day once the current transaction commits"""
+    if user_id is None or moment is None:
+        return
+    day = wellness_day(moment)
+
+    def refresh():
+        refresh_daily_wellness(user_id, day)
+        # The dashboard chart reads the rollup, so drop what was cached before it changed
+        invalidate_dashboard_cache(user_id)
+
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=JournalEntry)
+@receiver(post_delete, sender=JournalEntry)
+def journal_wellness(sender, instance, **kwargs):
+    schedule_wellness_refresh(instance.user_id, instance.entry_date)
+
+
+@receiver(post_save, sender=TestResult)
+@receiver(post_delete, sender=TestResult)
+def assessment_wellness(sender, instance, **kwargs):
+    schedule_wellness_refresh(instance.user_id, instance.date)
+
+
+@receiver(post_save, sender=ChatHistory)
+@receiver(post_delete, sender=ChatHistory)
+def chat_wellness(sender, instance, **kwargs):
+    schedule_wellness_refresh(instance.user_id, instance.timestamp)
+
+
+@receiver(post_save, sender=CallSentiment)
+@receiver(post_delete, sender=CallSentiment)
+def call_wellness(sender, instance, **kwargs):
+    call = VoiceCallHistory.objects.filter(pk=instance.call_history_id).values("user_id", "created_at").first()
+    if call:
+        schedule_wellness_refresh(call["user_id"], call["created_at"])
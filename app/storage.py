@@ -0,0 +1,71 @@
+"""
+Storage backends for uploaded media
+"""
+import os
+import re
+import tempfile
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Content-addressed names are a SHA-256 hex digest plus an optional extension
+CONTENT_ADDRESSED_NAME = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]+)?$")
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage that keeps a single copy of identical uploads
+
+    Files named after their content hash are written once; saving another
+    upload with the same name reuses the existing file. Any other name falls
+    back to the default behaviour of picking a free name.
+    """
+
+    def _is_content_addressed(self, name):
+        return bool(CONTENT_ADDRESSED_NAME.match(name.rsplit("/", 1)[-1]))
+
+    def get_available_name(self, name, max_length=None):
+        if self._is_content_addressed(name):
+            return name
+        return super().get_available_name(name, max_length=max_length)
+
+    def _save(self, name, content):
+        if not self._is_content_addressed(name):
+            return super()._save(name, content)
+        if self.exists(name):
+            return name
+        try:
+            return self._save_exclusive(name, content)
+        except FileExistsError:
+            # An identical upload was stored between the exists() check and the write
+            return name
+
+    def _save_exclusive(self, name, content):
+        """
+        Write a new file, raising FileExistsError if the name is already taken
+
+        FileSystemStorage._save() answers FileExistsError by asking
+        get_available_name() for another name, which for a content hash is
+        the same name again, so it would retry forever. The file is written
+        to a temporary name and hard-linked into place instead: the link
+        fails if another upload got there first and readers never see a
+        partly written file.
+        """
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in content.chunks():
+                    tmp.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            os.link(tmp_path, full_path)
+        finally:
+            os.unlink(tmp_path)
+        return name
+
+
+prescription_storage = ContentAddressedStorage()
@@ -0,0 +1,204 @@
+from celery import shared_task
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import JournalEntry, Prescription
+from .services.chat_archive import archive_chat_history
+from .services.prescription_cache import apply_cached_extraction, get_cached_extraction, store_extraction
+from .services.prescription_extractor import extract_prescription_info
+from .services.prescription_preprocessing import preprocess_prescription
+from .services.sentiment import FALLBACK_ENGINE, analyze_journal_text
+import logging
+import mimetypes
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Retry delays grow as 30s, 60s, 120s before the prescription is marked failed
+PRESCRIPTION_MAX_RETRIES = 3
+PRESCRIPTION_RETRY_DELAY = 30
+
+JOURNAL_SCORING_MAX_RETRIES = 3
+JOURNAL_SCORING_RETRY_DELAY = 60
+
+
+@contextmanager
+def local_file_path(field_file):
+    """Yield a local path for a stored file, spooling non-local storage to a temp file"""
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        path = None
+
+    if path:
+        yield path
+        return
+
+    suffix = os.path.splitext(field_file.name)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+        with field_file.open('rb') as f:
+            for chunk in f.chunks():
+                tmp.write(chunk)
+        tmp.flush()
+        yield tmp.name
+
+
+@shared_task(bind=True, max_retries=PRESCRIPTION_MAX_RETRIES)
+def process_prescription(self, prescription_id):
+    """Extract prescription details with Gemini outside the request cycle"""
+    try:
+        prescription = Prescription.objects.get(id=prescription_id)
+    except Prescription.DoesNotExist:
+        logger.error(f"Prescription {prescription_id} not found")
+        return f"Prescription not found: {prescription_id}"
+
+    uploaded = prescription.prescription_image or prescription.prescription_file
+    if not uploaded:
+        prescription.status = 'failed'
+        prescription.error_message = 'No file was uploaded.'
+        prescription.save(update_fields=['status', 'error_message', 'updated_at'])
+        return f"No file for prescription {prescription_id}"
+
+    # An identical upload may have been extracted while this one was queued
+    cached = get_cached_extraction(prescription.user, prescription.content_hash)
+    if cached:
+        apply_cached_extraction(prescription, cached)
+        prescription.save(update_fields=['extracted_text', 'extracted_data', 'status', 'error_message', 'updated_at'])
+        logger.info(f"Prescription {prescription_id} served from extraction cache")
+        return f"Prescription processed from cache: {prescription_id}"
+
+    prescription.status = 'processing'
+    prescription.save(update_fields=['status', 'updated_at'])
+
+    try:
+        mime_type = mimetypes.guess_type(uploaded.name)[0] or 'application/octet-stream'
+
+        # Work from the file on disk so large uploads are never held in memory whole
+        with local_file_path(uploaded) as file_path:
+            # Shrink photos and drop blank PDF pages before calling the model
+            parts = preprocess_prescription(file_path, mime_type)
+            extracted_text = extract_prescription_info(parts)
+
+    except Exception as e:
+        logger.error(f"Error processing prescription {prescription_id}: {e}")
+
+        if self.request.retries < self.max_retries:
+            prescription.status = 'pending'
+            prescription.save(update_fields=['status', 'updated_at'])
+            raise self.retry(exc=e, countdown=PRESCRIPTION_RETRY_DELAY * 2 ** self.request.retries)
+
+        prescription.status = 'failed'
+        prescription.error_message = str(e)
+        prescription.save(update_fields=['status', 'error_message', 'updated_at'])
+        return f"Failed to process prescription {prescription_id}: {e}"
+
+    prescription.extracted_text = extracted_text
+    prescription.status = 'completed'
+    prescription.error_message = ''
+    prescription.save(update_fields=['extracted_text', 'status', 'error_message', 'updated_at'])
+    store_extraction(prescription)
+
+    logger.info(f"Prescription {prescription_id} processed successfully")
+    return f"Prescription processed: {prescription_id}"
+
+
+@shared_task(bind=True, max_retries=JOURNAL_SCORING_MAX_RETRIES)
+def score_journal_entry(self, entry_id):
+    """Fill in the sentiment scores of a journal entry after it has been saved"""
+    try:
+        entry = JournalEntry.objects.get(id=entry_id)
+    except JournalEntry.DoesNotExist:
+        logger.error(f"Journal entry {entry_id} not found")
+        return f"Journal entry not found: {entry_id}"
+
+    analysis = analyze_journal_text(entry.content)
+    entry.positive_score = analysis["positive"]
+    entry.negative_score = analysis["negative"]
+
+    if analysis["engine"] == FALLBACK_ENGINE:
+        # Show the local estimate now and score again once the remote model recovers
+        entry.sentiment_status = 'estimated'
+        entry.save(update_fields=['positive_score', 'negative_score', 'sentiment_status'])
+
+        if self.request.retries < self.max_retries:
+            raise self.retry(countdown=JOURNAL_SCORING_RETRY_DELAY * 2 ** self.request.retries)
+
+        logger.warning(f"Journal entry {entry_id} left with a local estimate after {self.max_retries} retries")
+        return f"Journal entry estimated locally: {entry_id}"
+
+    entry.sentiment_status = 'completed'
+    entry.save(update_fields=['positive_score', 'negative_score', 'sentiment_status'])
+
+    logger.info(f"Journal entry {entry_id} scored")
+    return f"Journal entry scored: {entry_id}"
+
+
+@shared_task
+def requeue_stalled_jobs():
+    """
+    Re-queue prescriptions and journal entries whose background job never ran
+
+    A row stays 'pending' when queueing failed in the request or its message
+    was lost. Rows older than JOB_REQUEUE_AFTER_MINUTES are queued again, and
+    ones that are still waiting after JOB_REQUEUE_GIVE_UP_HOURS are marked
+    failed. Journal entries scored by the local fallback get one more remote
+    attempt per sweep until they are that old.
+    """
+    now = timezone.now()
+    stalled_before = now - timedelta(minutes=settings.JOB_REQUEUE_AFTER_MINUTES)
+    give_up_before = now - timedelta(hours=settings.JOB_REQUEUE_GIVE_UP_HOURS)
+    batch_size = settings.JOB_REQUEUE_BATCH_SIZE
+
+    # 'processing' rows this old lost their worker mid-job
+    prescriptions = Prescription.objects.filter(status__in=['pending', 'processing'])
+    abandoned = prescriptions.filter(created_at__lt=give_up_before).update(
+        status='failed',
+        error_message='Processing did not finish in time. Please upload the prescription again.',
+        updated_at=now,
+    )
+    journal_abandoned = JournalEntry.objects.filter(sentiment_status='pending', entry_date__lt=give_up_before).update(
+        sentiment_status='failed'
+    )
+
+    prescription_ids = list(
+        prescriptions.filter(updated_at__lt=stalled_before).order_by('updated_at').values_list('id', flat=True)[:batch_size]
+    )
+    pending_entry_ids = list(
+        JournalEntry.objects.filter(sentiment_status='pending', entry_date__lt=stalled_before)
+        .order_by('entry_date').values_list('id', flat=True)[:batch_size]
+    )
+    estimated_entry_ids = list(
+        JournalEntry.objects.filter(
+            sentiment_status='estimated', entry_date__lt=stalled_before, entry_date__gte=give_up_before
+        ).order_by('entry_date').values_list('id', flat=True)[:batch_size]
+    )
+
+    try:
+        for prescription_id in prescription_ids:
+            process_prescription.delay(prescription_id)
+        for entry_id in pending_entry_ids:
+            score_journal_entry.delay(entry_id)
+        for entry_id in estimated_entry_ids:
+            # A single attempt; the next sweep tries again while the remote model is down
+            score_journal_entry.apply_async((entry_id,), retries=JOURNAL_SCORING_MAX_RETRIES)
+    except Exception as e:
+        logger.error(f"Could not re-queue stalled jobs: {str(e)}")
+        return f"Re-queueing failed: {str(e)}"
+
+    # Not picked up again by the next sweep while these are still queued
+    Prescription.objects.filter(id__in=prescription_ids).update(updated_at=now)
+
+    logger.info(
+        f"Re-queued {len(prescription_ids)} prescriptions and {len(pending_entry_ids) + len(estimated_entry_ids)} "
+        f"journal entries, gave up on {abandoned} prescriptions and {journal_abandoned} journal entries"
+    )
+    return f"Re-queued {len(prescription_ids)} prescriptions and {len(pending_entry_ids) + len(estimated_entry_ids)} journal entries"
+
+
+@shared_task
+def archive_old_chat_history():
+    """Nightly move of chat turns older than CHAT_ARCHIVE_AFTER_DAYS into compressed monthly archives"""
+    archived = archive_chat_history()
+    return f"Archived {archived} chat turns"
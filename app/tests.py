@@ -1,3 +1,858 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import models
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from app.models import (
+    ChatArchive,
+    ChatHistory,
+    DailyWellness,
+    JournalEntry,
+    Prescription,
+    PrescriptionExtraction,
+    TestResult,
+)
+from app.services.chat_archive import archive_chat_history
+from app.services.chat_history import decode_cursor, encode_cursor, get_chat_page
+from app.services import prescription_preprocessing
+from app.services.dashboard import dashboard_cache_key
+from app.services.prescription_cache import hash_uploaded_file
+from app.services.prescription_preprocessing import preprocess_prescription
+from app.services.lexicon import LexiconMatcher
+from app.services.local_sentiment import LexiconSentimentModel
+from app.services.sentiment import analyze_text_with_model, score_sentiment
+from app.services.sentiment_batcher import SentimentBatcher
+from app.services.sentiment_chunking import score_chunked, split_into_chunks
+from app.services.sentiment_client import CloudflareSentimentClient, SentimentServiceError, parse_sentiment_result
+from app.services.wellness import refresh_daily_wellness, wellness_day
+from app.storage import ContentAddressedStorage
+from app.uploadhandlers import SizeLimitedUploadHandler
+from app.services.search import search_journal
+from app.tasks import process_prescription, requeue_stalled_jobs, score_journal_entry
+from perplex.testing import QueryPlanAssertionsMixin
+from PIL import Image
 
-# Create your tests here.
+
+SEED_USERS = 3
+SEED_ROWS = 40
+
+
+def seed_user_activity(user):
+    """Give a user a few weeks of journal, assessment and chat history"""
+    now = timezone.now()
+    JournalEntry.objects.bulk_create([
+        JournalEntry(user=user, content=f"Entry {i}", positive_score=0.6, negative_score=0.4, sentiment_status='completed')
+        for i in range(SEED_ROWS)
+    ])
+    TestResult.objects.bulk_create([
+        TestResult(user=user, phq9_score=i % 27, total_score=i % 27, Status='Mild')
+        for i in range(SEED_ROWS)
+    ])
+    ChatHistory.objects.bulk_create([
+        ChatHistory(user=user, message=f"Message {i}", response="Response")
+        for i in range(SEED_ROWS)
+    ])
+    DailyWellness.objects.bulk_create([
+        DailyWellness(user=user, date=(now - timedelta(days=i)).date(), journal_entries=1, journal_positive=0.6, journal_negative=0.4)
+        for i in range(SEED_ROWS)
+    ])
+
+
+class HotQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """Per-user queries behind the dashboard, journal and chatbot must stay on their indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"user{i}", password="password") for i in range(SEED_USERS)]
+        for user in cls.users:
+            seed_user_activity(user)
+        cls.user = cls.users[0]
+
+    def test_recent_test_results(self):
+        self.assertIndexedPlan(
+            TestResult.objects.filter(user=self.user).order_by("-date").values("date", "total_score", "Status")[:10]
+        )
+
+    def test_journal_entries(self):
+        self.assertIndexedPlan(JournalEntry.objects.filter(user=self.user).order_by("-entry_date"))
+
+    def test_chat_history(self):
+        self.assertIndexedPlan(ChatHistory.objects.filter(user=self.user).order_by("-timestamp", "-id")[:10])
+
+    def test_chat_history_cursor_page(self):
+        newest = ChatHistory.objects.filter(user=self.user).order_by("-timestamp", "-id")[5]
+        self.assertIndexedPlan(
+            ChatHistory.objects.filter(
+                Q(timestamp__lt=newest.timestamp) | Q(timestamp=newest.timestamp, id__lt=newest.id),
+                user=self.user,
+                timestamp__lte=newest.timestamp,
+            ).order_by("-timestamp", "-id")[:10]
+        )
+
+    def test_wellness_timeline(self):
+        self.assertIndexedPlan(
+            DailyWellness.objects.filter(user=self.user, journal_entries__gt=0).order_by("date")
+        )
+
+
+class HotViewQueryCountTests(TestCase):
+    """Query counts of hot views must not grow with the amount of history"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("user", password="password")
+        seed_user_activity(cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_dashboard(self):
+        # session, user, profile, mood series, recent results, upcoming calls
+        with self.assertNumQueries(6):
+            self.client.get(reverse("dashboard"))
+
+    def test_dashboard_cached(self):
+        self.client.get(reverse("dashboard"))
+        # session, user, profile, upcoming calls
+        with self.assertNumQueries(4):
+            self.client.get(reverse("dashboard"))
+
+    def test_journal(self):
+        # session, user, entries
+        with self.assertNumQueries(3):
+            self.client.get(reverse("journal"))
+
+    def test_chatbot(self):
+        # session, user, newest history page
+        with self.assertNumQueries(3):
+            self.client.get(reverse("chatbot"))
+
+    def test_chat_history_page(self):
+        response = self.client.get(reverse("chat_history"), {"limit": 10})
+        cursor = response.json()["next"]
+        # session, user, older history page
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("chat_history"), {"before": cursor, "limit": 10})
+        self.assertEqual(len(response.json()["messages"]), 10)
+
+    def test_wellness_trend(self):
+        # session, user, rollup rows
+        with self.assertNumQueries(3):
+            self.client.get(reverse("wellness_trend"), {"days": 90})
+
+
+class SearchTests(TestCase):
+    """Full-text search stays scoped to its owner and in sync with writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("searcher", password="password")
+        cls.other = User.objects.create_user("other", password="password")
+        cls.entry = JournalEntry.objects.create(user=cls.user, content="Felt anxious <b>before</b> my exams")
+        JournalEntry.objects.create(user=cls.user, content="A calm walk in the park")
+        JournalEntry.objects.create(user=cls.other, content="Anxious about work")
+        ChatHistory.objects.create(user=cls.user, message="I can't sleep", response="Try a wind-down routine")
+
+    def test_results_are_scoped_and_highlighted(self):
+        results = search_journal(self.user, "anxi")
+        self.assertEqual([result["id"] for result in results], [self.entry.id])
+        self.assertIn("<mark>anxious</mark>", results[0]["snippet"])
+        self.assertIn("&lt;b&gt;", results[0]["snippet"])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.entry.content = "Slept well"
+        self.entry.save()
+        self.assertEqual(search_journal(self.user, "anxious"), [])
+        self.assertEqual(len(search_journal(self.user, "slept")), 1)
+
+        self.entry.delete()
+        self.assertEqual(search_journal(self.user, "slept"), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(search_journal(self.user, 'exams" OR "calm'), [])
+        self.assertEqual(search_journal(self.user, '"*:()'), [])
+
+    def test_chat_search_endpoint(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("search"), {"scope": "chat", "q": "sleeping"})
+        self.assertEqual(len(response.json()["results"]), 1)
+        self.assertEqual(self.client.get(reverse("search"), {"scope": "profile"}).status_code, 400)
+
+
+class ChatCursorTests(TestCase):
+    """Chat history cursors point at exactly the message they were made from"""
+
+    def test_round_trip_keeps_every_microsecond(self):
+        for timestamp in (
+            datetime(2026, 10, 19, 12, 34, 56, 789123, tzinfo=dt_timezone.utc),
+            datetime(2262, 4, 11, 23, 47, 16, 854775, tzinfo=dt_timezone.utc),
+        ):
+            with self.subTest(timestamp=timestamp):
+                self.assertEqual(decode_cursor(encode_cursor(timestamp, 42)), (timestamp, 42))
+
+
+class ChatArchiveTests(TestCase):
+    """Old chat turns move to monthly archives and stay readable through the history pages"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("archiver", password="password")
+        now = timezone.now()
+        # One turn a week for a year, newest first
+        self.timestamps = [now - timedelta(weeks=week) for week in range(52)]
+        for timestamp in self.timestamps:
+            chat = ChatHistory.objects.create(user=self.user, message=f"Message {timestamp:%Y-%m-%d}", response="Response")
+            ChatHistory.objects.filter(pk=chat.pk).update(timestamp=timestamp)
+
+    def read_all(self):
+        rows, cursor = get_chat_page(self.user, limit=7)
+        while cursor:
+            page, cursor = get_chat_page(self.user, before=cursor, limit=7)
+            rows = page + rows
+        return rows
+
+    def test_archive_moves_old_turns(self):
+        before = self.read_all()
+        archived = archive_chat_history(older_than_days=90)
+
+        self.assertEqual(archived, ChatArchive.objects.filter(user=self.user).aggregate(total=models.Sum("message_count"))["total"])
+        self.assertFalse(ChatHistory.objects.filter(timestamp__lt=timezone.now() - timedelta(days=90)).exists())
+        self.assertEqual(self.read_all(), before)
+
+    def test_rerun_merges_into_existing_month(self):
+        archive_chat_history(older_than_days=200)
+        archive_chat_history(older_than_days=90)
+        self.assertEqual(
+            ChatArchive.objects.aggregate(total=models.Sum("message_count"))["total"] + ChatHistory.objects.count(),
+            len(self.timestamps),
+        )
+
+    def test_rollup_keeps_archived_turns(self):
+        day = wellness_day(self.timestamps[-1])
+        archive_chat_history(older_than_days=90)
+        self.assertEqual(refresh_daily_wellness(self.user.id, day).chat_messages, 1)
+
+
+class LoadDataTests(TestCase):
+    """Synthetic load data is deterministic per seed, whatever the batch size"""
+
+    def generate(self, prefix, batch_size):
+        call_command("generate_load_data", users=6, batch_size=batch_size, seed=7, prefix=prefix, stdout=io.StringIO())
+        return [
+            list(JournalEntry.objects.filter(user__username=f"{prefix}{index:07d}").order_by("entry_date").values_list("content", "negative_score"))
+            for index in range(6)
+        ]
+
+    def test_same_seed_same_data(self):
+        first = self.generate("run_a_", batch_size=6)
+        second = self.generate("run_b_", batch_size=4)
+        self.assertEqual(first, second)
+        self.assertTrue(any(first))
+        self.assertEqual(ChatHistory.objects.filter(user__username__startswith="run_a_").count(),
+                         ChatHistory.objects.filter(user__username__startswith="run_b_").count())
+
+
+class PageCacheTests(TestCase):
+    """Public pages are served from cache to anonymous visitors only"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_hits_are_cached(self):
+        self.client.get(reverse("about"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("about"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_signed_in_users_bypass_cache(self):
+        self.client.get(reverse("about"))
+        user = User.objects.create_user("user", password="password")
+        self.client.force_login(user)
+        # The cached anonymous copy has no sign-out link
+        self.assertContains(self.client.get(reverse("about")), reverse("account_logout"))
+
+
+class TemporaryMediaMixin:
+    """Point MEDIA_ROOT at a throwaway directory for the duration of each test"""
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create_prescription(self, user, content=b"%PDF-1.4 prescription", name="scan.pdf", **fields):
+        prescription = Prescription(user=user, content_hash=hash_uploaded_file(ContentFile(content)), **fields)
+        prescription.prescription_file.save(name, ContentFile(content), save=False)
+        prescription.save()
+        return prescription
+
+
+class PrescriptionTaskTests(TemporaryMediaMixin, TestCase):
+    """Prescriptions move through pending, processing and completed or failed in the background"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("user", password="password")
+
+    @mock.patch("app.tasks.extract_prescription_info")
+    def test_prescription_is_completed(self, extract):
+        prescription = self.create_prescription(self.user)
+        self.assertEqual(prescription.status, "pending")
+
+        def extract_while_processing(*args):
+            self.assertEqual(Prescription.objects.get(pk=prescription.pk).status, "processing")
+            return "<h3>Amoxicillin</h3>"
+
+        extract.side_effect = extract_while_processing
+        process_prescription.apply(args=[prescription.pk])
+
+        prescription.refresh_from_db()
+        self.assertEqual((prescription.status, prescription.extracted_text), ("completed", "<h3>Amoxicillin</h3>"))
+
+    @mock.patch("app.tasks.extract_prescription_info", side_effect=RuntimeError("Gemini unavailable"))
+    def test_prescription_is_retried_then_failed(self, extract):
+        prescription = self.create_prescription(self.user)
+        process_prescription.apply(args=[prescription.pk])
+
+        self.assertEqual(extract.call_count, process_prescription.max_retries + 1)
+        prescription.refresh_from_db()
+        self.assertEqual((prescription.status, prescription.error_message), ("failed", "Gemini unavailable"))
+
+    @mock.patch("app.tasks.score_journal_entry")
+    @mock.patch("app.tasks.process_prescription")
+    def test_stalled_jobs_are_requeued(self, process, score):
+        stalled = self.create_prescription(self.user)
+        fresh = self.create_prescription(self.user, content=b"%PDF-1.4 another")
+        abandoned = self.create_prescription(self.user, content=b"%PDF-1.4 old")
+        entry = JournalEntry.objects.create(user=self.user, content="Queued while the broker was down")
+        now = timezone.now()
+        Prescription.objects.filter(pk=stalled.pk).update(updated_at=now - timedelta(minutes=30))
+        Prescription.objects.filter(pk=abandoned.pk).update(created_at=now - timedelta(days=2), updated_at=now - timedelta(days=2))
+        JournalEntry.objects.filter(pk=entry.pk).update(entry_date=now - timedelta(minutes=30))
+
+        requeue_stalled_jobs()
+
+        process.delay.assert_called_once_with(stalled.pk)
+        score.delay.assert_called_once_with(entry.pk)
+        self.assertEqual(Prescription.objects.get(pk=fresh.pk).status, "pending")
+        self.assertEqual(Prescription.objects.get(pk=abandoned.pk).status, "failed")
+
+        # Requeued rows are left alone until they stall again
+        process.reset_mock()
+        requeue_stalled_jobs()
+        process.delay.assert_not_called()
+
+
+class PrescriptionPreprocessingTests(TestCase):
+    """Uploads are shrunk before they are sent to Gemini"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_pdf(self, pages):
+        """PDF with one page per item, blank for None and showing the text otherwise"""
+        document = prescription_preprocessing.fitz.open()
+        for text in pages:
+            page = document.new_page()
+            if text:
+                page.insert_text((72, 72), text)
+        path = os.path.join(self.directory, "scan.pdf")
+        document.save(path)
+        document.close()
+        return path
+
+    def test_photo_is_shrunk(self):
+        path = os.path.join(self.directory, "photo.jpg")
+        Image.effect_noise((4000, 3000), 60).convert("RGB").save(path, quality=95)
+
+        parts = preprocess_prescription(path, "image/jpeg")
+
+        self.assertEqual(len(parts), 1)
+        self.assertEqual(parts[0]["mime_type"], "image/jpeg")
+        self.assertLess(len(parts[0]["data"]), os.path.getsize(path))
+        with Image.open(io.BytesIO(parts[0]["data"])) as image:
+            self.assertLessEqual(max(image.size), prescription_preprocessing.TARGET_LONG_EDGE)
+            self.assertEqual(image.mode, "L")
+
+    @skipUnless(prescription_preprocessing.PYMUPDF_AVAILABLE, "PyMuPDF is not installed")
+    def test_blank_pdf_pages_are_skipped(self):
+        path = self.write_pdf(["Amoxicillin 500mg", None, "Twice daily", None])
+        self.assertEqual(len(prescription_preprocessing._preprocess_pdf(path)), 2)
+
+    @skipUnless(prescription_preprocessing.PYMUPDF_AVAILABLE, "PyMuPDF is not installed")
+    @mock.patch.object(prescription_preprocessing, "PDF_MAX_PAGES", 2)
+    def test_long_pdf_is_sent_whole(self):
+        path = self.write_pdf(["Page one", None, "Page two", "Page three"])
+
+        self.assertEqual(prescription_preprocessing._preprocess_pdf(path), [])
+        self.assertEqual(preprocess_prescription(path, "application/pdf"), [{"mime_type": "application/pdf", "path": path}])
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Identical uploads are stored once"""
+
+    DIGEST = "ab" * 32
+
+    def setUp(self):
+        location = tempfile.TemporaryDirectory()
+        self.addCleanup(location.cleanup)
+        self.storage = ContentAddressedStorage(location=location.name)
+
+    def test_identical_uploads_share_a_file(self):
+        first = self.storage.save(f"prescriptions/{self.DIGEST}.pdf", ContentFile(b"same"))
+        second = self.storage.save(f"prescriptions/{self.DIGEST}.pdf", ContentFile(b"same"))
+        self.assertEqual(first, second)
+        self.assertEqual(os.listdir(self.storage.path("prescriptions")), [f"{self.DIGEST}.pdf"])
+
+    def test_other_names_stay_unique(self):
+        first = self.storage.save("prescriptions/scan.pdf", ContentFile(b"one"))
+        second = self.storage.save("prescriptions/scan.pdf", ContentFile(b"two"))
+        self.assertNotEqual(first, second)
+
+    def test_upload_racing_an_identical_one(self):
+        name = f"prescriptions/{self.DIGEST}.pdf"
+        self.storage.save(name, ContentFile(b"winner"))
+        # The other upload passed its exists() check before this file was written
+        with mock.patch.object(self.storage, "exists", return_value=False):
+            self.assertEqual(self.storage.save(name, ContentFile(b"winner")), name)
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b"winner")
+        self.assertEqual(os.listdir(self.storage.path("prescriptions")), [f"{self.DIGEST}.pdf"])
+
+
+class PrescriptionExtractionCacheTests(TemporaryMediaMixin, TestCase):
+    """A file that was already extracted for the user never goes back to Gemini"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("user", password="password")
+
+    @mock.patch("app.tasks.extract_prescription_info")
+    def test_cache_hit_skips_gemini(self, extract):
+        prescription = self.create_prescription(self.user)
+        PrescriptionExtraction.objects.create(
+            user=self.user, content_hash=prescription.content_hash, extracted_text="<h3>Cached</h3>"
+        )
+        process_prescription(prescription.pk)
+
+        extract.assert_not_called()
+        prescription.refresh_from_db()
+        self.assertEqual((prescription.status, prescription.extracted_text), ("completed", "<h3>Cached</h3>"))
+
+    @mock.patch("app.tasks.extract_prescription_info", return_value="<h3>Fresh</h3>")
+    def test_cache_is_per_user(self, extract):
+        other = User.objects.create_user("other", password="password")
+        prescription = self.create_prescription(self.user)
+        PrescriptionExtraction.objects.create(user=other, content_hash=prescription.content_hash, extracted_text="<h3>Theirs</h3>")
+        process_prescription(prescription.pk)
+
+        extract.assert_called_once()
+        self.assertTrue(PrescriptionExtraction.objects.filter(user=self.user, extracted_text="<h3>Fresh</h3>").exists())
+
+
+@override_settings(PRESCRIPTION_MAX_UPLOAD_SIZE=1024)
+class PrescriptionUploadLimitTests(TemporaryMediaMixin, TestCase):
+    """Oversized prescription uploads are aborted before they are saved"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("user", password="password")
+        self.client.force_login(self.user)
+
+    def upload(self, size):
+        scan = SimpleUploadedFile("scan.pdf", b"%PDF-1.4" + b"0" * (size - 8), content_type="application/pdf")
+        return self.client.post(reverse("prescription_digitizer"), {"prescription_file": scan})
+
+    def test_oversized_upload_is_aborted_mid_stream(self):
+        with mock.patch.object(SizeLimitedUploadHandler, "receive_data_chunk", autospec=True,
+                               side_effect=SizeLimitedUploadHandler.receive_data_chunk) as receive:
+            response = self.upload(2048)
+
+        receive.assert_called()
+        self.assertTrue(receive.call_args.args[0].limit_exceeded)
+        self.assertContains(response, "File size must be under")
+        self.assertFalse(Prescription.objects.exists())
+
+    def test_oversized_request_is_rejected_unread(self):
+        with mock.patch.object(SizeLimitedUploadHandler, "receive_data_chunk") as receive:
+            response = self.upload(128 * 1024)
+
+        receive.assert_not_called()
+        self.assertContains(response, "File size must be under")
+        self.assertFalse(Prescription.objects.exists())
+
+    @mock.patch("app.views.process_prescription")
+    def test_upload_within_the_limit_is_queued(self, process):
+        response = self.upload(512)
+
+        prescription = Prescription.objects.get()
+        self.assertRedirects(response, reverse("prescription_detail", args=[prescription.pk]), fetch_redirect_response=False)
+        process.delay.assert_called_once_with(prescription.pk)
+
+
+class _WorkersAIStub(BaseHTTPRequestHandler):
+    """Answers POSTs with the queued HTTP statuses, then with a successful classification"""
+
+    statuses = []
+    requests = []
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append((self.headers["Authorization"], payload))
+        status = self.statuses.pop(0) if self.statuses else 200
+        body = json.dumps({"success": True, "result": [{"label": "NEGATIVE", "score": 0.2}, {"label": "POSITIVE", "score": 0.8}]})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class SentimentClientTests(TestCase):
+    """The Cloudflare client parses classifications and retries transient errors over its pooled session"""
+
+    def setUp(self):
+        _WorkersAIStub.statuses = []
+        _WorkersAIStub.requests = []
+        server = HTTPServer(("127.0.0.1", 0), _WorkersAIStub)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url_patch = mock.patch.object(
+            CloudflareSentimentClient, "url", new_callable=mock.PropertyMock,
+            return_value=f"http://127.0.0.1:{server.server_port}/",
+        )
+        url_patch.start()
+        self.addCleanup(url_patch.stop)
+
+    def make_client(self, **kwargs):
+        client = CloudflareSentimentClient(api_token="token", account_id="account", **kwargs)
+        # The stub speaks plain HTTP, so route it through the same retrying adapter
+        client.session.mount("http://", client.session.get_adapter("https://"))
+        return client
+
+    def test_parses_classification(self):
+        result = parse_sentiment_result({"result": [{"label": "NEGATIVE", "score": 0.7}, {"label": "POSITIVE", "score": 0.3}]})
+        self.assertEqual((result["positive"], result["negative"], result["label"]), (0.3, 0.7, "NEGATIVE"))
+
+    def test_transient_errors_are_retried(self):
+        _WorkersAIStub.statuses = [503]
+        result = self.make_client().analyze("A calm day")
+
+        self.assertEqual((result["positive"], result["label"]), (0.8, "POSITIVE"))
+        self.assertEqual(_WorkersAIStub.requests, [("Bearer token", {"text": "A calm day"})] * 2)
+
+    def test_gives_up_after_max_retries(self):
+        _WorkersAIStub.statuses = [503, 503]
+        with self.assertRaises(SentimentServiceError):
+            self.make_client(max_retries=1).analyze("A calm day")
+        self.assertEqual(len(_WorkersAIStub.requests), 2)
+
+    @override_settings(CLOUDFLARE_API_TOKEN=None, CLOUDFLARE_ACCOUNT_ID=None)
+    def test_missing_credentials(self):
+        with self.assertRaises(SentimentServiceError):
+            CloudflareSentimentClient().analyze("A calm day")
+        self.assertEqual(_WorkersAIStub.requests, [])
+
+
+class _CountingSentimentClient:
+    """Stands in for CloudflareSentimentClient, recording every upstream call"""
+
+    pool_size = 4
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+        self.blocked = {}
+
+    def analyze(self, text):
+        self.calls.append(text)
+        if text in self.blocked:
+            self.blocked[text].wait(timeout=5)
+        if self.error:
+            raise self.error
+        return {"positive": len(text) / 100, "negative": 0.0, "label": "POSITIVE", "raw_result": {}}
+
+
+class SentimentBatcherTests(TestCase):
+    """Concurrent sentiment requests are coalesced into one micro-batch"""
+
+    def test_concurrent_requests_share_a_batch(self):
+        client = _CountingSentimentClient()
+        batcher = SentimentBatcher(client=client, max_batch_size=16, max_wait_ms=200)
+
+        texts = ["same", "same", "other", "same", "third"]
+        futures = [batcher.submit(text) for text in texts]
+        results = [future.result(timeout=5) for future in futures]
+
+        self.assertEqual([result["positive"] for result in results], [len(text) / 100 for text in texts])
+        self.assertEqual(sorted(client.calls), ["other", "same", "third"])
+        self.assertEqual(batcher.stats, {"submitted": 5, "batches": 1, "upstream_requests": 3, "expired": 0})
+
+    def test_errors_reach_every_waiter(self):
+        batcher = SentimentBatcher(client=_CountingSentimentClient(SentimentServiceError("down")), max_wait_ms=200)
+
+        futures = [batcher.submit("same") for _ in range(3)]
+        for future in futures:
+            with self.assertRaises(SentimentServiceError):
+                future.result(timeout=5)
+        self.assertEqual(batcher.stats["upstream_requests"], 1)
+
+    def test_full_batch_is_sent_without_waiting(self):
+        batcher = SentimentBatcher(client=_CountingSentimentClient(), max_batch_size=2, max_wait_ms=60 * 1000)
+
+        futures = [batcher.submit(text) for text in ("one", "two")]
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(batcher.stats["batches"], 1)
+
+    def test_texts_are_dropped_once_their_caller_gives_up(self):
+        client = _CountingSentimentClient()
+        client.pool_size = 1
+        release = client.blocked["slow"] = threading.Event()
+        batcher = SentimentBatcher(client=client, max_batch_size=1, max_wait_ms=0, deadline_ms=5000)
+
+        slow = batcher.submit("slow")
+        with self.assertRaises(FuturesTimeoutError):
+            batcher.analyze("abandoned", timeout=0.05)
+        release.set()
+
+        slow.result(timeout=5)
+        batcher.analyze("fresh", timeout=5)
+        self.assertEqual(client.calls, ["slow", "fresh"])
+        self.assertEqual(batcher.stats["expired"], 1)
+
+    def test_default_client_stops_at_the_deadline(self):
+        client = SentimentBatcher(deadline_ms=3000).client
+        self.assertEqual(client.timeout, 3)
+        self.assertEqual(client.session.get_adapter("https://").max_retries.total, 0)
+
+
+class LocalSentimentFallbackTests(TestCase):
+    """The local engine answers whenever the remote model cannot"""
+
+    REMOTE_RESULT = {"positive": 0.1, "negative": 0.9, "label": "NEGATIVE", "raw_result": {}}
+
+    def test_lexicon_handles_negation(self):
+        model = LexiconSentimentModel()
+        self.assertEqual(model.analyze("I feel happy and calm")["label"], "POSITIVE")
+        self.assertEqual(model.analyze("I do not feel happy at all")["label"], "NEGATIVE")
+
+    @override_settings(SENTIMENT_ENGINE="remote")
+    def test_remote_failure_falls_back(self):
+        for error in (SentimentServiceError("HTTP 503"), FuturesTimeoutError()):
+            with self.subTest(error=error), mock.patch("app.services.sentiment._score_remote", side_effect=error):
+                result = score_sentiment("What a wonderful day")
+
+            self.assertTrue(result["fallback"])
+            self.assertIn("engine", result["raw_result"])
+            self.assertEqual(result["label"], "POSITIVE")
+
+    @override_settings(SENTIMENT_ENGINE="remote")
+    def test_fallback_assessment_score_is_an_estimate(self):
+        with mock.patch("app.services.sentiment._score_remote", side_effect=SentimentServiceError("HTTP 503")):
+            self.assertTrue(analyze_text_with_model("I feel tired and hopeless")["fallback"])
+        with mock.patch("app.services.sentiment._score_remote", return_value=self.REMOTE_RESULT):
+            self.assertFalse(analyze_text_with_model("I feel tired and hopeless")["fallback"])
+
+    @override_settings(SENTIMENT_ENGINE="remote")
+    @mock.patch("app.services.sentiment._score_remote", return_value=REMOTE_RESULT)
+    def test_remote_answer_is_used(self, score_remote):
+        self.assertEqual(score_sentiment("What a wonderful day"), self.REMOTE_RESULT)
+
+    @override_settings(SENTIMENT_ENGINE="local")
+    @mock.patch("app.services.sentiment._score_remote")
+    def test_local_engine_never_calls_remote(self, score_remote):
+        self.assertNotIn("fallback", score_sentiment("What a wonderful day"))
+        score_remote.assert_not_called()
+
+    @override_settings(SENTIMENT_ENGINE="local_first", SENTIMENT_LOCAL_CONFIDENCE=0.8)
+    @mock.patch("app.services.sentiment._score_remote", return_value=REMOTE_RESULT)
+    def test_local_first_asks_remote_only_when_uncertain(self, score_remote):
+        score_sentiment("Amazing, wonderful, beautiful, happy day")
+        score_remote.assert_not_called()
+
+        self.assertEqual(score_sentiment("I went to the shop"), self.REMOTE_RESULT)
+        score_remote.assert_called_once_with("I went to the shop")
+
+
+class LexiconMatcherTests(TestCase):
+    """Lexicon terms only match whole words and phrases"""
+
+    def setUp(self):
+        self.matcher = LexiconMatcher({
+            "low": ["sad", "hard", "give", "give up", "can't feel"],
+            "high": ["happy", "sad"],
+        })
+
+    def test_whole_words_only(self):
+        self.assertEqual(self.matcher.counts("Sadly the hardware was fine"), {"low": 0, "high": 0})
+        self.assertEqual(self.matcher.counts("SAD, so sad. It was hard."), {"low": 3, "high": 2})
+
+    def test_phrases(self):
+        result = self.matcher.scan("I want to give  up, I can’t feel anything. Give me time.")["low"]
+        self.assertEqual(result["terms"], {"give up", "can't feel", "give"})
+        self.assertEqual([term for _, _, term in result["spans"]], ["give up", "can't feel", "give"])
+
+    def test_empty_text(self):
+        self.assertEqual(self.matcher.counts(""), {"low": 0, "high": 0})
+
+
+@override_settings(SENTIMENT_ENGINE="remote")
+class JournalScoringTests(TestCase):
+    """Journal entries are scored in the background, again when only the local fallback answered"""
+
+    REMOTE_RESULT = {"positive": 0.9, "negative": 0.1, "label": "POSITIVE", "raw_result": []}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("user", password="password")
+        self.entry = JournalEntry.objects.create(user=self.user, content="I had a lovely walk today.")
+
+    @mock.patch("app.services.sentiment._score_remote", return_value=REMOTE_RESULT)
+    def test_pending_entry_is_completed(self, score_remote):
+        self.assertEqual(self.entry.sentiment_status, "pending")
+        score_journal_entry.apply(args=[self.entry.pk])
+
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.sentiment_status, "completed")
+        self.assertAlmostEqual(self.entry.positive_score, 0.9)
+        self.assertAlmostEqual(self.entry.negative_score, 0.1)
+
+    @mock.patch("app.services.sentiment._score_remote", side_effect=SentimentServiceError("unavailable"))
+    def test_fallback_scores_are_retried_and_kept_as_estimates(self, score_remote):
+        score_journal_entry.apply(args=[self.entry.pk])
+
+        self.assertEqual(score_remote.call_count, score_journal_entry.max_retries + 1)
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.sentiment_status, "estimated")
+        self.assertGreater(self.entry.positive_score, self.entry.negative_score)
+
+
+@override_settings(SENTIMENT_ENGINE="remote")
+class SentimentChunkingTests(TestCase):
+    """Long texts are scored in sentence windows whose scores are cached"""
+
+    def setUp(self):
+        cache.clear()
+        self.scored = []
+
+    def score_chunk(self, chunk):
+        self.scored.append(chunk)
+        positive = 0.9 if "good" in chunk else 0.3
+        return {"positive": positive, "negative": 1 - positive, "label": "POSITIVE", "raw_result": {}}
+
+    def test_windows_keep_whole_sentences(self):
+        chunks = split_into_chunks("One. Two! Three?\nFour", max_chars=10, cut_every=1000)
+        self.assertEqual(chunks, ["One. Two!", "Three?", "Four"])
+
+    def test_runs_without_spaces_are_cut(self):
+        chunks = split_into_chunks("a" * 25 + " b", max_chars=10)
+        self.assertEqual(chunks, ["a" * 10, "a" * 10, "aaaaa b"])
+
+    def test_edits_only_move_nearby_windows(self):
+        sentences = [f"Today was a good day number {n}." for n in range(60)]
+        original = split_into_chunks(" ".join(sentences))
+        score_chunked(" ".join(sentences), self.score_chunk)
+
+        for index in (0, 30):
+            with self.subTest(edited=index):
+                self.scored.clear()
+                edited = " ".join(sentences[:index] + ["Today was a slow day overall."] + sentences[index + 1:])
+                score_chunked(edited, self.score_chunk)
+
+                changed = [chunk for chunk in split_into_chunks(edited) if chunk not in original]
+                self.assertEqual(self.scored, changed)
+                self.assertLessEqual(len(changed), 2)
+
+    def test_unchanged_windows_come_from_cache(self):
+        sentences = [f"Today was a good day number {n}." for n in range(60)]
+        score_chunked(" ".join(sentences), self.score_chunk)
+        self.assertGreater(len(self.scored), 1)
+
+        self.scored.clear()
+        edited = " ".join(sentences[:-1] + ["Today was a slow day overall."])
+        result = score_chunked(edited, self.score_chunk)
+
+        *unchanged, last = split_into_chunks(edited)
+        self.assertEqual(self.scored, [last])
+        self.assertEqual([chunk["cached"] for chunk in result["raw_result"]["chunks"]], [True] * len(unchanged) + [False])
+        self.assertFalse(result["raw_result"]["fallback"])
+
+    def test_fallback_scores_are_not_cached(self):
+        local = {"positive": 0.5, "negative": 0.5, "label": "POSITIVE", "raw_result": {"engine": "lexicon"}, "fallback": True}
+        result = score_chunked("A short entry.", lambda chunk: local)
+        self.assertTrue(result["raw_result"]["fallback"])
+
+        score_chunked("A short entry.", self.score_chunk)
+        self.assertEqual(self.scored, ["A short entry."])
+
+    @override_settings(SENTIMENT_ENGINE="local")
+    def test_local_engine_scores_are_cached(self):
+        local = {"positive": 0.5, "negative": 0.5, "label": "POSITIVE", "raw_result": {"engine": "lexicon"}}
+        score_chunked("A short entry.", lambda chunk: local)
+
+        result = score_chunked("A short entry.", self.score_chunk)
+        self.assertEqual(self.scored, [])
+        self.assertTrue(result["raw_result"]["chunks"][0]["cached"])
+
+
+class RescoreSentimentTests(TestCase):
+    """rescore_sentiment resumes from its checkpoint and keeps the rollups current"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = os.path.join(directory.name, "rescore.json")
+        self.user = User.objects.create_user("user", password="password")
+        self.entries = [
+            JournalEntry.objects.create(user=self.user, content=f"Entry {n}", sentiment_status="completed")
+            for n in range(3)
+        ]
+
+    @mock.patch(
+        "app.management.commands.rescore_sentiment.analyze_journal_text",
+        return_value={"positive": 0.8, "negative": 0.2, "engine": "remote"},
+    )
+    def test_resumes_from_checkpoint(self, analyze):
+        with open(self.checkpoint, "w") as f:
+            f.write(f'{{"journal": {self.entries[0].pk}}}')
+        cache.set(dashboard_cache_key(self.user.id), "stale")
+
+        out = io.StringIO()
+        call_command("rescore_sentiment", target="journal", batch_size=1, checkpoint=self.checkpoint, stdout=out)
+
+        self.assertIn(f"resuming after id {self.entries[0].pk}", out.getvalue())
+        self.assertEqual([call.args[0] for call in analyze.call_args_list], ["Entry 1", "Entry 2"])
+        self.assertEqual(JournalEntry.objects.get(pk=self.entries[0].pk).positive_score, 0)
+        self.assertAlmostEqual(JournalEntry.objects.get(pk=self.entries[2].pk).positive_score, 0.8)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+        # bulk_update sends no post_save, so the command refreshes the rollup itself
+        rollup = DailyWellness.objects.get(user=self.user, date=wellness_day(self.entries[0].entry_date))
+        self.assertEqual(rollup.journal_entries, 3)
+        self.assertAlmostEqual(rollup.journal_positive, (0 + 0.8 + 0.8) / 3)
+        self.assertIsNone(cache.get(dashboard_cache_key(self.user.id)))
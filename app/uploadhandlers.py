@@ -0,0 +1,37 @@
+"""
+Upload handlers for streaming files to disk
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SizeLimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Stream uploaded files to a temporary file, enforcing a size limit
+
+    Chunks are written to disk as they arrive, so no upload is ever held in
+    memory. The limit is checked per chunk and the upload is aborted as soon
+    as it is exceeded; views can check `limit_exceeded` to report the error.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        self.limit_exceeded = False
+        self.received = 0
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.limit_exceeded = True
+            logger.warning(f"Upload {self.file_name} exceeded {self.max_size} bytes, aborting")
+            self.file.close()
+            raise StopUpload(connection_reset=False)
+        return super().receive_data_chunk(raw_data, start)
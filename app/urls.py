@@ -12,15 +12,19 @@ urlpatterns = [
     path("assesment/", phq9_view, name="phq9"),
     path('chatbot/', chatbot_view, name='chatbot'),
     path('chat/', chat, name='chat_api'),
+    path('chat/history/', chat_history, name='chat_history'),
     path('audio-phase/', audio_phase, name='audio_phase'),
     path('analyze-audio/', analyze_audio, name='analyze_audio'),
     path('results/<int:result_id>/', final_results, name='final_results'),
     path('journal/', journal, name='journal'),
+    path('search/', search, name='search'),
+    path('wellness/trend/', wellness_trend, name='wellness_trend'),
     
     # Prescription Digitizer URLs
     path('prescription-digitizer/', prescription_digitizer, name='prescription_digitizer'),
     path('prescriptions/', prescription_list, name='prescription_list'),
     path('prescription/<int:pk>/', prescription_detail, name='prescription_detail'),
+    path('prescription/<int:pk>/status/', prescription_status, name='prescription_status'),
     path('prescription/<int:pk>/delete/', prescription_delete, name='prescription_delete'),
     
 ]
@@ -1,9 +1,13 @@
 import json
 import traceback
+from datetime import timedelta
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import Http404, JsonResponse
+from django.utils import timezone
 from django.utils.safestring import mark_safe
+from django.template.defaultfilters import filesizeformat
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from accounts.models import Profile
 from app.models import (
     TestResult,
@@ -11,9 +15,22 @@ from app.models import (
     ChatHistory,
     Prescription,
     JournalEntry,
+    DailyWellness,
 )
 from collections import Counter
 from app.forms import PHQ9Form, JournalForm, PrescriptionForm
+from app.tasks import process_prescription, score_journal_entry
+from app.uploadhandlers import SizeLimitedUploadHandler
+from app.cache import cache_page_for_anonymous
+from app.services.chat_history import PAGE_SIZE as CHAT_HISTORY_PAGE_SIZE, get_chat_page
+from app.services.dashboard import get_dashboard_data
+from app.services.search import search_chat, search_journal
+from app.services.sentiment import analyze_text_with_model
+from app.services.prescription_cache import (
+    apply_cached_extraction,
+    get_cached_extraction,
+    hash_uploaded_file,
+)
 import cv2
 try:
     from deepface import DeepFace
@@ -26,7 +43,6 @@ import os
 from dotenv import load_dotenv
 import google.generativeai as genai
 import logging
-import requests
 from django.conf import settings
 from django.contrib import messages
 import asyncio
@@ -42,14 +58,17 @@ genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 # Create your views here.
 
 
+@cache_page_for_anonymous()
 def index(request):
     return render(request, "app/index.html")
 
 
+@cache_page_for_anonymous()
 def about(request):
     return render(request, "app/about.html")
 
 
+@cache_page_for_anonymous()
 def contact(request):
     return render(request, "app/contact.html")
 
@@ -57,17 +76,12 @@ def contact(request):
 @login_required
 def dashboard(request):
     profile = get_object_or_404(Profile, user=request.user)
-    results = TestResult.objects.filter(user=request.user).order_by("-date")
-
-    entries = JournalEntry.objects.filter(user=request.user).order_by("entry_date")
 
-    chart_data = {
-        "dates": [e.entry_date.strftime("%Y-%m-%d") for e in entries],
-        "positive": [e.positive_score for e in entries],
-        "negative": [e.negative_score for e in entries],
-    }
+    # Daily chart series and recent results come from the per-user dashboard cache
+    dashboard_data = get_dashboard_data(request.user)
+    results = dashboard_data["results"]
 
-    chart_data_json = mark_safe(json.dumps(chart_data))
+    chart_data_json = mark_safe(json.dumps(dashboard_data["chart"]))
 
     # Calculate BMI only if height and weight are available
     bmi = None
@@ -100,6 +114,7 @@ def dashboard(request):
     return render(request, "app/dashboard.html", context)
 
 
+@cache_page_for_anonymous()
 def how_to_use(request):
     return render(request, "app/how_to_use.html")
 
@@ -452,11 +467,11 @@ def get_current_emotion(request):
 
 @login_required
 def chatbot_view(request):
-    """Render the chat interface with history"""
-    history = ChatHistory.objects.filter(user=request.user).order_by("-timestamp")[:10]
+    """Render the chat interface with the most recent page of history"""
+    history, next_cursor = get_chat_page(request.user)
 
     # Add initial greeting if no history exists
-    if not history.exists():
+    if not history:
         initial_greeting = {
             "is_bot": True,
             "message": "🌼 Hi! I'm Mindbloom, your mental wellness companion. "
@@ -468,7 +483,39 @@ def chatbot_view(request):
     return render(
         request,
         "app/chatbot.html",
-        {"history": history, "initial_greeting": initial_greeting},
+        {
+            "history": history,
+            "next_cursor": next_cursor,
+            "initial_greeting": initial_greeting,
+        },
+    )
+
+
+@login_required
+def chat_history(request):
+    """Page of older chat messages for infinite scroll, by ?before= cursor"""
+    try:
+        limit = int(request.GET.get("limit", CHAT_HISTORY_PAGE_SIZE))
+        messages_page, next_cursor = get_chat_page(
+            request.user, before=request.GET.get("before"), limit=limit
+        )
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor or limit"}, status=400)
+
+    return JsonResponse(
+        {
+            "messages": [
+                {
+                    "id": row["id"],
+                    "message": row["message"],
+                    "response": row["response"],
+                    "timestamp": row["timestamp"].isoformat(),
+                }
+                for row in messages_page
+            ],
+            "next": next_cursor,
+        },
+        json_dumps_params={"separators": (",", ":")},
     )
 
 
@@ -543,104 +590,6 @@ def audio_phase(request):
     return render(request, "app/audio_recording.html")
 
 
-def analyze_text_with_model(text):
-    """Process Cloudflare API response and calculate depression score"""
-    logger = logging.getLogger(__name__)
-    logger.info("Starting text analysis")
-
-    MODEL = "@cf/huggingface/distilbert-sst-2-int8"
-    API_KEY = os.getenv("CLOUDFLARE_API_TOKEN")
-    ACCOUNT_ID = os.getenv("CLOUDFLARE_ACCOUNT_ID")
-
-    logger.info(
-        f"API Config - Model: {MODEL}, Account ID exists: {bool(ACCOUNT_ID)}, API Key exists: {bool(API_KEY)}"
-    )
-
-    try:
-        API_BASE_URL = (
-            f"https://api.cloudflare.com/client/v4/accounts/{ACCOUNT_ID}/ai/run/"
-        )
-        headers = {"Authorization": f"Bearer {API_KEY}"}
-
-        logger.info(f"Making API request to {API_BASE_URL}{MODEL}")
-
-        response = requests.post(
-            f"{API_BASE_URL}{MODEL}", headers=headers, json={"text": text}, timeout=10
-        )
-
-        logger.info(f"API Response status: {response.status_code}")
-
-        # Check for API errors
-        if response.status_code != 200:
-            logger.error(f"API Error: HTTP {response.status_code} - {response.text}")
-            raise ValueError(f"API Error: HTTP {response.status_code}")
-
-        response_json = response.json()
-        logger.info(f"API Response: {json.dumps(response_json)}")
-
-        # Validate successful response
-        if not response_json.get("success", False):
-            logger.error(f"API request unsuccessful: {json.dumps(response_json)}")
-            raise ValueError("API request unsuccessful")
-
-        # Based on the exact response format you provided
-        results = response_json.get("result", [])
-        logger.info(f"Extracted results: {results}")
-
-        # Extract negative sentiment score directly from the results list
-        negative_score = 0.0
-        for item in results:
-            if item.get("label") == "NEGATIVE":
-                negative_score = item.get("score", 0.0)
-                logger.info(f"Found negative score: {negative_score}")
-                break
-
-        logger.info(f"Final negative score: {negative_score}")
-
-        # Calculate base depression score (0-25 scale)
-        adjusted_score = negative_score**0.7  # Non-linear scaling
-        depression_score = round(adjusted_score * 25)
-        logger.info(f"Base depression score: {depression_score}")
-
-        # Apply keyword boosts (0-10 max boost)
-        depression_keywords = [
-            "sad",
-            "depressed",
-            "hopeless",
-            "worthless",
-            "suffer",
-            "can't feel",
-            "pain",
-            "tired",
-            "exhausted",
-            "give up",
-        ]
-        keyword_matches = sum(1 for kw in depression_keywords if kw in text.lower())
-        logger.info(f"Keyword matches: {keyword_matches}")
-
-        depression_score = min(depression_score + (keyword_matches * 2), 25)
-        logger.info(f"Final depression score after keyword boost: {depression_score}")
-
-        result = {
-            "depression_score": depression_score,
-            "confidence": negative_score,
-            "processed_text": text,
-            "raw_result": response_json,
-        }
-        logger.info(f"Returning analysis result: {result}")
-        return result
-
-    except Exception as e:
-        logger.error(f"Text analysis failed: {str(e)}")
-        logger.error(f"Full traceback: {traceback.format_exc()}")
-        return {
-            "depression_score": 0,
-            "confidence": 0,
-            "processed_text": text,
-            "error": str(e),
-        }
-
-
 @login_required
 def analyze_audio(request):
     logger = logging.getLogger(__name__)
@@ -715,6 +664,7 @@ def analyze_audio(request):
                         "depression_score": analysis.get("depression_score", 0),
                         "processed_text": analysis.get("processed_text", ""),
                         "confidence": analysis.get("confidence", 0),
+                        "estimated": analysis.get("fallback", False),
                     },
                     audio_duration=20,  # Fixed duration
                 )
@@ -891,61 +841,20 @@ def final_results(request, result_id):
         )
 
 
-def analyze_journal_text(text):
-    """Analyze text using Cloudflare's sentiment model"""
-    API_KEY = os.getenv("CLOUDFLARE_API_TOKEN")
-    ACCOUNT_ID = os.getenv("CLOUDFLARE_ACCOUNT_ID")
-    MODEL = "@cf/huggingface/distilbert-sst-2-int8"
-
-    if not API_KEY or not ACCOUNT_ID:
-        logger.error("Missing Cloudflare API credentials")
-        return {"error": "API configuration missing"}
-
-    try:
-        response = requests.post(
-            f"https://api.cloudflare.com/client/v4/accounts/{ACCOUNT_ID}/ai/run/{MODEL}",
-            headers={"Authorization": f"Bearer {API_KEY}"},
-            json={"text": text},
-            timeout=10,
-        )
-
-        if response.status_code != 200:
-            return {"error": f"API error: {response.status_code}"}
-
-        result = response.json().get("result", [])
-        scores = {"positive": 0.0, "negative": 0.0}
-
-        for item in result:
-            if item["label"] == "POSITIVE":
-                scores["positive"] = float(item["score"])
-            elif item["label"] == "NEGATIVE":
-                scores["negative"] = float(item["score"])
-
-        return scores
-
-    except Exception as e:
-        logger.error(f"Analysis failed: {str(e)}")
-        return {"error": str(e)}
-
-
 def journal(request):
     if request.method == "POST":
         form = JournalForm(request.POST)
         if form.is_valid():
             entry = form.save(commit=False)
             entry.user = request.user
+            entry.save()
 
-            # Perform sentiment analysis
-            analysis = analyze_journal_text(entry.content)
-
-            if "error" not in analysis:
-                entry.positive_score = analysis.get("positive", 0)
-                entry.negative_score = analysis.get("negative", 0)
-                entry.save()
-                return redirect("journal")
-            else:
-                # Handle analysis error
-                messages.error(request, f"Analysis failed: {analysis['error']}")
+            # Sentiment is scored on a Celery worker so saving never waits on the model
+            try:
+                score_journal_entry.delay(entry.pk)
+            except Exception as e:
+                logger.error(f"Error queueing journal entry {entry.pk}: {str(e)}")
+            return redirect("journal")
 
     entries = JournalEntry.objects.filter(user=request.user).order_by("-entry_date")
     return render(
@@ -953,84 +862,137 @@ def journal(request):
     )
 
 
-def extract_prescription_info(file_data, mime_type):
-    """Extract information from prescription using Gemini AI"""
-    try:
-        # Using Gemini 2.5 Pro for better document understanding and extraction
-        model = genai.GenerativeModel("gemini-2.5-pro")
+SEARCH_SCOPES = {
+    "journal": search_journal,
+    "chat": search_chat,
+}
 
-        prompt = """You are an expert medical data extractor. Your task is to analyze the provided medical document and extract only the most critical information.
 
-Format the output using simple, clean HTML.
-- Use <h3> for section titles (e.g., 'Patient Details').
-- Use <ul> and <li> for lists of medications or other items.
-- Use <strong> to highlight key terms like 'Name:' or medication names.
-- Do not include <html>, <head>, or <body> tags. Do not use any CSS or <style> tags.
+@login_required
+def search(request):
+    """Ranked full-text search over the user's journal (?scope=journal) or chat history (?scope=chat)"""
+    scope = request.GET.get("scope", "journal")
+    if scope not in SEARCH_SCOPES:
+        return JsonResponse({"error": "Invalid search scope"}, status=400)
+
+    results = SEARCH_SCOPES[scope](request.user, request.GET.get("q", ""))
+    for result in results:
+        result["date"] = result["date"].isoformat()
+    return JsonResponse(
+        {"results": results},
+        json_dumps_params={"separators": (",", ":")},
+    )
 
-**Extraction Rules:**
-1.  **Do not add any introductory text or preamble.** Directly start with the extracted HTML data.
-2.  Extract the following sections if present:
-    *   **Patient Details**: Include name, age, and gender.
-    *   **Prescribing Doctor**: Include the doctor's name and clinic/hospital.
-    *   **Diagnosis**: The primary diagnosis mentioned in the prescription.
-    *   **Date of Prescription**: The date the prescription was issued.
-    *   **Medications**: For each medication, create a list item with its name, dosage, and frequency/instructions.
-    *   **Instructions**: Include any other special instructions for the patient.
 
-3.  **Ignore all non-essential information**: This includes pharmacy logos, addresses, phone numbers, barcodes, etc.
-4.  If the document does not appear to be a medical prescription, respond with only this exact text: 'This document does not appear to be a medical prescription.'"""
+WELLNESS_TREND_DEFAULT_DAYS = 30
+WELLNESS_TREND_MAX_DAYS = 365
 
-        # Prepare the image part
-        image_part = {"mime_type": mime_type, "data": file_data}
+WELLNESS_TREND_FIELDS = [
+    "date",
+    "journal_entries",
+    "journal_pending",
+    "journal_positive",
+    "journal_negative",
+    "assessments",
+    "assessment_score",
+    "calls",
+    "call_positive",
+    "call_negative",
+    "chat_messages",
+]
 
-        response = model.generate_content([prompt, image_part])
-        return response.text
 
-    except Exception as e:
-        logger.error(f"Prescription extraction error: {str(e)}")
-        return f"Error analyzing prescription: {str(e)}"
+@login_required
+def wellness_trend(request):
+    """Daily wellness rollup for the last ?days= days, oldest first"""
+    try:
+        days = int(request.GET.get("days", WELLNESS_TREND_DEFAULT_DAYS))
+    except ValueError:
+        days = WELLNESS_TREND_DEFAULT_DAYS
+    days = min(max(days, 1), WELLNESS_TREND_MAX_DAYS)
+
+    since = timezone.localdate() - timedelta(days=days - 1)
+    rows = (
+        DailyWellness.objects.filter(user=request.user, date__gte=since)
+        .order_by("date")
+        .values(*WELLNESS_TREND_FIELDS)
+    )
+    return JsonResponse(
+        {
+            "since": since.isoformat(),
+            "days": [{**row, "date": row["date"].isoformat()} for row in rows],
+        }
+    )
+
+
+# Multipart overhead tolerated on top of the file size limit before a request is rejected unread
+PRESCRIPTION_REQUEST_OVERHEAD = 64 * 1024
 
 
 @login_required
+@csrf_exempt
 def prescription_digitizer(request):
-    """Handle prescription upload and digitization"""
+    """Handle prescription upload and queue digitization"""
+    max_size = settings.PRESCRIPTION_MAX_UPLOAD_SIZE
+
+    if request.method == "POST":
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        if content_length > max_size + PRESCRIPTION_REQUEST_OVERHEAD:
+            messages.error(request, f"File size must be under {filesizeformat(max_size)}.")
+            return render(
+                request, "app/prescription_digitizer.html", {"form": PrescriptionForm()}
+            )
+
+    # Stream the upload to disk in chunks. Handlers must be replaced before
+    # request.POST is read, so CSRF is checked by the inner view instead.
+    upload_handler = SizeLimitedUploadHandler(request, max_size=max_size)
+    request.upload_handlers = [upload_handler]
+    return _prescription_digitizer(request, upload_handler)
+
+
+@csrf_protect
+def _prescription_digitizer(request, upload_handler):
     if request.method == "POST":
         form = PrescriptionForm(request.POST, request.FILES)
-        if form.is_valid():
+        if upload_handler.limit_exceeded:
+            # The oversized file was discarded mid-stream, so there is nothing to validate
+            messages.error(
+                request, f"File size must be under {filesizeformat(upload_handler.max_size)}."
+            )
+            form = PrescriptionForm()
+        elif form.is_valid():
             prescription = form.save(commit=False)
             prescription.user = request.user
 
-            # Get the uploaded file
-            file = request.FILES.get("prescription_image") or request.FILES.get(
+            uploaded = form.cleaned_data.get("prescription_image") or form.cleaned_data.get(
                 "prescription_file"
             )
+            prescription.content_hash = hash_uploaded_file(uploaded)
 
-            if file:
-                try:
-                    # Read file content
-                    file_content = file.read()
-                    mime_type = file.content_type
-
-                    # Convert to base64 for API
-                    import base64
-
-                    file_base64 = base64.b64encode(file_content).decode("utf-8")
+            # Re-uploads of the same file reuse the earlier extraction
+            cached = get_cached_extraction(request.user, prescription.content_hash)
+            if cached:
+                apply_cached_extraction(prescription, cached)
+                prescription.save()
+                messages.success(request, "Prescription analyzed successfully!")
+                return redirect("prescription_detail", pk=prescription.pk)
 
-                    # Extract information using Gemini
-                    extracted_text = extract_prescription_info(file_base64, mime_type)
+            prescription.status = "pending"
+            prescription.save()
 
-                    # Save extracted data
-                    prescription.extracted_text = extracted_text
-                    prescription.save()
-
-                    messages.success(request, "Prescription analyzed successfully!")
-                    return redirect("prescription_detail", pk=prescription.pk)
-
-                except Exception as e:
-                    logger.error(f"Error processing prescription: {str(e)}")
-                    messages.error(request, f"Error processing file: {str(e)}")
-            else:
-                messages.error(request, "Please upload a file.")
+            # Extraction with Gemini can take tens of seconds, so it runs on a Celery worker
+            try:
+                process_prescription.delay(prescription.pk)
+                messages.success(
+                    request, "Prescription uploaded! We're extracting the details now."
+                )
+            except Exception as e:
+                logger.error(f"Error queueing prescription {prescription.pk}: {str(e)}")
+                messages.warning(
+                    request,
+                    "Prescription uploaded. Analysis will start as soon as the processing service is available.",
+                )
+            return redirect("prescription_detail", pk=prescription.pk)
     else:
         form = PrescriptionForm()
 
@@ -1055,6 +1017,20 @@ def prescription_detail(request, pk):
     )
 
 
+@login_required
+def prescription_status(request, pk):
+    """Report extraction progress for the detail page to poll"""
+    prescription = get_object_or_404(Prescription, pk=pk, user=request.user)
+    return JsonResponse(
+        {
+            "status": prescription.status,
+            "status_display": prescription.get_status_display(),
+            "is_processing": prescription.is_processing,
+            "error": prescription.error_message,
+        }
+    )
+
+
 @login_required
 def prescription_delete(request, pk):
     """Delete a prescription"""
@@ -0,0 +1,13 @@
+"""
+Cache namespaces of the games app
+
+Leaderboard and analytics templates cache their expensive blocks under these
+namespaces; games/signals.py bumps them when the underlying rows change.
+"""
+
+QUIZ_LEADERBOARD = "quiz_leaderboard"
+MINIGAME_LEADERBOARD = "minigame_leaderboard"
+
+
+def quiz_analytics_namespace(user_id):
+    return f"quiz_analytics:{user_id}"
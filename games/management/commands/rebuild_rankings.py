@@ -0,0 +1,42 @@
+"""
+Rebuild the Redis leaderboard rankings from the database
+
+Boards rebuild themselves the first time they are read after Redis lost
+them; run this after restoring a database backup or editing scores in bulk.
+
+    python manage.py rebuild_rankings
+"""
+from django.core.management.base import BaseCommand, CommandError
+from games import ranking
+from games.models import QUIZ_GENRES, MiniGameLeaderboard, MiniGameScore
+import redis
+import time
+
+
+class Command(BaseCommand):
+    help = "Recreate the quiz and mini-game ranking sorted sets from the leaderboard tables"
+
+    def handle(self, *args, **options):
+        if ranking.get_client() is None:
+            raise CommandError("RANKING_REDIS_URL is not set, rankings are read from the database")
+
+        game_types = {game_type for game_type, _ in MiniGameScore.GAME_TYPES}
+        game_types.update(MiniGameLeaderboard.objects.values_list("game_type", flat=True).distinct())
+        boards = [ranking.quiz_board(None)]
+        boards += [ranking.quiz_board(genre) for genre, _ in QUIZ_GENRES]
+        boards += [ranking.minigame_board(game_type) for game_type in sorted(game_types)]
+
+        started = time.monotonic()
+        try:
+            for board in boards:
+                players = ranking.rebuild(board)
+                if players is None:
+                    self.stdout.write(f"{board.key}: already being rebuilt by another process")
+                else:
+                    self.stdout.write(f"{board.key}: {players} players")
+        except redis.RedisError as e:
+            raise CommandError(f"Could not rebuild rankings: {str(e)}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(boards)} rankings in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,64 @@
+"""
+Rebuild quiz and mini-game leaderboard entries from the raw attempts
+
+Completing a quiz or a game only adjusts the running totals in place
+(Leaderboard.record_attempt, MiniGameLeaderboard.record_score). Use this
+command to repair entries after attempts were edited or deleted by hand, or
+to create entries for data imported without going through the views.
+
+    python manage.py recompute_leaderboards --user 42
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from games.models import Leaderboard, MiniGameLeaderboard, MiniGameScore, QuizAttempt
+import time
+
+
+class Command(BaseCommand):
+    help = "Recompute leaderboard aggregates from completed quiz attempts and mini-game scores"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="Only recompute this user id (repeatable)")
+
+    def handle(self, *args, **options):
+        user_ids = options["user_ids"]
+        started = time.monotonic()
+
+        quiz_entries = self._recompute(
+            Leaderboard,
+            QuizAttempt.objects.filter(is_completed=True),
+            "genre",
+            user_ids,
+            include_overall=True,
+        )
+        minigame_entries = self._recompute(
+            MiniGameLeaderboard,
+            MiniGameScore.objects.filter(completed=True),
+            "game_type",
+            user_ids,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {quiz_entries} quiz and {minigame_entries} mini-game leaderboard entries "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
+
+    def _recompute(self, model, source, field, user_ids, include_overall=False):
+        entries = model.objects.all()
+        if user_ids:
+            source = source.filter(user_id__in=user_ids)
+            entries = entries.filter(user_id__in=user_ids)
+
+        # Make sure every user/key with results has an entry before recomputing
+        keys = set(source.values_list("user_id", field).distinct())
+        if include_overall:
+            keys |= {(user_id, None) for user_id, _ in keys}
+        for user_id, key in keys:
+            model.objects.get_or_create(user_id=user_id, **{field: key})
+
+        count = 0
+        for entry in entries.select_related("user").iterator(chunk_size=500):
+            with transaction.atomic():
+                entry.update_stats()
+            count += 1
+        return count
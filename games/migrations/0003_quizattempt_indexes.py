@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0002_minigameleaderboard_minigamescore'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['user', '-completed_at'], name='quiz_attempt_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['user', 'genre', '-completed_at'], name='quiz_attempt_genre_done_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0003_quizattempt_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='minigamescore',
+            index=models.Index(condition=models.Q(('completed', True)), fields=['game_type', 'difficulty', '-score', 'time_taken'], name='minigame_score_board_idx'),
+        ),
+    ]
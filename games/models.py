@@ -1,6 +1,11 @@
 from django.db import models
+from django.db.models import Case, Count, F, FloatField, Max, Min, Sum, Value, When
+from django.db.models.functions import Cast, Greatest, Least
 from django.contrib.auth.models import User
 from django.utils import timezone
+from app.cache import bump_cache_version
+from games import ranking
+from games.cache import MINIGAME_LEADERBOARD, QUIZ_LEADERBOARD
 
 # Quiz genre/subject tags
 QUIZ_GENRES = [
@@ -59,6 +64,19 @@ class QuizAttempt(models.Model):
     
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            # Analytics only ever reads completed attempts, newest first
+            models.Index(
+                fields=['user', '-completed_at'],
+                condition=models.Q(is_completed=True),
+                name='quiz_attempt_completed_idx',
+            ),
+            models.Index(
+                fields=['user', 'genre', '-completed_at'],
+                condition=models.Q(is_completed=True),
+                name='quiz_attempt_genre_done_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.get_genre_display()} - Score: {self.score}"
@@ -120,29 +138,66 @@ class Leaderboard(models.Model):
         genre_display = self.get_genre_display() if self.genre else "Overall"
         return f"{self.user.username} - {genre_display} - Score: {self.total_score}"
     
+    @classmethod
+    def record_attempt(cls, attempt):
+        """
+        Add one completed attempt to the user's genre and overall entries
+
+        The running totals are updated in a single UPDATE per entry with F()
+        expressions, so the cost does not depend on how many quizzes the user
+        has taken and concurrent completions cannot overwrite each other.
+
+        Args:
+            attempt (QuizAttempt): Attempt that has just been completed
+        """
+        for genre in (attempt.genre, None):
+            entry, _ = cls.objects.get_or_create(user_id=attempt.user_id, genre=genre)
+            total_questions = F('total_questions') + attempt.total_questions
+            cls.objects.filter(pk=entry.pk).update(
+                total_attempts=F('total_attempts') + 1,
+                total_score=F('total_score') + attempt.score,
+                highest_score=Case(
+                    When(total_attempts=0, then=Value(attempt.score)),
+                    default=Greatest('highest_score', Value(attempt.score)),
+                ),
+                average_score=(
+                    Cast(F('total_score') + attempt.score, FloatField())
+                    / (F('total_attempts') + 1)
+                ),
+                total_correct=F('total_correct') + attempt.correct_answers,
+                total_questions=total_questions,
+                overall_accuracy=(
+                    Cast(F('total_correct') + attempt.correct_answers, FloatField())
+                    * 100 / Greatest(total_questions, Value(1))
+                ),
+                last_updated=timezone.now(),
+            )
+            ranking.add_score(ranking.quiz_board(genre), attempt.user_id, attempt.score)
+        bump_cache_version(QUIZ_LEADERBOARD)
+
     def update_stats(self):
-        """Update leaderboard statistics based on user's attempts"""
+        """Recompute this entry from scratch from the user's completed attempts"""
+        attempts = QuizAttempt.objects.filter(user=self.user, is_completed=True)
         if self.genre:
-            attempts = QuizAttempt.objects.filter(
-                user=self.user, 
-                genre=self.genre, 
-                is_completed=True
-            )
-        else:
-            attempts = QuizAttempt.objects.filter(
-                user=self.user, 
-                is_completed=True
-            )
+            attempts = attempts.filter(genre=self.genre)
         
-        self.total_attempts = attempts.count()
-        if self.total_attempts > 0:
-            self.total_score = sum(a.score for a in attempts)
-            self.highest_score = max(a.score for a in attempts)
-            self.average_score = self.total_score / self.total_attempts
-            self.total_correct = sum(a.correct_answers for a in attempts)
-            self.total_questions = sum(a.total_questions for a in attempts)
-            if self.total_questions > 0:
-                self.overall_accuracy = (self.total_correct / self.total_questions) * 100
+        stats = attempts.aggregate(
+            attempt_count=Count('id'),
+            score_sum=Sum('score'),
+            score_max=Max('score'),
+            correct_sum=Sum('correct_answers'),
+            question_sum=Sum('total_questions'),
+        )
+        self.total_attempts = stats['attempt_count']
+        self.total_score = stats['score_sum'] or 0
+        self.highest_score = stats['score_max'] or 0
+        self.average_score = self.total_score / self.total_attempts if self.total_attempts else 0.0
+        self.total_correct = stats['correct_sum'] or 0
+        self.total_questions = stats['question_sum'] or 0
+        if self.total_questions > 0:
+            self.overall_accuracy = (self.total_correct / self.total_questions) * 100
+        else:
+            self.overall_accuracy = 0.0
         
         self.save()
 
@@ -193,6 +248,12 @@ class MiniGameScore(models.Model):
         indexes = [
             models.Index(fields=['user', 'game_type']),
             models.Index(fields=['-score']),
+            # Mini-game leaderboard: best finished games per game type and difficulty
+            models.Index(
+                fields=['game_type', 'difficulty', '-score', 'time_taken'],
+                condition=models.Q(completed=True),
+                name='minigame_score_board_idx',
+            ),
         ]
     
     def __str__(self):
@@ -218,20 +279,69 @@ class MiniGameLeaderboard(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.get_game_type_display()}"
     
+    @classmethod
+    def record_score(cls, game_score):
+        """
+        Add one finished game to the user's entry for that game type
+
+        Like Leaderboard.record_attempt, the totals are updated in place with
+        F() expressions instead of re-reading every score the user has saved.
+        Scores of unfinished games are not counted.
+
+        Args:
+            game_score (MiniGameScore): Score that has just been saved
+
+        Returns:
+            MiniGameLeaderboard: The updated entry
+        """
+        entry, _ = cls.objects.get_or_create(user_id=game_score.user_id, game_type=game_score.game_type)
+        if not game_score.completed:
+            return entry
+        
+        score = Value(game_score.score)
+        time_taken = Value(game_score.time_taken, output_field=FloatField())
+        cls.objects.filter(pk=entry.pk).update(
+            total_games=F('total_games') + 1,
+            total_score=F('total_score') + game_score.score,
+            highest_score=Case(
+                When(total_games=0, then=score),
+                default=Greatest('highest_score', score),
+            ),
+            average_score=(
+                Cast(F('total_score') + game_score.score, FloatField())
+                / (F('total_games') + 1)
+            ),
+            best_time=Case(
+                When(best_time__isnull=True, then=time_taken),
+                default=Least('best_time', time_taken),
+            ),
+            total_time_played=F('total_time_played') + game_score.time_taken,
+            last_played=timezone.now(),
+        )
+        ranking.add_score(ranking.minigame_board(game_score.game_type), game_score.user_id, game_score.score)
+        bump_cache_version(MINIGAME_LEADERBOARD)
+        entry.refresh_from_db()
+        return entry
+    
     def update_stats(self):
-        """Update leaderboard stats based on user's game scores"""
-        scores = MiniGameScore.objects.filter(
+        """Recompute this entry from scratch from the user's completed games"""
+        stats = MiniGameScore.objects.filter(
             user=self.user,
             game_type=self.game_type,
             completed=True
+        ).aggregate(
+            game_count=Count('id'),
+            score_sum=Sum('score'),
+            score_max=Max('score'),
+            time_min=Min('time_taken'),
+            time_sum=Sum('time_taken'),
         )
         
-        self.total_games = scores.count()
-        if self.total_games > 0:
-            self.total_score = sum(s.score for s in scores)
-            self.highest_score = max(s.score for s in scores)
-            self.average_score = self.total_score / self.total_games
-            self.best_time = min(s.time_taken for s in scores)
-            self.total_time_played = sum(s.time_taken for s in scores)
+        self.total_games = stats['game_count']
+        self.total_score = stats['score_sum'] or 0
+        self.highest_score = stats['score_max'] or 0
+        self.average_score = self.total_score / self.total_games if self.total_games else 0.0
+        self.best_time = stats['time_min']
+        self.total_time_played = stats['time_sum'] or 0.0
         
         self.save()
@@ -0,0 +1,316 @@
+"""
+Leaderboard rankings
+
+Every quiz genre, the overall quiz board and every mini-game type get one
+Redis sorted set of user id -> total_score. A player's rank, the top N and
+the players around someone are then O(log n) lookups instead of range scans
+over the leaderboard tables. A rank is one plus the number of players with a
+strictly higher score, so tied players share a rank as they always have.
+
+The sorted sets are a copy of Leaderboard and MiniGameLeaderboard and are
+only written after the database transaction commits. A board is rebuilt from
+the database the first time it is read after Redis lost it, after a write to
+it failed, once a day when its built marker expires, or on demand with the
+rebuild_rankings command. One process rebuilds a board at a time; readers
+answer from the database meanwhile. Without RANKING_REDIS_URL, or while Redis
+is unreachable, every lookup answers from the database instead.
+"""
+from collections import namedtuple
+from itertools import islice
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+import logging
+import redis
+import uuid
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "mindmate:ranking"
+REBUILD_CHUNK_SIZE = 1000
+SOCKET_TIMEOUT = 0.5  # Seconds; a slow Redis falls back to the database
+BUILT_TTL = 24 * 60 * 60  # Seconds; boards are rebuilt at least this often to heal lost writes
+REBUILD_LOCK_TIMEOUT = 60  # Seconds; a crashed rebuild releases the board after this
+
+# kind -> (leaderboard model, field the board is keyed on)
+BOARD_MODELS = {
+    "quiz": ("Leaderboard", "genre"),
+    "minigame": ("MiniGameLeaderboard", "game_type"),
+}
+
+_client = None
+
+
+class Board(namedtuple("Board", "kind value")):
+    """One ranking: a quiz genre (None for overall) or a mini-game type"""
+
+    @property
+    def key(self):
+        return f"{KEY_PREFIX}:{self.kind}:{self.value or 'overall'}"
+
+    @property
+    def built_key(self):
+        return f"{self.key}:built"
+
+    @property
+    def lock_key(self):
+        return f"{self.key}:lock"
+
+    def entries(self):
+        model_name, field = BOARD_MODELS[self.kind]
+        return apps.get_model("games", model_name).objects.filter(**{field: self.value})
+
+
+def quiz_board(genre=None):
+    return Board("quiz", genre or None)
+
+
+def minigame_board(game_type):
+    return Board("minigame", game_type)
+
+
+def board_for(entry):
+    """Board a Leaderboard or MiniGameLeaderboard row belongs to"""
+    for kind, (model_name, field) in BOARD_MODELS.items():
+        if entry._meta.object_name == model_name:
+            return Board(kind, getattr(entry, field))
+    raise ValueError(f"Not a leaderboard entry: {entry!r}")
+
+
+def get_client():
+    """Redis client for the rankings, or None when rankings use the database"""
+    global _client
+    if not settings.RANKING_REDIS_URL:
+        return None
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.RANKING_REDIS_URL,
+            socket_timeout=SOCKET_TIMEOUT,
+            socket_connect_timeout=SOCKET_TIMEOUT,
+            decode_responses=True,
+        )
+    return _client
+
+
+def _lookup(board, from_redis, from_db):
+    client = get_client()
+    if client is not None:
+        try:
+            # Another process may be rebuilding the board, so read the database meanwhile
+            if client.exists(board.built_key) or rebuild(board) is not None:
+                return from_redis(client, board.key)
+        except redis.RedisError as e:
+            logger.warning(f"Ranking {board.key} unavailable, using the database: {str(e)}")
+    return from_db(board.entries())
+
+
+# ============================================
+# LOOKUPS
+# ============================================
+
+def rank(board, user_id):
+    """
+    Rank of a player on a board
+
+    Returns:
+        int: 1-based rank, shared by tied players, or None if the player has no entry
+    """
+    def from_redis(client, key):
+        score = client.zscore(key, user_id)
+        if score is None:
+            return None
+        return client.zcount(key, f"({score}", "+inf") + 1
+
+    def from_db(entries):
+        score = entries.filter(user_id=user_id).values_list("total_score", flat=True).first()
+        if score is None:
+            return None
+        return entries.filter(total_score__gt=score).count() + 1
+
+    return _lookup(board, from_redis, from_db)
+
+
+def size(board):
+    """Number of players on a board"""
+    return _lookup(board, lambda client, key: client.zcard(key), lambda entries: entries.count())
+
+
+def top(board, limit):
+    """
+    Highest scores on a board
+
+    Returns:
+        list: (user_id, total_score) tuples, best first
+    """
+    def from_redis(client, key):
+        return [(int(member), int(score)) for member, score in client.zrevrange(key, 0, limit - 1, withscores=True)]
+
+    def from_db(entries):
+        return list(entries.order_by("-total_score", "user_id").values_list("user_id", "total_score")[:limit])
+
+    return _lookup(board, from_redis, from_db)
+
+
+def around(board, user_id, radius=2):
+    """
+    Players ranked just above and below someone
+
+    Args:
+        board (Board): Board to read
+        user_id (int): Player at the centre of the window
+        radius (int): Players to include on each side
+
+    Returns:
+        list: (rank, user_id, total_score) tuples, best first; empty if the
+        player has no entry
+    """
+    def from_redis(client, key):
+        position = client.zrevrank(key, user_id)
+        if position is None:
+            return []
+        start = max(position - radius, 0)
+        rows = client.zrevrange(key, start, position + radius, withscores=True)
+        first_rank = client.zcount(key, f"({rows[0][1]}", "+inf") + 1
+        return _with_ranks([(int(member), int(score)) for member, score in rows], start, first_rank)
+
+    def from_db(entries):
+        score = entries.filter(user_id=user_id).values_list("total_score", flat=True).first()
+        if score is None:
+            return []
+        ordered = entries.order_by("-total_score", "user_id")
+        position = (
+            entries.filter(total_score__gt=score).count()
+            + entries.filter(total_score=score, user_id__lt=user_id).count()
+        )
+        start = max(position - radius, 0)
+        rows = list(ordered.values_list("user_id", "total_score")[start:position + radius + 1])
+        first_rank = entries.filter(total_score__gt=rows[0][1]).count() + 1
+        return _with_ranks(rows, start, first_rank)
+
+    return _lookup(board, from_redis, from_db)
+
+
+def _with_ranks(rows, start, first_rank):
+    ranked = []
+    for offset, (user_id, score) in enumerate(rows):
+        if offset == 0:
+            current = first_rank
+        elif score != rows[offset - 1][1]:
+            # Everyone above scored more, so the rank is the position
+            current = start + offset + 1
+        ranked.append((current, user_id, score))
+    return ranked
+
+
+def top_entries(board, limit):
+    """Leaderboard rows of the top players, best first"""
+    user_ids = [user_id for user_id, _ in top(board, limit)]
+    by_user = _entries_by_user(board, user_ids)
+    return [by_user[user_id] for user_id in user_ids if user_id in by_user]
+
+
+def around_entries(board, user_id, radius=2):
+    """(rank, leaderboard row) pairs of the players around someone"""
+    window = around(board, user_id, radius)
+    by_user = _entries_by_user(board, [row_user_id for _, row_user_id, _ in window])
+    return [(row_rank, by_user[row_user_id]) for row_rank, row_user_id, _ in window if row_user_id in by_user]
+
+
+def _entries_by_user(board, user_ids):
+    return {entry.user_id: entry for entry in board.entries().filter(user_id__in=user_ids).select_related("user")}
+
+
+# ============================================
+# SYNC
+# ============================================
+
+def _after_commit(board, write):
+    client = get_client()
+    if client is None:
+        return
+
+    def run():
+        try:
+            # Boards that were never built are rebuilt from the database on first read
+            if client.exists(board.built_key):
+                write(client, board.key)
+        except redis.RedisError as e:
+            logger.warning(f"Could not update ranking {board.key}, rebuilding on next read: {str(e)}")
+            try:
+                client.delete(board.built_key)
+            except redis.RedisError:
+                # The built marker expires after BUILT_TTL, so the board still heals
+                pass
+
+    transaction.on_commit(run)
+
+
+def sync_entry(entry):
+    """Copy a saved leaderboard row's total score to its board"""
+    _after_commit(board_for(entry), lambda client, key: client.zadd(key, {entry.user_id: entry.total_score}))
+
+
+def add_score(board, user_id, points):
+    """Add points to a player's score, matching an F() update of total_score"""
+    _after_commit(board, lambda client, key: client.zincrby(key, points, user_id))
+
+
+def remove_entry(entry):
+    """Drop a deleted leaderboard row from its board"""
+    _after_commit(board_for(entry), lambda client, key: client.zrem(key, entry.user_id))
+
+
+def rebuild(board):
+    """
+    Recreate a board's sorted set from the database
+
+    The set is filled under a temporary key and renamed over the live one,
+    so readers never see a half-built board. A per-board lock lets one
+    process rebuild at a time, and only the lock holder replaces the board.
+
+    Returns:
+        int: Players on the board, 0 when rankings use the database, or None
+            when another process is rebuilding the board
+    """
+    client = get_client()
+    if client is None:
+        return 0
+
+    token = uuid.uuid4().hex
+    if not client.set(board.lock_key, token, nx=True, ex=REBUILD_LOCK_TIMEOUT):
+        return None
+
+    staging_key = f"{board.key}:rebuild:{token}"
+    try:
+        rows = board.entries().values_list("user_id", "total_score").iterator(chunk_size=REBUILD_CHUNK_SIZE)
+        count = 0
+        while chunk := dict(islice(rows, REBUILD_CHUNK_SIZE)):
+            with client.pipeline(transaction=False) as pipe:
+                pipe.zadd(staging_key, chunk)
+                pipe.expire(staging_key, REBUILD_LOCK_TIMEOUT)
+                pipe.execute()
+            count += len(chunk)
+
+        with client.pipeline() as pipe:
+            # Abort if the lock expired and another process took over the board
+            pipe.watch(board.lock_key)
+            if pipe.get(board.lock_key) != token:
+                logger.warning(f"Rebuild of ranking {board.key} outlived its lock, discarding it")
+                return None
+            pipe.multi()
+            if count:
+                pipe.rename(staging_key, board.key)
+                pipe.persist(board.key)
+            else:
+                pipe.delete(board.key)
+            pipe.set(board.built_key, 1, ex=BUILT_TTL)
+            pipe.delete(board.lock_key)
+            pipe.execute()
+    except redis.WatchError:
+        logger.warning(f"Rebuild of ranking {board.key} outlived its lock, discarding it")
+        return None
+    finally:
+        client.delete(staging_key)
+
+    logger.info(f"Rebuilt ranking {board.key} with {count} players")
+    return count
@@ -0,0 +1,39 @@
+# games/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from app.cache import bump_cache_version
+from games import ranking
+from games.cache import MINIGAME_LEADERBOARD, QUIZ_LEADERBOARD, quiz_analytics_namespace
+from games.models import Leaderboard, MiniGameLeaderboard, MiniGameScore, QuizAttempt
+
+
+@receiver(post_save, sender=Leaderboard)
+@receiver(post_delete, sender=Leaderboard)
+def invalidate_quiz_leaderboard(sender, instance, **kwargs):
+    bump_cache_version(QUIZ_LEADERBOARD)
+
+
+@receiver(post_save, sender=MiniGameScore)
+@receiver(post_delete, sender=MiniGameScore)
+def invalidate_minigame_leaderboard(sender, instance, **kwargs):
+    bump_cache_version(MINIGAME_LEADERBOARD)
+
+
+@receiver(post_save, sender=QuizAttempt)
+@receiver(post_delete, sender=QuizAttempt)
+def invalidate_quiz_analytics(sender, instance, **kwargs):
+    # Analytics only count completed attempts; answers saved mid-quiz change nothing
+    if instance.is_completed:
+        bump_cache_version(quiz_analytics_namespace(instance.user_id))
+
+
+@receiver(post_save, sender=Leaderboard)
+@receiver(post_save, sender=MiniGameLeaderboard)
+def sync_ranking(sender, instance, **kwargs):
+    ranking.sync_entry(instance)
+
+
+@receiver(post_delete, sender=Leaderboard)
+@receiver(post_delete, sender=MiniGameLeaderboard)
+def remove_from_ranking(sender, instance, **kwargs):
+    ranking.remove_entry(instance)
@@ -1,3 +1,300 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from games import ranking
+from games.models import QUIZ_GENRES, Leaderboard, MiniGameLeaderboard, MiniGameScore, Quiz, QuizAttempt
+import io
+import redis
+from unittest import mock
+from games.views import get_used_question_hashes, save_generated_quiz, top_minigame_scores
+from perplex.testing import QueryPlanAssertionsMixin
 
-# Create your tests here.
+SEED_USERS = 3
+SEED_ATTEMPTS_PER_GENRE = 5
+
+
+def seed_quiz_attempts(user):
+    """Give a user completed and abandoned attempts in every genre"""
+    now = timezone.now()
+    for genre, _ in QUIZ_GENRES:
+        quiz = Quiz.objects.create(user=user, genre=genre, questions_data=[])
+        QuizAttempt.objects.bulk_create([
+            QuizAttempt(
+                user=user,
+                quiz=quiz,
+                genre=genre,
+                score=i * 2,
+                accuracy=i * 10.0,
+                is_completed=i > 0,
+                completed_at=now if i > 0 else None,
+            )
+            for i in range(SEED_ATTEMPTS_PER_GENRE)
+        ])
+
+
+class QuizAttemptQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """Analytics queries on quiz attempts must stay on their indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"user{i}", password="password") for i in range(SEED_USERS)]
+        for user in cls.users:
+            seed_quiz_attempts(user)
+        cls.user = cls.users[0]
+
+    def test_completed_attempts(self):
+        self.assertIndexedPlan(
+            QuizAttempt.objects.filter(user=self.user, is_completed=True).order_by("-completed_at")
+        )
+
+    def test_completed_attempts_by_genre(self):
+        self.assertIndexedPlan(
+            QuizAttempt.objects.filter(user=self.user, genre="wellness", is_completed=True).order_by("-completed_at")
+        )
+
+
+class AnalyticsQueryCountTests(TestCase):
+    """The analytics page must not issue queries per attempt or per genre"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("user", password="password")
+        seed_quiz_attempts(cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_analytics(self):
+        # session, user, per-genre stats, recent attempts
+        with self.assertNumQueries(4):
+            self.client.get(reverse("games:analytics"))
+
+    def test_analytics_cached(self):
+        self.client.get(reverse("games:analytics"))
+        with self.assertNumQueries(2):
+            self.client.get(reverse("games:analytics"))
+
+    def test_completed_attempt_invalidates_stats(self):
+        response = self.client.get(reverse("games:analytics"))
+        self.assertEqual(response.context["total_attempts"], len(QUIZ_GENRES) * (SEED_ATTEMPTS_PER_GENRE - 1))
+        quiz = Quiz.objects.filter(user=self.user).first()
+        attempt = QuizAttempt.objects.create(user=self.user, quiz=quiz, genre=quiz.genre, correct_answers=20)
+        attempt.complete_quiz()
+        response = self.client.get(reverse("games:analytics"), {"genre": quiz.genre})
+        self.assertEqual(response.context["total_attempts"], SEED_ATTEMPTS_PER_GENRE)
+        self.assertEqual(response.context["highest_score"], 40)
+
+
+class LeaderboardFragmentCacheTests(TestCase):
+    """Cached leaderboard fragments are dropped as soon as the rankings change"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("player", password="password")
+        Leaderboard.objects.create(user=self.user, total_score=50, total_attempts=1)
+        self.client.force_login(self.user)
+
+    def test_new_entry_invalidates_top_10(self):
+        self.client.get(reverse("games:leaderboard"))
+        rival = User.objects.create_user("rival", password="password")
+        Leaderboard.objects.create(user=rival, total_score=90, total_attempts=1)
+        self.assertContains(self.client.get(reverse("games:leaderboard")), "rival")
+
+    def test_top_10_is_shared_between_users(self):
+        self.client.get(reverse("games:leaderboard"))
+        rival = User.objects.create_user("rival", password="password")
+        self.client.force_login(rival)
+        response = self.client.get(reverse("games:leaderboard"))
+        self.assertContains(response, f'data-user-id="{self.user.id}"')
+        self.assertContains(response, f'[data-user-id="{rival.id}"]')
+
+
+class LeaderboardAggregateTests(TestCase):
+    """Incremental leaderboard updates must match a full recompute"""
+
+    LEADERBOARD_FIELDS = ("total_attempts", "total_score", "highest_score", "average_score",
+                          "total_correct", "total_questions", "overall_accuracy")
+    MINIGAME_FIELDS = ("total_games", "total_score", "highest_score", "average_score",
+                       "best_time", "total_time_played")
+
+    def setUp(self):
+        self.user = User.objects.create_user("player", password="password")
+
+    def snapshot(self, model, fields):
+        return sorted(model.objects.order_by().values_list("genre" if model is Leaderboard else "game_type", *fields),
+                      key=lambda row: row[0] or "")
+
+    def test_quiz_attempts(self):
+        quiz = Quiz.objects.create(user=self.user, genre="wellness", questions_data=[])
+        for correct, wrong in ((3, 10), (12, 2), (7, 5)):
+            attempt = QuizAttempt.objects.create(user=self.user, quiz=quiz, genre="wellness",
+                                                 correct_answers=correct, wrong_answers=wrong)
+            attempt.complete_quiz()
+            Leaderboard.record_attempt(attempt)
+
+        incremental = self.snapshot(Leaderboard, self.LEADERBOARD_FIELDS)
+        # overall and wellness entries: -4, 22 and 9 points
+        self.assertEqual([row[1:4] for row in incremental], [(3, 27, 22), (3, 27, 22)])
+
+        call_command("recompute_leaderboards", stdout=io.StringIO())
+        self.assertEqual(self.snapshot(Leaderboard, self.LEADERBOARD_FIELDS), incremental)
+
+    def test_minigame_scores(self):
+        for score, time_taken, completed in ((80, 42.5, True), (120, 61.0, True), (500, 5.0, False)):
+            game_score = MiniGameScore.objects.create(user=self.user, game_type="memory_match",
+                                                      score=score, time_taken=time_taken, completed=completed)
+            entry = MiniGameLeaderboard.record_score(game_score)
+
+        self.assertEqual((entry.total_games, entry.highest_score, entry.best_time), (2, 120, 42.5))
+        incremental = self.snapshot(MiniGameLeaderboard, self.MINIGAME_FIELDS)
+        call_command("recompute_leaderboards", user_ids=[self.user.id], stdout=io.StringIO())
+        self.assertEqual(self.snapshot(MiniGameLeaderboard, self.MINIGAME_FIELDS), incremental)
+
+
+class RankingTests(TestCase):
+    """Database-backed rankings, used when RANKING_REDIS_URL is not set"""
+
+    SCORES = (50, 40, 40, 30, 20, 10)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"ranked{i}", password="password") for i in range(len(cls.SCORES))]
+        for user, score in zip(cls.users, cls.SCORES):
+            Leaderboard.objects.create(user=user, genre=None, total_score=score)
+        cls.board = ranking.quiz_board(None)
+
+    def test_ties_share_a_rank(self):
+        ranks = [ranking.rank(self.board, user.id) for user in self.users]
+        self.assertEqual(ranks, [1, 2, 2, 4, 5, 6])
+        self.assertIsNone(ranking.rank(ranking.quiz_board("wellness"), self.users[0].id))
+
+    def test_top_and_size(self):
+        self.assertEqual(ranking.top(self.board, 2), [(self.users[0].id, 50), (self.users[1].id, 40)])
+        self.assertEqual(ranking.size(self.board), len(self.SCORES))
+
+    def test_around(self):
+        window = ranking.around(self.board, self.users[3].id, radius=2)
+        self.assertEqual([(rank, score) for rank, _, score in window], [(2, 40), (2, 40), (4, 30), (5, 20), (6, 10)])
+        self.assertEqual([rank for rank, _ in ranking.around_entries(self.board, self.users[0].id, radius=1)], [1, 2])
+
+
+class RedisRankingTests(TestCase):
+    """Redis-backed rankings stay in step with the database when writes fail or rebuilds race"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"ranked{i}", password="password") for i in range(2)]
+        for user, score in zip(cls.users, (50, 40)):
+            Leaderboard.objects.create(user=user, genre=None, total_score=score)
+        cls.board = ranking.quiz_board(None)
+
+    def setUp(self):
+        self.client_redis = mock.MagicMock()
+        self.pipe = self.client_redis.pipeline.return_value.__enter__.return_value
+        for target, value in (("get_client", self.client_redis), ("uuid.uuid4", mock.Mock(hex="token"))):
+            patcher = mock.patch(f"games.ranking.{target}", return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_failed_write_rebuilds_on_next_read(self):
+        self.client_redis.exists.return_value = True
+        self.client_redis.zincrby.side_effect = redis.RedisError("connection lost")
+        with self.captureOnCommitCallbacks(execute=True):
+            ranking.add_score(self.board, self.users[0].id, 5)
+        self.client_redis.delete.assert_called_once_with(self.board.built_key)
+
+        self.client_redis.exists.return_value = False
+        self.client_redis.set.return_value = True
+        self.pipe.get.return_value = "token"
+        self.client_redis.zrevrange.return_value = [(str(self.users[0].id), 50.0)]
+
+        self.assertEqual(ranking.top(self.board, 1), [(self.users[0].id, 50)])
+        self.client_redis.set.assert_called_once_with(
+            self.board.lock_key, "token", nx=True, ex=ranking.REBUILD_LOCK_TIMEOUT
+        )
+        self.pipe.rename.assert_called_once_with(f"{self.board.key}:rebuild:token", self.board.key)
+        self.pipe.set.assert_called_once_with(self.board.built_key, 1, ex=ranking.BUILT_TTL)
+
+    def test_reads_use_the_database_while_another_process_rebuilds(self):
+        self.client_redis.exists.return_value = False
+        self.client_redis.set.return_value = None
+
+        self.assertEqual(ranking.top(self.board, 1), [(self.users[0].id, 50)])
+        self.client_redis.zrevrange.assert_not_called()
+        self.pipe.rename.assert_not_called()
+
+    def test_rebuild_that_lost_its_lock_is_discarded(self):
+        self.client_redis.set.return_value = True
+        self.pipe.get.return_value = "other-token"
+
+        self.assertIsNone(ranking.rebuild(self.board))
+        self.pipe.rename.assert_not_called()
+        self.pipe.set.assert_not_called()
+        self.client_redis.delete.assert_called_once_with(f"{self.board.key}:rebuild:token")
+
+
+class MiniGameLeaderboardTests(TestCase):
+    """The mini-game leaderboard reads every board in one windowed query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("player", password="password")
+        MiniGameScore.objects.bulk_create([
+            MiniGameScore(user=cls.user, game_type="memory_match", difficulty="easy",
+                          score=score, time_taken=60 - score % 7, completed=True)
+            for score in range(15)
+        ] + [
+            MiniGameScore(user=cls.user, game_type="story_adventure", difficulty="hard", score=5, time_taken=t, completed=True)
+            for t in (30.0, 20.0)
+        ] + [
+            MiniGameScore(user=cls.user, game_type="logic_puzzle", difficulty="medium", score=99, time_taken=1.0, completed=False),
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_top_scores_per_board(self):
+        boards = top_minigame_scores(limit=10)
+        self.assertEqual(len(boards), 15)
+        self.assertEqual([s.score for s in boards["memory_match_easy"]], list(range(14, 4, -1)))
+        # Equal scores: the faster game ranks first
+        self.assertEqual([s.time_taken for s in boards["story_adventure_hard"]], [20.0, 30.0])
+        self.assertEqual(boards["logic_puzzle_medium"], [])
+
+    def test_page_queries(self):
+        # session, user, then one query for all 15 boards
+        with self.assertNumQueries(3):
+            self.client.get(reverse("games:minigame_leaderboard"))
+        # The boards are cached until a score is saved
+        with self.assertNumQueries(2):
+            self.client.get(reverse("games:minigame_leaderboard"))
+
+
+class SaveGeneratedQuizTests(TestCase):
+    """Persisting a generated quiz is a fixed number of statements"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("player", password="password")
+
+    def questions(self, count, offset=0):
+        return [
+            {"question": f"Question {i}?", "options": ["a", "b", "c", "d"], "correct_answer": "a", "difficulty": "easy"}
+            for i in range(offset, offset + count)
+        ]
+
+    def test_constant_statements(self):
+        # savepoint, quiz, questions, used hashes, attempt, release
+        with self.assertNumQueries(6):
+            quiz = save_generated_quiz(self.user, "wellness", self.questions(20))
+        self.assertEqual(list(quiz.questions.values_list("question_number", flat=True)), list(range(1, 21)))
+        self.assertTrue(QuizAttempt.objects.filter(quiz=quiz, is_completed=False).exists())
+
+    def test_used_hashes_are_not_duplicated(self):
+        save_generated_quiz(self.user, "wellness", self.questions(20))
+        save_generated_quiz(self.user, "wellness", self.questions(20, offset=10))
+        self.assertEqual(len(get_used_question_hashes(self.user, "wellness")), 30)
@@ -2,14 +2,23 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.contrib import messages
+from django.db import transaction
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils.functional import SimpleLazyObject
 from django.views.decorators.http import require_POST
 import google.generativeai as genai
 import json
 import hashlib
 import logging
 import os
+from functools import partial
 from time import time
 
+from app.cache import FRAGMENT_TIMEOUT, cache_version, versioned_key
+from . import ranking
+from .cache import MINIGAME_LEADERBOARD, QUIZ_LEADERBOARD, quiz_analytics_namespace
 from .models import Quiz, QuizAttempt, QuizQuestion, Leaderboard, UsedQuestion, QUIZ_GENRES, MiniGameScore, MiniGameLeaderboard
 
 logger = logging.getLogger(__name__)
@@ -44,8 +53,8 @@ def select_genre(request):
 
 
 def get_used_question_hashes(user, genre):
-    """Get list of used question hashes for a user and genre"""
-    return list(UsedQuestion.objects.filter(
+    """Get the set of used question hashes for a user and genre"""
+    return set(UsedQuestion.objects.filter(
         user=user, 
         genre=genre
     ).values_list('question_hash', flat=True))
@@ -56,6 +65,56 @@ def hash_question(question_text):
     return hashlib.sha256(question_text.lower().strip().encode()).hexdigest()
 
 
+def save_generated_quiz(user, genre, questions_data):
+    """
+    Store a generated quiz with its questions and a fresh attempt
+
+    Everything is written in one transaction with bulk inserts, so a quiz
+    costs the same handful of statements however many questions it has and
+    a failure leaves no half-saved quiz behind.
+
+    Args:
+        user (User): Player the quiz was generated for
+        genre (str): Genre code from QUIZ_GENRES
+        questions_data (list): Question dicts as returned by Gemini
+
+    Returns:
+        Quiz: The saved quiz
+    """
+    with transaction.atomic():
+        quiz = Quiz.objects.create(
+            user=user,
+            genre=genre,
+            questions_data=questions_data
+        )
+        
+        # Create QuizQuestion objects for analytics
+        QuizQuestion.objects.bulk_create([
+            QuizQuestion(
+                quiz=quiz,
+                question_text=q_data['question'],
+                options=q_data['options'],
+                correct_answer=q_data['correct_answer'],
+                difficulty=q_data.get('difficulty', 'medium'),
+                question_number=idx
+            )
+            for idx, q_data in enumerate(questions_data, 1)
+        ])
+        
+        # Mark questions as used; hashes already stored are skipped by the unique constraint
+        UsedQuestion.objects.bulk_create([
+            UsedQuestion(user=user, genre=genre, question_hash=q_hash)
+            for q_hash in {hash_question(q_data['question']) for q_data in questions_data}
+        ], ignore_conflicts=True)
+        
+        QuizAttempt.objects.create(
+            user=user,
+            quiz=quiz,
+            genre=genre
+        )
+    return quiz
+
+
 @login_required
 def generate_quiz(request):
     """Generate quiz questions using Gemini AI"""
@@ -141,38 +200,7 @@ Generate 20 questions now in the exact JSON format above. Do not include any mar
         else:
             questions_data = new_questions[:20]
         
-        # Create Quiz object
-        quiz = Quiz.objects.create(
-            user=request.user,
-            genre=genre,
-            questions_data=questions_data
-        )
-        
-        # Create QuizQuestion objects for analytics
-        for idx, q_data in enumerate(questions_data, 1):
-            QuizQuestion.objects.create(
-                quiz=quiz,
-                question_text=q_data['question'],
-                options=q_data['options'],
-                correct_answer=q_data['correct_answer'],
-                difficulty=q_data.get('difficulty', 'medium'),
-                question_number=idx
-            )
-            
-            # Mark question as used
-            q_hash = hash_question(q_data['question'])
-            UsedQuestion.objects.get_or_create(
-                user=request.user,
-                genre=genre,
-                question_hash=q_hash
-            )
-        
-        # Create QuizAttempt
-        QuizAttempt.objects.create(
-            user=request.user,
-            quiz=quiz,
-            genre=genre
-        )
+        quiz = save_generated_quiz(request.user, genre, questions_data)
         
         messages.success(request, f'Quiz ready! {len(questions_data)} questions generated. Good luck!')
         return redirect('games:take_quiz', quiz_id=quiz.pk)
@@ -258,38 +286,25 @@ def submit_answer(request):
 @login_required
 def complete_quiz(request, attempt_id):
     """Complete quiz and calculate final score"""
-    attempt = get_object_or_404(QuizAttempt, id=attempt_id, user=request.user)
-    
-    if attempt.is_completed:
-        return redirect('games:quiz_results', attempt_id=attempt_id)
-    
-    # Complete the quiz
-    attempt.complete_quiz()
-    
-    # Update leaderboard
-    update_leaderboard(request.user, attempt.genre)
+    with transaction.atomic():
+        # Lock the attempt so a double submit cannot count it twice
+        attempt = get_object_or_404(
+            QuizAttempt.objects.select_for_update(), id=attempt_id, user=request.user
+        )
+        
+        if attempt.is_completed:
+            return redirect('games:quiz_results', attempt_id=attempt_id)
+        
+        # Complete the quiz
+        attempt.complete_quiz()
+        
+        # Update leaderboard
+        Leaderboard.record_attempt(attempt)
     
     messages.success(request, 'Quiz completed! Here are your results.')
     return redirect('games:quiz_results', attempt_id=attempt_id)
 
 
-def update_leaderboard(user, genre):
-    """Update leaderboard entries for user"""
-    # Update genre-specific leaderboard
-    leaderboard, created = Leaderboard.objects.get_or_create(
-        user=user,
-        genre=genre
-    )
-    leaderboard.update_stats()
-    
-    # Update overall leaderboard
-    overall_leaderboard, created = Leaderboard.objects.get_or_create(
-        user=user,
-        genre=None
-    )
-    overall_leaderboard.update_stats()
-
-
 @login_required
 def quiz_results(request, attempt_id):
     """Display quiz results and performance"""
@@ -330,51 +345,73 @@ def continue_quiz(request):
     return redirect('games:home')
 
 
+def quiz_genre_stats(user):
+    """
+    Per-genre totals of a user's completed quiz attempts
+
+    All genres come from one GROUP BY query. The result is cached until the
+    user's next attempt is saved, which bumps their quiz_analytics version.
+
+    Returns:
+        dict: genre code -> {'attempts', 'total_score', 'highest_score', 'accuracy_sum'}
+    """
+    key = versioned_key(quiz_analytics_namespace(user.id), "genre_stats")
+    stats = cache.get(key)
+    if stats is None:
+        rows = QuizAttempt.objects.filter(
+            user=user,
+            is_completed=True
+        ).values('genre').annotate(
+            attempts=Count('id'),
+            total_score=Sum('score'),
+            highest_score=Max('score'),
+            accuracy_sum=Sum('accuracy'),
+        ).order_by()
+        stats = {row.pop('genre'): row for row in rows}
+        cache.set(key, stats, FRAGMENT_TIMEOUT)
+    return stats
+
+
 @login_required
 def analytics_dashboard(request):
     """User analytics dashboard"""
     genre_filter = request.GET.get('genre', None)
+    stats = quiz_genre_stats(request.user)
     
-    # Get all attempts
+    # Recent attempts, only fetched when the table fragment is not cached
+    attempts = QuizAttempt.objects.filter(
+        user=request.user,
+        is_completed=True
+    ).order_by('-completed_at')
     if genre_filter:
-        attempts = QuizAttempt.objects.filter(
-            user=request.user, 
-            genre=genre_filter,
-            is_completed=True
-        ).order_by('-completed_at')
-    else:
-        attempts = QuizAttempt.objects.filter(
-            user=request.user,
-            is_completed=True
-        ).order_by('-completed_at')
+        attempts = attempts.filter(genre=genre_filter)
     
     # Calculate overall stats
-    total_attempts = attempts.count()
+    if genre_filter:
+        selected = [stats[genre_filter]] if genre_filter in stats else []
+    else:
+        selected = list(stats.values())
+    total_attempts = sum(row['attempts'] for row in selected)
     if total_attempts > 0:
-        total_score = sum(a.score for a in attempts)
+        total_score = sum(row['total_score'] for row in selected)
         avg_score = total_score / total_attempts
-        highest_score = max(a.score for a in attempts)
-        avg_accuracy = sum(a.accuracy for a in attempts) / total_attempts
+        highest_score = max(row['highest_score'] for row in selected)
+        avg_accuracy = sum(row['accuracy_sum'] for row in selected) / total_attempts
     else:
         total_score = avg_score = highest_score = avg_accuracy = 0
     
     # Genre-wise stats
     genre_stats = []
     for genre_code, genre_name in QUIZ_GENRES:
-        genre_attempts = QuizAttempt.objects.filter(
-            user=request.user,
-            genre=genre_code,
-            is_completed=True
-        )
-        count = genre_attempts.count()
-        if count > 0:
+        row = stats.get(genre_code)
+        if row:
             genre_stats.append({
                 'genre_code': genre_code,
                 'genre_name': genre_name,
-                'attempts': count,
-                'total_score': sum(a.score for a in genre_attempts),
-                'avg_score': sum(a.score for a in genre_attempts) / count,
-                'avg_accuracy': sum(a.accuracy for a in genre_attempts) / count,
+                'attempts': row['attempts'],
+                'total_score': row['total_score'],
+                'avg_score': row['total_score'] / row['attempts'],
+                'avg_accuracy': row['accuracy_sum'] / row['attempts'],
             })
     
     context = {
@@ -387,6 +424,8 @@ def analytics_dashboard(request):
         'genre_stats': genre_stats,
         'quiz_genres': QUIZ_GENRES,
         'selected_genre': genre_filter,
+        'cache_timeout': FRAGMENT_TIMEOUT,
+        'analytics_version': cache_version(quiz_analytics_namespace(request.user.id)),
     }
     return render(request, 'games/analytics.html', context)
 
@@ -395,62 +434,36 @@ def analytics_dashboard(request):
 def leaderboard(request):
     """Global and genre-wise leaderboard"""
     genre_filter = request.GET.get('genre', None)
+    board = ranking.quiz_board(genre_filter)
     
-    if genre_filter:
-        # Genre-specific leaderboard
-        leaderboard_entries = Leaderboard.objects.filter(
-            genre=genre_filter
-        ).order_by('-total_score', '-average_score')[:100]
-        
-        # Get user's rank
-        user_entry = Leaderboard.objects.filter(
-            user=request.user,
-            genre=genre_filter
-        ).first()
-        
-        if user_entry:
-            user_rank = Leaderboard.objects.filter(
-                genre=genre_filter,
-                total_score__gt=user_entry.total_score
-            ).count() + 1
-        else:
-            user_rank = None
-        
-        # Format genre display name
-        genre_display = dict(QUIZ_GENRES).get(genre_filter, genre_filter)
-    else:
-        # Overall leaderboard
-        leaderboard_entries = Leaderboard.objects.filter(
-            genre=None
-        ).order_by('-total_score', '-average_score')[:100]
-        
-        # Get user's rank
-        user_entry = Leaderboard.objects.filter(
-            user=request.user,
-            genre=None
-        ).first()
-        
-        if user_entry:
-            user_rank = Leaderboard.objects.filter(
-                genre=None,
-                total_score__gt=user_entry.total_score
-            ).count() + 1
-        else:
-            user_rank = None
-        
-        genre_display = None
+    # Get user's entry and rank
+    user_entry = Leaderboard.objects.filter(
+        user=request.user,
+        genre=genre_filter or None
+    ).first()
+    user_rank = ranking.rank(board, request.user.id) if user_entry else None
+    
+    # Players just above and below, when the user is not in the top 10
+    nearby_entries = []
+    if user_rank and user_rank > 10:
+        nearby_entries = ranking.around_entries(board, request.user.id, radius=2)
     
-    # Top 10 for display
-    top_10 = leaderboard_entries[:10]
+    # Format genre display name
+    genre_display = dict(QUIZ_GENRES).get(genre_filter, genre_filter) if genre_filter else None
     
     context = {
-        'top_10': top_10,
+        # Lazy so a cached top 10 fragment skips the lookup
+        'top_10': SimpleLazyObject(lambda: ranking.top_entries(board, 10)),
         'user_entry': user_entry,
         'user_rank': user_rank,
+        'nearby_entries': nearby_entries,
         'quiz_genres': QUIZ_GENRES,
         'selected_genre': genre_filter,
         'genre_display': genre_display,
-        'total_players': leaderboard_entries.count(),
+        # Passed uncalled so a cached stats fragment skips the count
+        'total_players': partial(ranking.size, board),
+        'cache_timeout': FRAGMENT_TIMEOUT,
+        'leaderboard_version': cache_version(QUIZ_LEADERBOARD),
     }
     return render(request, 'games/leaderboard.html', context)
 
@@ -541,29 +554,23 @@ def save_minigame_score(request):
         moves_count = int(data.get('moves_count', 0))
         completed = data.get('completed', True)
         
-        # Create score entry
-        minigame_score = MiniGameScore.objects.create(
-            user=request.user,
-            game_type=game_type,
-            difficulty=difficulty,
-            score=score,
-            time_taken=time_taken,
-            moves_count=moves_count,
-            completed=completed
-        )
-        
-        # Update leaderboard
-        leaderboard, created = MiniGameLeaderboard.objects.get_or_create(
-            user=request.user,
-            game_type=game_type
-        )
-        leaderboard.update_stats()
+        with transaction.atomic():
+            # Create score entry
+            minigame_score = MiniGameScore.objects.create(
+                user=request.user,
+                game_type=game_type,
+                difficulty=difficulty,
+                score=score,
+                time_taken=time_taken,
+                moves_count=moves_count,
+                completed=completed
+            )
+            
+            # Update leaderboard
+            leaderboard = MiniGameLeaderboard.record_score(minigame_score)
         
         # Get user's rank
-        rank = MiniGameLeaderboard.objects.filter(
-            game_type=game_type,
-            total_score__gt=leaderboard.total_score
-        ).count() + 1
+        rank = ranking.rank(ranking.minigame_board(game_type), request.user.id)
         
         return JsonResponse({
             'success': True,
@@ -581,116 +588,51 @@ def save_minigame_score(request):
         }, status=400)
 
 
+MINIGAME_LEADERBOARD_SIZE = 10
+MINIGAME_BOARDS = [
+    (game_type, difficulty)
+    for game_type in ('memory_match', 'pattern_recognition', 'logic_puzzle', 'mystery_detective', 'story_adventure')
+    for difficulty in ('easy', 'medium', 'hard')
+]
+
+
+def top_minigame_scores(limit=MINIGAME_LEADERBOARD_SIZE):
+    """
+    Best finished games of every game type and difficulty in one query
+
+    ROW_NUMBER() numbers the scores within each (game_type, difficulty)
+    partition, best score first and faster time breaking ties, and only the
+    first `limit` of each are returned. minigame_score_board_idx matches the
+    partition and order, so no partition is sorted in full.
+
+    Returns:
+        dict: "<game_type>_<difficulty>" -> list of MiniGameScore, for every board
+    """
+    scores = MiniGameScore.objects.filter(completed=True).annotate(
+        board_position=Window(
+            RowNumber(),
+            partition_by=[F('game_type'), F('difficulty')],
+            order_by=[F('score').desc(), F('time_taken').asc()],
+        )
+    ).filter(board_position__lte=limit).select_related('user').order_by()
+    
+    # At most limit rows per board come back, so they are ordered here rather than in SQL
+    boards = {f"{game_type}_{difficulty}": [] for game_type, difficulty in MINIGAME_BOARDS}
+    for score in sorted(scores, key=lambda score: score.board_position):
+        key = f"{score.game_type}_{score.difficulty}"
+        if key in boards:
+            boards[key].append(score)
+    return boards
+
+
 @login_required
 def minigame_leaderboard(request):
     """Leaderboard for mini games with difficulty breakdown"""
-    # Get leaderboards for all game types and difficulties
-    memory_match_easy = MiniGameScore.objects.filter(
-        game_type='memory_match',
-        difficulty='easy',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    memory_match_medium = MiniGameScore.objects.filter(
-        game_type='memory_match',
-        difficulty='medium',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    memory_match_hard = MiniGameScore.objects.filter(
-        game_type='memory_match',
-        difficulty='hard',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    pattern_recognition_easy = MiniGameScore.objects.filter(
-        game_type='pattern_recognition',
-        difficulty='easy',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    pattern_recognition_medium = MiniGameScore.objects.filter(
-        game_type='pattern_recognition',
-        difficulty='medium',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    pattern_recognition_hard = MiniGameScore.objects.filter(
-        game_type='pattern_recognition',
-        difficulty='hard',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    logic_puzzle_easy = MiniGameScore.objects.filter(
-        game_type='logic_puzzle',
-        difficulty='easy',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    logic_puzzle_medium = MiniGameScore.objects.filter(
-        game_type='logic_puzzle',
-        difficulty='medium',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    logic_puzzle_hard = MiniGameScore.objects.filter(
-        game_type='logic_puzzle',
-        difficulty='hard',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    mystery_detective_easy = MiniGameScore.objects.filter(
-        game_type='mystery_detective',
-        difficulty='easy',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    mystery_detective_medium = MiniGameScore.objects.filter(
-        game_type='mystery_detective',
-        difficulty='medium',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    mystery_detective_hard = MiniGameScore.objects.filter(
-        game_type='mystery_detective',
-        difficulty='hard',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    story_adventure_easy = MiniGameScore.objects.filter(
-        game_type='story_adventure',
-        difficulty='easy',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    story_adventure_medium = MiniGameScore.objects.filter(
-        game_type='story_adventure',
-        difficulty='medium',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
-    story_adventure_hard = MiniGameScore.objects.filter(
-        game_type='story_adventure',
-        difficulty='hard',
-        completed=True
-    ).select_related('user').order_by('-score')[:10]
-    
     context = {
-        'memory_match_easy': memory_match_easy,
-        'memory_match_medium': memory_match_medium,
-        'memory_match_hard': memory_match_hard,
-        'pattern_recognition_easy': pattern_recognition_easy,
-        'pattern_recognition_medium': pattern_recognition_medium,
-        'pattern_recognition_hard': pattern_recognition_hard,
-        'logic_puzzle_easy': logic_puzzle_easy,
-        'logic_puzzle_medium': logic_puzzle_medium,
-        'logic_puzzle_hard': logic_puzzle_hard,
-        'mystery_detective_easy': mystery_detective_easy,
-        'mystery_detective_medium': mystery_detective_medium,
-        'mystery_detective_hard': mystery_detective_hard,
-        'story_adventure_easy': story_adventure_easy,
-        'story_adventure_medium': story_adventure_medium,
-        'story_adventure_hard': story_adventure_hard,
+        # Lazy so a cached page fragment skips the query
+        'top_scores': SimpleLazyObject(top_minigame_scores),
+        'cache_timeout': FRAGMENT_TIMEOUT,
+        'leaderboard_version': cache_version(MINIGAME_LEADERBOARD),
     }
     return render(request, 'games/minigame_leaderboard.html', context)
 
@@ -1163,23 +1105,8 @@ Return only the feedback text (no JSON)."""
                 )
                 
                 # Update leaderboard
-                leaderboard, created = MiniGameLeaderboard.objects.get_or_create(
-                    user=request.user,
-                    game_type='mystery_detective'
-                )
-                
-                if total_score > leaderboard.best_score:
-                    leaderboard.best_score = total_score
-                    leaderboard.games_played += 1
-                    leaderboard.save()
-                elif created:
-                    leaderboard.best_score = total_score
-                    leaderboard.games_played = 1
-                    leaderboard.save()
-                else:
-                    leaderboard.games_played += 1
-                    leaderboard.save()
-                    
+                MiniGameLeaderboard.record_score(game_score)
+
             except Exception as e:
                 logger.error(f"Error saving mystery game score: {e}")
         
@@ -1483,23 +1410,8 @@ def end_story(request):
             )
             
             # Update leaderboard
-            leaderboard, created = MiniGameLeaderboard.objects.get_or_create(
-                user=request.user,
-                game_type='story_adventure'
-            )
-            
-            if total_score > leaderboard.best_score:
-                leaderboard.best_score = total_score
-                leaderboard.games_played += 1
-                leaderboard.save()
-            elif created:
-                leaderboard.best_score = total_score
-                leaderboard.games_played = 1
-                leaderboard.save()
-            else:
-                leaderboard.games_played += 1
-                leaderboard.save()
-                
+            MiniGameLeaderboard.record_score(game_score)
+
         except Exception as e:
             logger.error(f"Error saving story adventure score: {e}")
         
@@ -3,6 +3,7 @@ Celery configuration for SafeMind-AI
 """
 import os
 from celery import Celery
+from celery.schedules import crontab
 
 # Set default Django settings module
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'perplex.settings')
@@ -21,6 +22,14 @@ app.conf.beat_schedule = {
         'task': 'voice_calls.tasks.check_scheduled_calls',
         'schedule': 60.0,  # Run every 60 seconds
     },
+    'requeue-stalled-jobs-every-5-minutes': {
+        'task': 'app.tasks.requeue_stalled_jobs',
+        'schedule': 300.0,
+    },
+    'archive-chat-history-nightly': {
+        'task': 'app.tasks.archive_old_chat_history',
+        'schedule': crontab(hour=3, minute=30),
+    },
 }
 
 @app.task(bind=True)
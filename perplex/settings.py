@@ -191,6 +191,41 @@ GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 CLOUDFLARE_API_TOKEN = os.getenv('CLOUDFLARE_API_TOKEN')
 CLOUDFLARE_ACCOUNT_ID = os.getenv('CLOUDFLARE_ACCOUNT_ID')
 
+# Sentiment scoring - concurrent requests are coalesced into short micro-batches
+SENTIMENT_BATCHING_ENABLED = os.getenv('SENTIMENT_BATCHING_ENABLED', 'True') == 'True'
+SENTIMENT_BATCH_MAX_SIZE = int(os.getenv('SENTIMENT_BATCH_MAX_SIZE', '16'))
+SENTIMENT_BATCH_MAX_WAIT_MS = int(os.getenv('SENTIMENT_BATCH_MAX_WAIT_MS', '10'))  # Milliseconds
+# 'remote' uses Cloudflare and falls back to the local engine on errors or a missed deadline,
+# 'local' only scores on this machine, 'local_first' asks Cloudflare only when the local score is uncertain
+SENTIMENT_ENGINE = os.getenv('SENTIMENT_ENGINE', 'remote')
+SENTIMENT_REMOTE_DEADLINE_MS = int(os.getenv('SENTIMENT_REMOTE_DEADLINE_MS', '3000'))  # Milliseconds
+SENTIMENT_LOCAL_CONFIDENCE = float(os.getenv('SENTIMENT_LOCAL_CONFIDENCE', '0.8'))
+SENTIMENT_ONNX_MODEL_PATH = os.getenv('SENTIMENT_ONNX_MODEL_PATH', '')  # Directory with model.onnx and tokenizer.json
+# Long texts are scored in sentence windows that fit within the model's 512 token input
+SENTIMENT_CHUNK_MAX_CHARS = int(os.getenv('SENTIMENT_CHUNK_MAX_CHARS', '1000'))
+SENTIMENT_CHUNK_CACHE_TIMEOUT = int(os.getenv('SENTIMENT_CHUNK_CACHE_TIMEOUT', str(7 * 24 * 60 * 60)))  # Seconds
+
+# Prescription Digitizer - uploads are streamed to disk and shrunk before being sent to Gemini
+PRESCRIPTION_MAX_UPLOAD_SIZE = int(os.getenv('PRESCRIPTION_MAX_UPLOAD_SIZE', str(4 * 1024 * 1024)))  # Bytes
+PRESCRIPTION_TARGET_LONG_EDGE = int(os.getenv('PRESCRIPTION_TARGET_LONG_EDGE', '2000'))  # Pixels
+PRESCRIPTION_JPEG_QUALITY = int(os.getenv('PRESCRIPTION_JPEG_QUALITY', '80'))
+PRESCRIPTION_PDF_DPI = int(os.getenv('PRESCRIPTION_PDF_DPI', '150'))
+PRESCRIPTION_PDF_MAX_PAGES = int(os.getenv('PRESCRIPTION_PDF_MAX_PAGES', '10'))  # Longer PDFs are sent unprocessed
+
+# Chatbot history is paged by (timestamp, id) cursor
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv('CHAT_HISTORY_PAGE_SIZE', '20'))
+CHAT_HISTORY_MAX_PAGE_SIZE = int(os.getenv('CHAT_HISTORY_MAX_PAGE_SIZE', '50'))
+# Turns older than this move to compressed per-month ChatArchive rows
+CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv('CHAT_ARCHIVE_AFTER_DAYS', '180'))
+
+# Journal and chat search - FTS5 on SQLite, tsvector + GIN on PostgreSQL
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', '20'))
+
+# Dashboard - chart series are aggregated per day in the database and cached per user
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_CACHE_TIMEOUT', str(60 * 60)))  # Seconds
+DASHBOARD_CHART_MAX_POINTS = int(os.getenv('DASHBOARD_CHART_MAX_POINTS', '90'))
+DASHBOARD_RECENT_RESULTS = int(os.getenv('DASHBOARD_RECENT_RESULTS', '10'))
+
 # Channels Configuration (for WebSocket support)
 ASGI_APPLICATION = 'perplex.asgi.application'
 
@@ -214,6 +249,36 @@ else:
         },
     }
 
+# Cache - shared Redis in production, per-process LRU (LocMemCache) otherwise
+CACHE_URL = os.getenv('CACHE_URL') or (os.getenv('REDIS_URL', 'redis://localhost:6379/0') if USE_REDIS else None)
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'mindmate',
+            'TIMEOUT': 300,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'mindmate',
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.getenv('LOCAL_CACHE_MAX_ENTRIES', '10000')),
+            },
+        },
+    }
+
+CACHE_PAGE_TIMEOUT = int(os.getenv('CACHE_PAGE_TIMEOUT', str(60 * 60)))  # Anonymous marketing pages, seconds
+CACHE_FRAGMENT_TIMEOUT = int(os.getenv('CACHE_FRAGMENT_TIMEOUT', str(10 * 60)))  # Leaderboard and analytics blocks, seconds
+
+# Leaderboard rankings - Redis sorted sets when set, database queries otherwise
+RANKING_REDIS_URL = os.getenv('RANKING_REDIS_URL') or (os.getenv('REDIS_URL', 'redis://localhost:6379/0') if USE_REDIS else None)
+
 # Celery Configuration (for background tasks)
 # Note: Celery requires Redis or RabbitMQ - in-memory not supported
 # For development without Redis, you can disable Celery by not starting the worker
@@ -228,6 +293,12 @@ CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
 CELERY_ENABLE_UTC = True  # Keep UTC internally but convert for display
 CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_ALWAYS_EAGER', 'False') == 'True'  # Run tasks synchronously in development
 
+# Background jobs left 'pending' (e.g. the broker was down at upload time) are re-queued after
+# JOB_REQUEUE_AFTER_MINUTES and marked failed once they are JOB_REQUEUE_GIVE_UP_HOURS old
+JOB_REQUEUE_AFTER_MINUTES = int(os.getenv('JOB_REQUEUE_AFTER_MINUTES', '10'))
+JOB_REQUEUE_GIVE_UP_HOURS = int(os.getenv('JOB_REQUEUE_GIVE_UP_HOURS', '24'))
+JOB_REQUEUE_BATCH_SIZE = int(os.getenv('JOB_REQUEUE_BATCH_SIZE', '100'))  # Rows per model per sweep
+
 # Twilio Configuration
 # Get credentials from: https://www.twilio.com/console
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
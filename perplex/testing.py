@@ -0,0 +1,38 @@
+"""
+Shared helpers for query-plan regression tests
+"""
+from django.db import connection
+import re
+
+# SQLite: "SCAN <table>" reads every row, "USE TEMP B-TREE" sorts without an index
+SQLITE_PLAN_PROBLEMS = re.compile(r"\bSCAN\b|\bUSE TEMP B-TREE\b")
+# PostgreSQL: sequential scans and explicit sort nodes
+POSTGRES_PLAN_PROBLEMS = re.compile(r"(?:^|->\s+)(?:Seq Scan|Sort|Incremental Sort)\b")
+
+
+class QueryPlanAssertionsMixin:
+    """TestCase mixin that fails when a hot query stops being served by an index"""
+
+    def explain(self, queryset):
+        if connection.vendor == "postgresql":
+            # Test tables are tiny, where a sequential scan is always cheapest;
+            # disable it so the plan shows the access path used on real data
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertIndexedPlan(self, queryset):
+        """Assert the query neither scans a whole table nor sorts its rows"""
+        if connection.vendor == "sqlite":
+            pattern = SQLITE_PLAN_PROBLEMS
+        elif connection.vendor == "postgresql":
+            pattern = POSTGRES_PLAN_PROBLEMS
+        else:
+            self.skipTest(f"No plan checks for {connection.vendor}")
+
+        plan = self.explain(queryset)
+        problems = [line.strip() for line in plan.splitlines() if pattern.search(line)]
+        self.assertFalse(
+            problems,
+            f"Query is not fully served by an index:\n{queryset.query}\n\nPlan:\n{plan}",
+        )
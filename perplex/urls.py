@@ -18,7 +18,7 @@ from django.contrib import admin
 from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path, include
-from accounts.views import CustomSignupView, complete_profile_view, profile_view
+from accounts.views import CustomSignupView, complete_profile_view, export_data_view, profile_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -27,6 +27,7 @@ urlpatterns = [
     path('accounts/signup/', CustomSignupView.as_view(), name='account_signup'),
     path('profile/complete/', complete_profile_view, name='complete-profile'),
     path('profile/', profile_view, name='profile'),
+    path('profile/export/', export_data_view, name='export_data'),
     path('voice/', include('voice_calls.urls')),
     path('games/', include('games.urls')),
 ]
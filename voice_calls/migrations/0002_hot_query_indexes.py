@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-19 10:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voice_calls', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='voicecallhistory',
+            index=models.Index(fields=['user', '-created_at'], name='voice_calls_user_id_72a308_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voicecallschedule',
+            index=models.Index(fields=['status', 'scheduled_time'], name='voice_calls_status_9cb6c6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voicecallschedule',
+            index=models.Index(fields=['user', 'status', 'scheduled_time'], name='voice_calls_user_id_6a8b8f_idx'),
+        ),
+    ]
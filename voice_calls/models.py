@@ -38,6 +38,11 @@ class VoiceCallSchedule(models.Model):
         ordering = ['-scheduled_time']
         verbose_name = 'Voice Call Schedule'
         verbose_name_plural = 'Voice Call Schedules'
+        indexes = [
+            # Due-call polling and per-user upcoming calls
+            models.Index(fields=['status', 'scheduled_time']),
+            models.Index(fields=['user', 'status', 'scheduled_time']),
+        ]
         
     def __str__(self):
         return f"{self.user.username} - {self.scheduled_time.strftime('%Y-%m-%d %H:%M')}"
@@ -111,6 +116,9 @@ class VoiceCallHistory(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Voice Call History'
         verbose_name_plural = 'Voice Call Histories'
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
         
     def __str__(self):
         return f"{self.user.username} - {self.call_started_at.strftime('%Y-%m-%d %H:%M') if self.call_started_at else 'N/A'}"
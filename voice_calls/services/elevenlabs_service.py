@@ -3,10 +3,16 @@ ElevenLabs Service for AI-powered voice conversations
 """
 import requests
 from django.conf import settings
+from app.services.lexicon import LexiconMatcher
 import logging
 
 logger = logging.getLogger(__name__)
 
+CALL_SENTIMENT_MATCHER = LexiconMatcher({
+    'positive': ['happy', 'good', 'great', 'better', 'fine', 'well', 'glad', 'joy'],
+    'negative': ['sad', 'bad', 'depressed', 'anxious', 'worried', 'stress', 'difficult', 'hard'],
+})
+
 
 class ElevenLabsService:
     """Service class for ElevenLabs API interactions"""
@@ -89,13 +95,10 @@ class ElevenLabsService:
         
         try:
             # Simple keyword-based sentiment analysis as fallback
-            positive_keywords = ['happy', 'good', 'great', 'better', 'fine', 'well', 'glad', 'joy']
-            negative_keywords = ['sad', 'bad', 'depressed', 'anxious', 'worried', 'stress', 'difficult', 'hard']
-            
-            text_lower = transcript_text.lower()
+            keyword_counts = CALL_SENTIMENT_MATCHER.counts(transcript_text)
             
-            positive_count = sum(1 for word in positive_keywords if word in text_lower)
-            negative_count = sum(1 for word in negative_keywords if word in text_lower)
+            positive_count = keyword_counts['positive']
+            negative_count = keyword_counts['negative']
             
             total_words = len(transcript_text.split())
             
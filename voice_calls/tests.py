@@ -1,3 +1,77 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from perplex.testing import QueryPlanAssertionsMixin
+from voice_calls.models import VoiceCallHistory, VoiceCallSchedule
 
-# Create your tests here.
+SEED_USERS = 3
+SEED_CALLS = 20
+
+
+def seed_calls(user):
+    """Give a user past completed calls and upcoming scheduled ones"""
+    now = timezone.now()
+    for i in range(SEED_CALLS):
+        past = VoiceCallSchedule.objects.create(
+            user=user,
+            phone_number="+10000000000",
+            scheduled_time=now - timedelta(days=i + 1),
+            status="completed",
+        )
+        VoiceCallHistory.objects.create(
+            schedule=past,
+            user=user,
+            twilio_call_sid=f"CA{user.pk}-{i}",
+            overall_sentiment="positive",
+        )
+        VoiceCallSchedule.objects.create(
+            user=user,
+            phone_number="+10000000000",
+            scheduled_time=now + timedelta(days=i + 1),
+            status="pending",
+        )
+
+
+class CallQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    """Call polling and per-user call queries must stay on their indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"user{i}", password="password") for i in range(SEED_USERS)]
+        for user in cls.users:
+            seed_calls(user)
+        cls.user = cls.users[0]
+
+    def test_due_calls(self):
+        self.assertIndexedPlan(
+            VoiceCallSchedule.objects.filter(status="pending", scheduled_time__lte=timezone.now()).order_by()
+        )
+
+    def test_upcoming_calls(self):
+        self.assertIndexedPlan(
+            VoiceCallSchedule.objects.filter(
+                user=self.user, status="pending", scheduled_time__gte=timezone.now()
+            ).order_by("scheduled_time")[:3]
+        )
+
+    def test_call_history(self):
+        self.assertIndexedPlan(VoiceCallHistory.objects.filter(user=self.user).select_related("schedule"))
+
+
+class CallHistoryQueryCountTests(TestCase):
+    """The call history page must not issue queries per call"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("user", password="password")
+        seed_calls(cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_call_history(self):
+        # session, user, calls joined with their schedules
+        with self.assertNumQueries(3):
+            self.client.get(reverse("voice_calls:history"))